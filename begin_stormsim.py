@@ -1,7 +1,7 @@
 """
 StormSim: File 1
 ===
-Converts specific HDF5 files from CHS databse.
+Desktop GUI
 
 About
 ---
@@ -11,18 +11,19 @@ Author
 ---
 Code by Jared Hidalgo. 
 """
+import time
+t_boot = time.perf_counter()
 title = "StormSim: CHS HDF5 Converter"
 print("\nChecking requirements.............................\n")
 
 # Import internal packages
-import os, pickle, sys, time
+import hashlib, json, os, site, sys, sysconfig, threading
 from subprocess import call, Popen
-from importlib.metadata import distributions
+from importlib import invalidate_caches
+from importlib.metadata import PackageNotFoundError, version
 from platform import system
 from copy import deepcopy
-from datetime import timedelta
-from functools import partial
-from shutil import rmtree
+from datetime import datetime
 from zipfile import ZipFile
 
 # Get directories.
@@ -39,39 +40,82 @@ od_dict = {
 open_directory = od_dict[system()] if system() in od_dict else "xdg-open"
 
 # File check.
-req_files = ["code01_h5organize.py", "gui01_ui_stormsim.py", "requirements.txt"]
+req_files = ["code01_h5organize.py", "code02_columnar.py", "code03_cache.py", "code04_stats.py", "code05_downsample.py", "code08_progress.py", "gui01_ui_stormsim.py", "gui02_workerpool.py", "gui03_tablemodel.py", "requirements.txt"]
 lis_files = [f for f in os.listdir(DIR_PROGRAM) if f in req_files]
 if len(lis_files) != len(req_files):
     sys.exit( "\n\nERROR: Missing Python files. --> Can't run program." )
 
-# Package check: Online attempt.
+# Package check: Skipped if the Python environment and requirements.txt are the same as the last successful check.
+# Set the environment variable `CHS_CHECK_REQUIREMENTS=1` to check again anyway.
+# Per-user directory of the program, which also holds the conversion cache (see `DIR_CACHE` in `code03_cache.py`).
+# Found here since the cache's module needs the packages being checked.
+if os.name == "nt":
+    DIR_APP = os.path.join( os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "CHS_HDF5_Converter" )
+else:
+    DIR_APP = os.path.join( os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "chs_hdf5_converter" )
+REQ_STAMP = os.path.join( DIR_APP, "requirements_checked.json" )
+"""Fingerprint of the environment at the last successful package check."""
+BOOT_BUDGET = 2.0
+"""Seconds from launch to the window showing. A warning is printed if booting takes longer, and `code07_benchmark.py` tracks it."""
+
+def func_env_fingerprint() -> str:
+    """
+    Hash the Python interpreter, requirements.txt and the modification times of the site-packages directories,
+    which change whenever a package is installed, upgraded or removed.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    h.update( f"{sys.executable}|{sys.version}".encode("utf8") )
+    with open( os.path.join(DIR_PROGRAM, "requirements.txt"), "rb" ) as r:
+        h.update( r.read() )
+    dirs = {sysconfig.get_paths()["purelib"], sysconfig.get_paths()["platlib"]}
+    if site.ENABLE_USER_SITE: dirs.add( site.getusersitepackages() )
+    for d in sorted(dirs):
+        try: h.update( f"|{d}:{os.stat(d).st_mtime_ns}".encode("utf8") )
+        except OSError: pass
+    return h.hexdigest()
+
+def func_missing_packages() -> list[str]:
+    """Get the packages of requirements.txt which aren't installed."""
+    with open( os.path.join(DIR_PROGRAM, "requirements.txt"), "r" ) as r:
+        req_pkgs = [i.split("==" if "==" in i else "\n")[0].strip() for i in r.readlines() if i.strip()]
+    missing_pkgs = []
+    for x in req_pkgs:
+        try: version(x)
+        except PackageNotFoundError: missing_pkgs.append(x)
+    return missing_pkgs
+
 try:
-    call( f"{sys.executable} -m pip install -U pip", shell=True )
-    call( f"{sys.executable} -m pip install -r \"{DIR_PROGRAM}{os.sep}requirements.txt\"", shell=True )
-except:
-    print( "WARNING: Either no internet or not using independent Python compiler." )
-
-# Package check: Offline check.
-with open(f"{DIR_PROGRAM}{os.sep}requirements.txt", "r") as r:
-    req_pkgs = [i.split("==" if "==" in i else "\n")[0] for i in r.readlines()]
-curr_pkgs    = [dist.metadata['Name'] for dist in distributions()]
-missing_pkgs = [x for x in req_pkgs if x not in curr_pkgs]
-if len(missing_pkgs) > 0:
-    sys.exit( "\n\nERROR: Can't install missing Python packages. --> Can't run program." )
+    with open(REQ_STAMP, "r") as r:
+        is_checked = json.load(r)["fingerprint"] == func_env_fingerprint()
+except (OSError, ValueError, KeyError):
+    is_checked = False
+if not is_checked or os.environ.get("CHS_CHECK_REQUIREMENTS") == "1":
+    missing_pkgs = func_missing_packages()
+    # Package check: Online attempt, only for missing packages.
+    if len(missing_pkgs) > 0:
+        print( f"Installing missing Python packages: {', '.join(missing_pkgs)}" )
+        try:
+            call( [sys.executable, "-m", "pip", "install", "-r", os.path.join(DIR_PROGRAM, "requirements.txt")] )
+        except:
+            print( "WARNING: Either no internet or not using independent Python compiler." )
+        invalidate_caches()
+        missing_pkgs = func_missing_packages()
+    if len(missing_pkgs) > 0:
+        sys.exit( "\n\nERROR: Can't install missing Python packages. --> Can't run program." )
+    try:
+        os.makedirs( os.path.dirname(REQ_STAMP), exist_ok=True )
+        with open(REQ_STAMP, "w") as w:
+            json.dump( {"fingerprint": func_env_fingerprint(), "checked": time.time()}, w )
+    except OSError: pass
 
 print("\nChecking requirements............................. Done!\nBooting CHS HDF5 Converter........................ ", end="")
 
 
 # Import external packages.
-from PySide6.QtCore import (Qt, QDateTime, QProcess, QThread, Signal)
+from PySide6.QtCore import (Qt, QDateTime, QRect, QSize, QTimer)
 from PySide6.QtGui import (QFont, QIcon, QImage, QPixmap)
-from PySide6.QtWidgets import (QApplication, QCompleter, QDateTimeEdit, QFileDialog, 
-    QMainWindow, QMessageBox, QProgressBar, QPushButton, QSplashScreen, QTableWidgetItem)
-
-STATES = { QProcess.ProcessState.NotRunning: 'Not running',
-           QProcess.ProcessState.Starting: 'Initializing',
-           QProcess.ProcessState.Running: 'Running' }
-"""For printing the state of the QProcess."""
+from PySide6.QtWidgets import (QApplication, QComboBox, QCompleter, QDateTimeEdit, QFileDialog, 
+    QInputDialog, QMainWindow, QMessageBox, QProgressBar, QPushButton, QSpinBox, QSplashScreen, QTableWidgetItem)
 
 # Temporarily import program directory to PATH for importing program files from any directory.
 sys.path.append( DIR_PROGRAM )
@@ -83,125 +127,35 @@ splash = QSplashScreen( main_pixmap )
 splash.show()
 splash.setWindowIcon( main_pixmap )
 
-# Continue importing external packages.
-import plotly.express as px
-import plotly.offline as po
-import plotly.io as pio
-pio.renderers.default = "png"
-import chime
-chime.theme('material')
-import numpy as np
-import pandas as pd
-
-# Import Python files
-from code01_h5organize import H5_Organized_New
+# Import Python files. The converter, the table model, numpy, pandas, plotly and chime are imported after the window shows (see `func_finish_boot()`).
 from gui01_ui_stormsim import Ui_MainWindow
+from gui02_workerpool import WorkerPool
 
 
 
-
-
-class SecondThread(QThread):
+_chime = None
+def func_chime(sound: str):
     """
-    New processing thread that loops over files to convert. 
-    
-    Without this, the ZipFile function would bottleneck the main Python thread.
-	"""
-    dictP = {}
-    dict3_name_to_h5 = {}
-    setCurrentProgress = Signal(int)
-    success = Signal(dict)
-    flim = 0
-
-    
-    def __init__(self, gui):
-        """
-        Store GUI objects. Determine number of HDF5 files to convert.
-        """
-        super().__init__()
-        self.gui: StormSim_Converter = gui
-    
-
-    def run(self):
-        """
-        Perform loop over HDF5 files + references to HDF5 files in ZIP.
-        """
-        self.len = len(list(self.gui.dict2_name_to_task.keys()))
-        has_zip = False
-        for i, (fname, task) in enumerate(self.gui.dict2_name_to_task.items()):
-            self.gui.statusBar.showMessage(f"<< Processing file {i+1}/{self.len}: {fname} >>")
-            fpath = self.gui.dict1_name_to_URI[fname]
-            if isinstance(fpath, list):
-                fpath = ";".join(fpath)
-                has_zip = True
-            self.filename = fname.split(".")[0].split("/")[-1]
-
-            self.h5 = None
-            self.process = QProcess()
-            self.process.readyReadStandardOutput.connect( partial(self.process_stdout, i) )
-            self.process.readyReadStandardError.connect( self.process_stderr )
-            self.process.stateChanged.connect( partial(self.process_state, i+1) )
-            self.process.finished.connect( partial(self.process_finished, i+1) )
-            self.process.setProgram( str(sys.executable) )
-            self.process.setArguments( ['-u', f'{DIR_PROGRAM}{os.sep}code01_h5organize.py', "1", str(int(not task == 0)), str(fpath)] )
-            self.timestamp = time.time()
-            self.process.start()
-            self.process.waitForFinished(-1)
-        
-        if has_zip: rmtree( "Extracted" )
-        self.gui.statusBar.showMessage("<< Done >>")
-        self.success.emit( self.dict3_name_to_h5 )
-    
-
-    def process_stdout(self, ii: int):
-        """
-        Decode output.
+    Play a sound ("success", "warning", "info"...). `chime` is imported on first use.
+    """
+    global _chime
+    if _chime is None:
+        import chime
+        chime.theme('material')
+        _chime = chime
+    getattr(_chime, sound)()
 
-        If string, then apply status update to progress bar.
 
-        If pickle, then aggregate individual H5_Organized objects.
-        """
-        x = self.process.readAllStandardOutput().data()
-        try:
-            x: str = x.decode("utf8")
-            if x.startswith("LENGTH:"): # 
-                self.flim = int(x.split(": ")[1].split(" ")[0])
-            elif x.startswith("STATUS:"):
-                r = ii + int(x.split(": ")[1]) / self.flim
-                self.setCurrentProgress.emit( int(100*r) )
-            #else: print(x)   # For errors on QProcess.
-        except:
-            try:
-                self.h5: H5_Organized_New = pickle.loads( x )[0]
-                if self.h5.h5s:
-                    for h5_obj in self.h5.h5s:
-                        self.dict3_name_to_h5[ h5_obj.name ] = h5_obj
-                else:
-                    self.dict3_name_to_h5[ self.h5.name ] = self.h5
-            except: pass
-    
-    
-    def process_stderr(self):
-        """Print error in CMD that terminated conversion."""
-        print( bytes( self.process.readAllStandardError() ).decode("utf8") )
-    
-    def process_state(self, ii: int, state: QProcess.ProcessState):
-        """Print state of converting file in CMD."""
-        print(f"Converting file {ii}/{self.len}: {self.filename} | {STATES[state]}")
-    
-    def process_finished(self, ii: int, exit_code, exit_status):
-        """Print conversion time."""
-        self.setCurrentProgress.emit( 100*ii )
-        te = str(timedelta(seconds = time.time() - self.timestamp))
-        res = "Finished!" if self.h5 else "Not imported."
-        print(f"{res} Time elapsed: {te}\n")
-    
-    def exit(self):
-        """Kill thread from "Abort" button."""
-        try: self.process.kill()
-        except: pass
-        self.quit()
 
+def func_preload():
+    """
+    Import the heavy packages in the background after the window shows, so the first conversion or plot doesn't wait for them.
+    Deletes temporary files left behind by a crash.
+    """
+    import chime, plotly.express, plotly.offline
+    import code01_h5organize, gui03_tablemodel
+    from code02_columnar import func_remove_stale
+    func_remove_stale()
 
 
 
@@ -251,8 +205,12 @@ class StormSim_Converter(Ui_MainWindow):
     """Dictionary of filenames (w/ extension) to task type: 0 = import, 1 = export, 2 = both"""
     dict3_name_to_h5 = {}
     """Dictionary of filenames (w/o extension) to modified H5 object."""
-    mainThread: QThread = None
-    """Reference to SecondThread object. For closing app."""
+    dict4_name_to_memory = {}
+    """Dictionary of filenames (w/ extension) to estimated memory in bytes: `(kept, convert)`. See `func_estimate_memory()`."""
+    memory_budget: int = None
+    """Bytes the imported datasets may use. Set when the first file is checked. See `func_memory_budget()`."""
+    pool: WorkerPool = None
+    """Pool of persistent converter processes, started with the app."""
     restart_msgbox = None
     """Confirmation window to abort Run button."""
     is_changing_databases = False
@@ -282,6 +240,8 @@ class StormSim_Converter(Ui_MainWindow):
     """Filter status for plainTextEdit."""
     str_stormIDs = ""
     """Storm ID status for plainTextEdit."""
+    filter_history = []
+    """Stack of `(filter, var_min_max, str_filters, str_stormIDs)` before each added filter. For "Undo"."""
 
     state_2x2A_justplot = False
     """STATE after graph made. Graph was just made in Data Viewer. Can be True with 2x1A and 2x1B."""
@@ -341,6 +301,42 @@ class StormSim_Converter(Ui_MainWindow):
         self.style_font_btn_bold.setBold(True)
         self.style_font_btn_bold.setUnderline(False)
 
+        # Add widgets missing from the pre-made GUI. `gui01_ui_stormsim.py` is generated from a UI file, so it's never edited.
+        # > Data Viewer (left) > "Table" tab > Output format, after "Export Table >"
+        self.label_5.setGeometry( QRect(20, 20, 111, 26) )
+        self.comboBox_64 = QComboBox( self.tab_12 )
+        self.comboBox_64.setObjectName( "comboBox_64" )
+        self.comboBox_64.addItems( ["CSV", "Parquet", "Feather"] )
+        self.comboBox_64.setGeometry( QRect(140, 20, 111, 26) )
+        self.comboBox_64.setFixedSize( QSize(111, 26) )
+        self.comboBox_64.setFont( self.pushButton_39.font() )
+        self.comboBox_64.setToolTip( "Output format of exported tables." )
+        # > Data Viewer (left) > "Table" tab > "Filter" group > "Undo" button, between "Add" and "Clear All"
+        self.pushButton_39.setGeometry( QRect(370, 0, 61, 26) )
+        self.pushButton_105 = QPushButton( "Undo", self.groupBox_27 )
+        self.pushButton_105.setObjectName( "pushButton_105" )
+        self.pushButton_105.setGeometry( QRect(440, 0, 61, 26) )
+        self.pushButton_105.setFixedSize( QSize(61, 26) )
+        self.pushButton_105.setFont( self.pushButton_39.font() )
+        self.pushButton_105.setToolTip( "Removes the last added filter." )
+        self.pushButton_105.setEnabled(False)
+        # > Data Viewer (left) > "Graph" tab > Plotting mode and point budget, after the "?" button
+        self.comboBox_65 = QComboBox( self.tab_13 )
+        self.comboBox_65.setObjectName( "comboBox_65" )
+        self.comboBox_65.addItems( ["Fast (LTTB)", "Fast (Min/Max)", "All points"] )
+        self.comboBox_65.setGeometry( QRect(400, 20, 121, 26) )
+        self.comboBox_65.setFont( self.pushButton_39.font() )
+        self.comboBox_65.setToolTip( "Fast: Downsample the lines to the point budget and draw them with WebGL. All points: Plot every point." )
+        self.spinBox_1 = QSpinBox( self.tab_13 )
+        self.spinBox_1.setObjectName( "spinBox_1" )
+        self.spinBox_1.setGeometry( QRect(530, 20, 101, 26) )
+        self.spinBox_1.setFont( self.pushButton_39.font() )
+        self.spinBox_1.setRange( 1000, 10000000 )
+        self.spinBox_1.setSingleStep(10000)
+        self.spinBox_1.setValue(20000)
+        self.spinBox_1.setSuffix( " pts" )
+        self.spinBox_1.setToolTip( "Point budget of fast graphs, shared by all Storm IDs." )
+
         # Reset widgets
         # > Convert tab
         self.pushButton_1.setEnabled(False)
@@ -378,7 +374,9 @@ class StormSim_Converter(Ui_MainWindow):
         self.pushButton_79.clicked.connect( self.func_DVtable_export_full )
         self.pushButton_39.clicked.connect( self.func_DVtable_add_filter )
         self.pushButton_57.clicked.connect( self.func_DVtable_clear_all_filters )
+        self.pushButton_105.clicked.connect( self.func_DVtable_undo_filter )
         self.pushButton_102.clicked.connect( self.func_DVtable_tooltip_for_pushButton_102 )
+        self.comboBox_64.currentIndexChanged.connect( self.func_DVtable_change_format )
         self.comboBox_27.currentIndexChanged.connect( self.func_DVtable_change_var )
         self.comboBox_62.currentTextChanged.connect( self.func_DVtable_change_stormID )
         self.dateTimeEdit_19.dateTimeChanged.connect( self.func_DVtable_check_datetime )
@@ -395,15 +393,31 @@ class StormSim_Converter(Ui_MainWindow):
         self.dateTimeEdit_21.dateTimeChanged.connect( self.func_DVplot_check_daterange )
         self.dateTimeEdit_22.dateTimeChanged.connect( self.func_DVplot_check_daterange )
         self.pushButton_84.clicked.connect( self.func_DVplot_reset_daterange )
+        self.comboBox_65.currentIndexChanged.connect( self.func_DVplot_change_mode )
 
         print("Done!\n\n\n")
 
+
+    def func_finish_boot(self):
+        """
+        Start the pool of converter processes, so they're ready by "Run", and import the heavy packages in the background.
+        Called once the window shows.
+        """
+        from code05_downsample import PLOT_POINT_BUDGET
+        self.pool = WorkerPool()
+        self.pool.setCurrentProgress.connect( self.func_set_progress )
+        self.pool.message.connect( self.statusBar.showMessage )
+        self.pool.eta.connect( self.func_set_eta )
+        self.pool.success.connect( self.func_convert_success )
+        self.spinBox_1.setValue( PLOT_POINT_BUDGET )
+        threading.Thread( target=func_preload, daemon=True ).start()
+
     
     def closeEvent(self, event):
         """
         GUI Action: Popup window before closing app.
         """
-        chime.warning()
+        func_chime("warning")
         txt = "Are you sure you want to quit? Exported files will not be deleted, but any progress in the GUI will not be saved."
         msgBox = QMessageBox( QMessageBox.Icon.Question,
                               "Exiting the Program",
@@ -413,14 +427,30 @@ class StormSim_Converter(Ui_MainWindow):
                               Qt.WindowType.WindowStaysOnTopHint )
         reply = msgBox.exec()
         if reply == QMessageBox.StandardButton.Yes:
-            if self.state_1x3_running:
-                try: self.mainThread.exit()
-                except: pass
+            self.dict3_name_to_h5 = {}
+            self.pool.shutdown() # Stops any conversion. Deletes handed-off datasets.
             sys.exit()
         else:
             event.ignore()
 
     
+    def func_set_progress(self, value: int):
+        """
+        Update the progress bar of "Run" from the worker pool.
+        """
+        if self.state_1x3_running:
+            self.progress_bar.setValue(value)
+
+    
+    def func_set_eta(self, eta: str, rates: str):
+        """
+        Show the ETA of "Run" in the progress bar and its throughput in the tooltip.
+        """
+        if self.state_1x3_running:
+            self.progress_bar.setFormat(f"%p% | ETA {eta}")
+            self.progress_bar.setToolTip(f"For all processing files.\n{rates}")
+
+    
     def func_enable_reset_button(self, btn: QPushButton):
         """
         GUI Design: Setup to enable and decorate a Reset button.
@@ -438,14 +468,16 @@ class StormSim_Converter(Ui_MainWindow):
         btn.setEnabled( False )
 
     
-    def func_Q_to_d(self, dt: QDateTimeEdit) -> np.ndarray[pd.Timestamp]:
+    def func_Q_to_d(self, dt: QDateTimeEdit) -> "np.ndarray[pd.Timestamp]":
         """
         Convert a PySide6 `QDateTime` object to a Pandas `Timestamp` object. For datetime processing.
         """
+        import numpy as np
+        import pandas as pd
         return np.array( pd.Timestamp( dt.dateTime().toString("yyyy-MM-ddTHH:mm:ss.zzzZ") ) )
 
 
-    def _func_d_to_Q(self, dt: pd.Timestamp):
+    def _func_d_to_Q(self, dt: "pd.Timestamp"):
         """
         Convert a `Timestamp` object to a `QDateTime` object. For dateTimeEdit boxes in GUI.
         """
@@ -453,6 +485,15 @@ class StormSim_Converter(Ui_MainWindow):
         x.toUTC()
         return x
 
+
+    def func_min_max_to_Q(self, var_min_max: dict) -> dict:
+        """
+        Copy the minimums and maximums of a dataset (see `H5_Organized_New.var_min_max`) with date-times as `QDateTime` objects.
+        The converter keeps date-times as `Timestamp` objects, since it doesn't import Qt.
+        """
+        return { var: [self._func_d_to_Q(x) if isinstance(x, datetime) else x for x in min_and_max]
+                 for var, min_and_max in var_min_max.items() }
+
     
 
     def func_CONVERT_browse_files(self):
@@ -485,7 +526,7 @@ class StormSim_Converter(Ui_MainWindow):
                 
                 # If current files are empty, but you already have other files imported, notify.
                 if len(new_filenames) == 0 and len(self.dict1_name_to_URI) != 0:
-                    chime.warning()
+                    func_chime("warning")
                     txt = "Files with the same name are assumed to have the same data." if duplicate_files else "None of the files selected qualify for this app.\nYou still have acceptable files."
                     txt += " Try again?"
                     msgBox = QMessageBox.warning( self.window, "No Qualifying Files Found", txt, QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, self.default_button )
@@ -534,10 +575,10 @@ class StormSim_Converter(Ui_MainWindow):
                         no_files = False
                         self.tableWidget.resizeColumnsToContents()
                         self.statusBar.showMessage( "Import > Files imported. Select which files to import/export." )
-                        chime.info()
+                        func_chime("info")
                     else: 
                         # Prompt dialog window when no qualifying files were found
-                        chime.warning()
+                        func_chime("warning")
                         msgBox = QMessageBox.warning( self.window, "No Qualifying Files Found", 
                                                       "None of the selected files qualify for this app. Try again?", 
                                                       QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, self.default_button )
@@ -545,7 +586,7 @@ class StormSim_Converter(Ui_MainWindow):
                             no_files = False
             else:
                 # Prompt dialog window when no files were selected
-                chime.warning()
+                func_chime("warning")
                 msgBox = QMessageBox.warning( self.window, "No Files Selected", "You didn't select any files. Try again?", 
                                               QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, self.default_button )
                 if msgBox == QMessageBox.StandardButton.No:
@@ -608,7 +649,7 @@ class StormSim_Converter(Ui_MainWindow):
         b3 = name_split[3] != "Post96RT"
         b4 = name_split[-1] not in ["NLR", "Param", "SRR"]
         chkBoxImport = QTableWidgetItem()
-        if np.all([b1, b2, b3, b4]):
+        if all([b1, b2, b3, b4]):
             chkBoxImport.setFlags(Qt.ItemFlag.ItemIsEnabled | Qt.ItemFlag.ItemIsUserCheckable)
             chkBoxImport.setCheckState(Qt.CheckState.Unchecked)
         else:
@@ -642,15 +683,18 @@ class StormSim_Converter(Ui_MainWindow):
                 else:                 self.track_import.remove(row)
                 num_import = len(self.track_import)
                 self.task_checklist[0] = num_import > 0
-                if num_import > 8:
-                    deselected = self.tableWidget.item( self.track_import[num_import-2], column )
-                    deselected.setCheckState(Qt.CheckState.Unchecked) # Uncheck previous selection. Auto-runs self.func_CONVERT_table_cellChanged() for that item.
-                    chime.warning()
-                    msgBox = QMessageBox.warning( self.window, "Import Limit!", 
-                                                  "For memory limitations, this app only imports up to 8 HDF5 files.\nChoose wisely. Your previous file was deselected.",
+                # Files over the memory budget are still imported: their datasets already stay on disk where possible.
+                used = self.func_CONVERT_admit_imports()
+                header = QTableWidgetItem( f"Import ({num_import})" )
+                header.setToolTip( f"Estimated memory: {used / 1024**3:.2f} GB of {self.memory_budget / 1024**3:.2f} GB." )
+                self.tableWidget.setHorizontalHeaderItem( column, header )
+                name = self.tableWidget.item(row, 0).text()
+                if import_is_checked and used > self.memory_budget:
+                    func_chime("warning")
+                    msgBox = QMessageBox.warning( self.window, "Memory Budget!", 
+                                                  f"{name} doesn't fit the memory budget with the other files. It will still be imported, "
+                                                  "but the GUI may slow down or run out of memory.",
                                                   QMessageBox.StandardButton.Ok, QMessageBox.StandardButton.Ok )
-                else:
-                    self.tableWidget.setHorizontalHeaderItem( column, QTableWidgetItem(f"Import ({num_import})") )
             
             else: # column == 1
                 if export_is_checked: self.track_export.append(row)
@@ -658,7 +702,7 @@ class StormSim_Converter(Ui_MainWindow):
                 num_export = len(self.track_export)
                 self.task_checklist[1] = num_export > 0
                 if num_export == 8:
-                    chime.warning()
+                    func_chime("warning")
                     txt = "Exporting 8 or more HDF5 files will take a long time.\nChoose wisely."
                     if len(self.track_import) > 0: txt += " You can import other files later."
                     msgBox = QMessageBox.warning( self.window, "Conversion Warning!", txt, QMessageBox.StandardButton.Ok, QMessageBox.StandardButton.Ok )
@@ -678,6 +722,37 @@ class StormSim_Converter(Ui_MainWindow):
     
 
     
+    def func_CONVERT_admit_imports(self):
+        """
+        Add up the estimated memory the files to import keep in the GUI, to compare it with the memory budget.
+        Timeseries files are always read one storm at a time and the numerical columns of other files stay memory-mapped,
+        so mostly text columns and cached storms count. Estimates only read the metadata of the files.
+
+        Returns the estimated memory of all imported files in bytes.
+        """
+        from code01_h5organize import func_memory_budget
+        if self.memory_budget is None: self.memory_budget = func_memory_budget()
+        return sum( self.func_CONVERT_estimate( self.tableWidget.item(i, 0).text() )[0] for i in self.track_import )
+
+
+
+    def func_CONVERT_estimate(self, name: str):
+        """
+        Get the estimated memory of a file: `(kept, convert)` in bytes. Estimated once per file. See `func_estimate_memory()`.
+        """
+        if name not in self.dict4_name_to_memory:
+            from code01_h5organize import MEM_PER_FILE_FACTOR, func_estimate_memory, func_file_size
+            fpath = self.dict1_name_to_URI[name]
+            if isinstance(fpath, list): fpath = ";".join(fpath)
+            try:
+                self.dict4_name_to_memory[name] = func_estimate_memory(fpath)
+            except Exception as e:
+                print(f"Can't estimate the memory of {name}: {e}")
+                self.dict4_name_to_memory[name] = (MEM_PER_FILE_FACTOR * func_file_size(fpath),) * 2
+        return self.dict4_name_to_memory[name]
+
+
+
     def func_CONVERT_search_file(self, s):
         """
         On text change, highlight all files with matching substring.
@@ -731,7 +806,7 @@ class StormSim_Converter(Ui_MainWindow):
         
         GUI Location: Convert tab > Qualifying Files group > "Clear" button
 		"""
-        chime.warning()
+        func_chime("warning")
         msgBox = QMessageBox.warning( self.window, "Clearing Imported Files", "Are you sure you want to remove all imported HDF5 files?", QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, self.default_button )
         if msgBox == QMessageBox.StandardButton.Yes:
             # Convert tab > Clear table and tab
@@ -758,6 +833,8 @@ class StormSim_Converter(Ui_MainWindow):
             self.task_checklist = [False] * 2
             self.track_import = []
             self.track_export = []
+            self.dict4_name_to_memory = {}
+            self.memory_budget = None
             self.has_timeseries = False
             self.state_1x2A_imported = False
             self.state_1x1_browse = True
@@ -817,21 +894,27 @@ class StormSim_Converter(Ui_MainWindow):
             self.progress_bar.show()
 
             # Start conversion
-            self.mainThread = SecondThread(self)
-            self.mainThread.setCurrentProgress.connect( self.progress_bar.setValue )
-            self.mainThread.success.connect(self.func_convert_success)
-            self.mainThread.setTerminationEnabled(True)
-            self.mainThread.finished.connect(self.mainThread.deleteLater)
-            self.mainThread.start()
+            # Admission control: Workers only convert files together if their estimated peak memory fits the budget.
+            from code01_h5organize import func_memory_budget
+            if self.memory_budget is None: self.memory_budget = func_memory_budget()
+            self.pool.memory_budget = self.memory_budget
+            tasks = []
+            for fname, task in self.dict2_name_to_task.items():
+                fpath = self.dict1_name_to_URI[fname]
+                if isinstance(fpath, list):
+                    fpath = ";".join(fpath)
+                kept, convert = self.func_CONVERT_estimate(fname)
+                tasks.append( (fname, fpath, task != 0, convert) )
+            self.pool.submit(tasks)
         
 
     
     def func_convert_success(self, res):
         """
-        Handle data after QThread finishes converting all files.
+        Handle data after the worker pool finishes converting all files.
 		"""
         self.state_1x3_running = False # Change state
-        self.dict3_name_to_h5: dict[str, H5_Organized_New] = res # Copy dictionary from QThread.
+        self.dict3_name_to_h5: "dict[str, H5_Organized_New]" = res # Copy dictionary from WorkerPool.
         # Remove "Abort" confirmation window if open.
         if self.restart_msgbox != None:
             self.restart_msgbox = None
@@ -898,18 +981,37 @@ class StormSim_Converter(Ui_MainWindow):
             self.statusBar.showMessage( "Data Viewer > Table > Success! Observe + export data with Data Viewer." )
             print("Done!")
         
-        chime.success()
-        self.mainThread = None # Delete SecondThread
+        func_chime("success")
     
 
 
+    def func_cancel_job(self, job):
+        """
+        Cancel one file of the run, queued or converting. The other files go on (see `func_abort_run()`).
+        """
+        if not self.state_1x3_running or job not in self.pool.jobs: return
+        self.pool.cancel(job)
+        self.statusBar.showMessage( f"Import > Cancelled {job.fname}. Other files go on." )
+
+
+
     def func_abort_run(self):
         """
         Abort converting files. Terminates the `self.func_RUN` function.
         
+        While more than one file is left, choose to abort all files or one file. The other files go on.
+        
         GUI Location: GUI Location: Convert tab > Qualifying Files group > "Run"/"Abort" button
 		"""
-        chime.warning()
+        jobs = [job for job in self.pool.jobs if job.progress < 1.0 and not job.is_cancelled] if self.state_1x3_running else []
+        if len(jobs) > 1:
+            items = ["All", *[job.fname for job in jobs]]
+            item, ok = QInputDialog.getItem( self.window, "Abort", "Abort all files or one file (queued or converting):", items, 0, False )
+            if not ok: return
+            if item != "All":
+                self.func_cancel_job( jobs[items.index(item) - 1] )
+                return
+        func_chime("warning")
         txt = "Are you sure you want to abort?\n"
         if self.task_checklist[0]: txt += "- Any imported files will need to be exported again.\n"
         if self.task_checklist[1]: txt += "- Exported CSV files will not be deleted.\n"
@@ -917,11 +1019,9 @@ class StormSim_Converter(Ui_MainWindow):
         
         # Start the work.
         if self.restart_msgbox == QMessageBox.StandardButton.Yes:
-            # Delete QThread
+            # Cancel running and queued jobs. Their workers are replaced.
             if self.state_1x3_running:
-                try: self.mainThread.exit()
-                except: pass
-                self.mainThread = None
+                self.pool.cancel_all()
             # Hide progress bar
             self.progress_bar.hide()
             self.progress_bar.setValue(0)
@@ -969,11 +1069,10 @@ class StormSim_Converter(Ui_MainWindow):
             else:
                 res = self.curr_database
             # Data Viewer (right) > Fill Table
-            self.h5: H5_Organized_New = self.dict3_name_to_h5[self.curr_database]
-            self.tableView_3.setModel( self.h5.get_dataset() )
-            self.tableView_3.resizeColumnsToContents()
+            self.h5: "H5_Organized_New" = self.dict3_name_to_h5[self.curr_database]
+            self.func_DVtable_set_model( self.h5.get_dataset() )
             # Data Viewer (left) > "Table" tab > "Filter" group > Fill "Variable" combobox, if applicable
-            self.var_min_max = deepcopy(self.h5.get_var_min_max())
+            self.var_min_max = self.func_min_max_to_Q( self.h5.get_var_min_max() )
             if self.var_min_max:
                 if_anyvars = len(self.var_min_max) > 0
                 self.comboBox_27.setEnabled(if_anyvars)
@@ -1131,11 +1230,40 @@ class StormSim_Converter(Ui_MainWindow):
         self.str_filters = ""
         self.str_stormIDs = ""
         self.plainTextEdit.setPlainText("")
+        self.filter_history = []
+        self.pushButton_105.setEnabled(False) # Disable "Undo" button
 
         self.is_resetting_vars = False
     
 
     
+    def func_DVtable_set_model(self, view: tuple):
+        """
+        Shows a dataset in Data Viewer (right). Column widths come from a sample of rows, not the whole dataset.
+
+        Parameters
+        ---
+        view: The current dataset as `(DataFrame, row positions)` (see `H5_Organized_New.get_view()`).
+        
+        GUI Location: Data Viewer (right)
+        """
+        from gui03_tablemodel import TableModel
+        model = TableModel(*view)
+        self.tableView_3.setModel( model )
+        if self.h5.is_truncated:
+            from code01_h5organize import LAZY_FILTER_MAX_ROWS
+            self.statusBar.showMessage( f"Data Viewer > Table > Showing the first {LAZY_FILTER_MAX_ROWS:,} filtered rows. "
+                                        "Add filters to narrow them down. \"Current\" exports all of them." )
+        fm_cell = self.tableView_3.fontMetrics()
+        fm_head = self.tableView_3.horizontalHeader().fontMetrics()
+        for j in range( model.columnCount(None) ):
+            texts = sorted( set(model.sample_column(j)), key=len )[-10:] # Measure the longest strings only.
+            w = max( [fm_head.horizontalAdvance( model.headerData(j, Qt.Orientation.Horizontal, Qt.ItemDataRole.DisplayRole) ) + 24]
+                     + [fm_cell.horizontalAdvance(t) + 12 for t in texts] )
+            self.tableView_3.setColumnWidth( j, min(w, 400) )
+    
+
+    
     def func_DVtable_export_current(self):
         """
         Exports the current state of Data Viewer (right). Only applies if any filters are added.
@@ -1146,7 +1274,12 @@ class StormSim_Converter(Ui_MainWindow):
         # Export storm ID dataset, if applicable.
         if self.h5.is_timeseries and self.is_stormid_applied: # If a storm ID is applied, not simply chosen.
             dataset_name += "_StormID_" + self.comboBox_62.currentText()
-        self.h5.get_data_current().to_csv(dataset_name + ".csv", index=False)
+        from code01_h5organize import EXPORT_FORMATS
+        fmt = self.comboBox_64.currentText().lower()
+        try:
+            self.h5.export_current( dataset_name + EXPORT_FORMATS[fmt], fmt )
+        except ImportError as e:
+            QMessageBox.warning( self.window, "Export Failed", str(e), QMessageBox.StandardButton.Ok, QMessageBox.StandardButton.Ok )
     
 
     
@@ -1156,10 +1289,25 @@ class StormSim_Converter(Ui_MainWindow):
         
         GUI Location: Data Viewer (left) > "Table" tab > "Full" button
         """
-        self.h5.export_csv()
+        try:
+            self.h5.export_data( self.comboBox_64.currentText().lower() )
+        except ImportError as e:
+            QMessageBox.warning( self.window, "Export Failed", str(e), QMessageBox.StandardButton.Ok, QMessageBox.StandardButton.Ok )
+            return
         self.pushButton_79.setEnabled(False) # Disable "Full" button
     
 
+    
+    def func_DVtable_change_format(self):
+        """
+        Re-enables the "Full" button, so the full dataset can also be exported in the new format.
+        
+        GUI Location: Data Viewer (left) > "Table" tab > Format dropdown
+        """
+        if hasattr(self, "h5"):
+            self.pushButton_79.setEnabled(True)
+    
+
     #
     # Data Viewer (left) > "Table" tab > "Filter" group > "Add" button
     #
@@ -1172,14 +1320,18 @@ class StormSim_Converter(Ui_MainWindow):
         #curr_database = self.comboBox_62.currentText()
         self.func_enable_reset_button( self.pushButton_57 ) # Activate "Clear All" button
         self.pushButton_39.setEnabled(False) # Disable "Add" button
+        is_stormID = self.h5.is_timeseries and self.comboBox_62.isEnabled()
+        # Save the state for "Undo".
+        self.filter_history.append( ("Storm ID" if is_stormID else self.comboBox_27.currentText(),
+                                     deepcopy(self.var_min_max), self.str_filters, self.str_stormIDs) )
+        self.pushButton_105.setEnabled(True) # Enable "Undo" button
         # If "Storm ID" is chosen.
-        if self.h5.is_timeseries and self.comboBox_62.isEnabled():
+        if is_stormID:
             stormID = self.comboBox_62.currentText()
-            self.tableView_3.setModel( self.h5.get_stormID_subset( int(stormID) ) )
-            self.tableView_3.resizeColumnsToContents() # Resize tableView
+            self.func_DVtable_set_model( self.h5.get_stormID_subset( int(stormID) ) )
             self.comboBox_62.setEnabled(False) # Don't use "Storm ID" again until "Clear All"
             self.is_stormid_applied = True
-            for var, min_and_max in self.h5.var_min_max_byID[stormID].items():
+            for var, min_and_max in self.func_min_max_to_Q( self.h5.var_min_max_byID[stormID] ).items():
                 self.var_min_max[var] = min_and_max
             # Update filter status.
             self.str_stormIDs = "Storm ID: " + stormID + "\n"
@@ -1196,8 +1348,7 @@ class StormSim_Converter(Ui_MainWindow):
             else:                      self.str_filters += "; "
             self.str_filters += f"{var}: [{new_min}, {new_max}]"
             # Implement filter
-            self.tableView_3.setModel( self.h5.set_filter( var, new_min, new_max, not self.is_stormid_applied ) )
-            self.tableView_3.resizeColumnsToContents()
+            self.func_DVtable_set_model( self.h5.set_filter( var, new_min, new_max ) )
             self.dataset_filters.append(var)
             # Adjust app to new min/max
             if is_date:
@@ -1220,20 +1371,11 @@ class StormSim_Converter(Ui_MainWindow):
             keys.remove(var)
         
             # Adjust variables' mins and maxs (minus current variable "var")
-            for v in keys:
-                x = self.h5.df_current[v]
-                # Check if entire column is "NaN"
-                try: all_nan = all(np.isnan( np.array(x, float) ))
-                except: all_nan = all([y == np.nan for y in x])
-                if all_nan:
+            for v, min_and_max in self.h5.get_current_min_max(keys).items():
+                if min_and_max is None: # Entire column is "NaN"
                     del self.var_min_max[v]
                 else:
-                    new_min = np.nanmin(x)
-                    new_max = np.nanmax(x)
-                    if v not in ["yyyymmddHHMM", "Landfall Time", "Peak Time"]:
-                        new_min = np.around( new_min, decimals=self.dec )
-                        new_max = np.around( new_max, decimals=self.dec )
-                    self.var_min_max[v] = [new_min, new_max]
+                    self.var_min_max[v] = self.func_min_max_to_Q( {v: min_and_max} )[v]
 
         self.plainTextEdit.setPlainText( self.str_stormIDs + self.str_filters )
         self.pushButton_81.setEnabled(True) # Enable "Current" button
@@ -1241,6 +1383,31 @@ class StormSim_Converter(Ui_MainWindow):
     
 
     
+    def func_DVtable_undo_filter(self):
+        """
+        Removes the last added filter. The dataset is recombined from the other filters, and the variable ranges go back to their state before the filter.
+        
+        GUI Location: Data Viewer (left) > "Table" tab > "Filter" group > "Undo" button
+        """
+        if not self.filter_history: return
+        kind, self.var_min_max, self.str_filters, self.str_stormIDs = self.filter_history.pop()
+        if kind == "Storm ID":
+            self.func_DVtable_set_model( self.h5.clear_stormID() )
+            self.is_stormid_applied = False
+        else:
+            self.func_DVtable_set_model( self.h5.undo_filter() )
+            self.dataset_filters.pop()
+        self.plainTextEdit.setPlainText( self.str_stormIDs + self.str_filters )
+        # Data Viewer (left) > "Table" tab > "Filter" group > Reset "Variable" combobox to the new ranges
+        if self.comboBox_27.currentIndex() == 0: self.func_DVtable_change_var()
+        else:                                    self.comboBox_27.setCurrentIndex(0)
+        if not self.filter_history:
+            self.pushButton_105.setEnabled(False) # Disable "Undo" button
+            self.pushButton_81.setEnabled(False)  # Disable "Current" button
+            self.func_disable_reset_button( self.pushButton_57 )
+    
+
+    
     def func_DVtable_clear_all_filters(self):
         """
         Removes all filters, resets the dataset to its original state.
@@ -1250,12 +1417,11 @@ class StormSim_Converter(Ui_MainWindow):
         self.is_changing_databases = True # Prevent self.func_DVtable_change_var() from running
         self.is_resetting_vars = True # Prevent self.func_DVtable_check_datetime() and self.func_DVtable_check_magnitude() from running
         # Reset variables
-        self.var_min_max = deepcopy(self.h5.get_var_min_max())
+        self.var_min_max = self.func_min_max_to_Q( self.h5.get_var_min_max() )
         self.will_apply_mag = False
         self.will_apply_date = False
         # Data Viewer (right) > Reset Table
-        self.tableView_3.setModel( self.h5.get_dataset() )
-        self.tableView_3.resizeColumnsToContents()
+        self.func_DVtable_set_model( self.h5.get_dataset() )
         # Data Viewer (left) > "Table" tab > "Filter" group > Reset "Variable" combobox
         self.comboBox_27.setCurrentIndex(0)
         # Data Viewer (left) > "Table" tab > "Filter" group > Reset "Date Range"
@@ -1286,6 +1452,8 @@ class StormSim_Converter(Ui_MainWindow):
         self.is_changing_databases = False
         self.is_resetting_vars = False
         self.pushButton_81.setEnabled(False) # Disable "Current" button
+        self.filter_history = []
+        self.pushButton_105.setEnabled(False) # Disable "Undo" button
         # Set status
         self.str_filters = ""
         self.str_stormIDs = ""
@@ -1300,10 +1468,12 @@ class StormSim_Converter(Ui_MainWindow):
         
         GUI Location: Data Viewer (left) > "Table" tab > "?" button
 		"""
-        txt = ("*Export Table > Full*: Exports the whole dataset. Available at all times.\n\n"
+        txt = ("*Export Table > Format*: CSV, Parquet or Feather. Parquet and Feather files are much smaller, faster to reload and keep the column types.\n\n"
+               + "*Export Table > Full*: Exports the whole dataset. Available at all times.\n\n"
                + "*Export Table > Current*: Exports the filtered or abridged state of the dataset.\n\n"
                + "*Filter section*: Filter by magnitude range, date range, or Storm ID (only for Timeseries data). Press Tab or click on another range to process your input.\n\n"
                + "*Add*: Disabled when range is already at min/max or no Storm ID is selected.\n\n"
+               + "*Undo*: Removes the last added filter and keeps the others.\n\n"
                + "*Clear All*: Reverts dataset & variable ranges back to initial state.")
         msgBox = QMessageBox.information( self.window, 
                                           "Selecting a Dataset",
@@ -1452,6 +1622,9 @@ class StormSim_Converter(Ui_MainWindow):
         msgBox = QMessageBox.information( self.window, "About to Plot", txt, QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No, QMessageBox.StandardButton.Yes )
         
         if msgBox == QMessageBox.StandardButton.Yes:
+            import plotly.express as px
+            import plotly.offline as po
+            from code05_downsample import DOWNSAMPLE_METHODS
             more_than_1 = len(self.plot_stormIDs) != 1
             # Save names for exporting file.
             self.active_var = self.comboBox_28.currentText()
@@ -1464,18 +1637,22 @@ class StormSim_Converter(Ui_MainWindow):
                 if a < b:
                     min_dt = a
                     max_dt = b
+            # Fast mode: Downsample the lines to the point budget and draw them with WebGL.
+            is_fast = self.comboBox_65.currentIndex() < len(DOWNSAMPLE_METHODS)
+            plot_kw = {"max_points": self.spinBox_1.value(), "method": DOWNSAMPLE_METHODS[self.comboBox_65.currentIndex()]} if is_fast else {}
+            render_mode = "webgl" if is_fast else "auto"
             # Graph here
             if self.h5.is_timeseries:
-                df = self.h5.get_plot_data( self.active_var, min_dt, max_dt, stormIDs=self.plot_stormIDs, only_one_dt=self.only_one_dt )
+                df = self.h5.get_plot_data( self.active_var, min_dt, max_dt, stormIDs=self.plot_stormIDs, only_one_dt=self.only_one_dt, **plot_kw )
                 title = self.active_var + (" for Storm IDs " if more_than_1 else " for Storm ID ") + self.active_sID
                 if more_than_1:
-                    self.fig = px.line( df, x="Time Step", y=self.active_var, color="Storm ID", title=title, hover_data=['Date-Time'] )
+                    self.fig = px.line( df, x="Time Step", y=self.active_var, color="Storm ID", title=title, hover_data=['Date-Time'], render_mode=render_mode )
                     self.fig.update_layout(hovermode="x") # Modify graph tooltip here
                 elif self.only_one_dt:
-                    self.fig = px.line( df, x="Storm ID", y=self.active_var, title=title )
+                    self.fig = px.line( df, x="Storm ID", y=self.active_var, title=title, render_mode=render_mode )
                     self.fig.update_layout(hovermode="x") # Modify graph tooltip here
                 else:
-                    self.fig = px.line( df, x="Date-Time", y=self.active_var, title=title )
+                    self.fig = px.line( df, x="Date-Time", y=self.active_var, title=title, render_mode=render_mode )
                     self.fig.update_layout(hovermode="x") # Modify graph tooltip here
                 # Name
                 t1 = "Timestep x " if more_than_1 else "Datetime x "
@@ -1483,12 +1660,12 @@ class StormSim_Converter(Ui_MainWindow):
                 title = t1 + self.active_var + " (Storm ID" + t2 + self.active_sID + ") for " + self.curr_database #self.comboBox_62.currentText()
             
             else:
-                df = self.h5.get_plot_data( self.active_var, min_dt, max_dt, only_one_dt=self.only_one_dt )
+                df = self.h5.get_plot_data( self.active_var, min_dt, max_dt, only_one_dt=self.only_one_dt, **plot_kw )
                 title = self.active_var
                 if self.only_one_dt:
-                    self.fig = px.line( df, x="Storm ID", y=self.active_var, title=title )
+                    self.fig = px.line( df, x="Storm ID", y=self.active_var, title=title, render_mode=render_mode )
                 else:
-                    self.fig = px.line( df, x="Date-Time", y=self.active_var, title=title )
+                    self.fig = px.line( df, x="Date-Time", y=self.active_var, title=title, render_mode=render_mode )
                 self.fig.update_layout(hovermode="x") # Modify graph tooltip here
                 # Filename
                 title = "Datetime x " + self.active_var + " for " + self.curr_database #self.comboBox_62.currentText()
@@ -1508,7 +1685,18 @@ class StormSim_Converter(Ui_MainWindow):
             # Change state
             self.state_2x2A_justplot = True
             self.state_2x2B_aplot = True
-            chime.success()
+            func_chime("success")
+    
+
+    
+    def func_DVplot_change_mode(self):
+        """
+        Enables the point budget for the fast plotting modes only.
+
+        GUI Location: Data Viewer (left) > "Graph" tab > Plotting mode combobox
+        """
+        from code05_downsample import DOWNSAMPLE_METHODS
+        self.spinBox_1.setEnabled( self.comboBox_65.currentIndex() < len(DOWNSAMPLE_METHODS) )
     
 
     
@@ -1519,6 +1707,7 @@ class StormSim_Converter(Ui_MainWindow):
         GUI Location: Data Viewer (left) > "Graph" tab > "?" button
         """
         txt = "Must choose a variable to plot! Date range is optional.\nTimeseries only: Must also choose at least one Storm ID! Date range only works for one Storm ID."
+        txt += "\n\nFast modes keep the shape of each line with at most the chosen number of points (LTTB: overall shape; Min/Max: every peak) and draw it with WebGL, so large graphs open quickly. Points with missing values are skipped. Choose \"All points\" to plot every point."
         msgBox = QMessageBox.information( self.window, 
                                           "Selecting a Dataset", 
                                           txt, 
@@ -1572,7 +1761,7 @@ class StormSim_Converter(Ui_MainWindow):
         self.dateTimeEdit_21.setEnabled(not more_than_1)
         self.dateTimeEdit_22.setEnabled(not more_than_1)
         if len(self.plot_stormIDs) == 1:
-            min, max = self.h5.var_min_max_byID[ self.comboBox_63.currentText() ]["yyyymmddHHMM"]
+            min, max = self.func_min_max_to_Q( self.h5.var_min_max_byID[ self.comboBox_63.currentText() ] )["yyyymmddHHMM"]
             self.dateTimeEdit_21.setDateTimeRange(min, max)
             self.dateTimeEdit_21.setDateTime(min)
             self.dateTimeEdit_22.setDateTimeRange(min, max)
@@ -1672,7 +1861,7 @@ class StormSim_Converter(Ui_MainWindow):
         GUI Location: Data Viewer (left) > "Graph" tab > "Reset" button
         """
         if len(self.plot_stormIDs) == 1:
-            min, max = self.h5.var_min_max_byID[ self.comboBox_63.currentText() ]["yyyymmddHHMM"]
+            min, max = self.func_min_max_to_Q( self.h5.var_min_max_byID[ self.comboBox_63.currentText() ] )["yyyymmddHHMM"]
         else:
             min, max = self.var_min_max["yyyymmddHHMM"] # Sync with Table view
         self.dateTimeEdit_21.setDateTimeRange(min, max)
@@ -1694,6 +1883,16 @@ if __name__ == '__main__':
     win = QMainWindow()
     ui = StormSim_Converter(win)
     win.show()
-    time.sleep(1)
     splash.finish(win)
+    app.processEvents()
+    # Time-to-window: From launch to the window showing, before the heavy packages are imported.
+    t_window = time.perf_counter() - t_boot
+    print(f"Window shown in {t_window:.2f} s.")
+    if t_window > BOOT_BUDGET:
+        print(f"WARNING: Booting took longer than {BOOT_BUDGET:.1f} s.")
+    # Benchmark of the boot (see `code07_benchmark.py`): Report the time-to-window and quit.
+    if os.environ.get("CHS_BOOT_ONLY") == "1":
+        print( json.dumps({"boot_seconds": t_window, "budget": BOOT_BUDGET}), flush=True )
+        sys.exit(0)
+    QTimer.singleShot( 0, ui.func_finish_boot )
     sys.exit( app.exec() )
\ No newline at end of file
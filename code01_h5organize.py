@@ -1,19 +1,25 @@
 """
-StormSim: File 1
+StormSim: File 2
 ===
-Converts specific HDF5 files from CHS databse.
+HDF5 converter
 
 About
 ---
 code01_h5organize.py: Handles conversion for a file.
 
+The converter never imports Qt, so it runs on machines without PySide6 and can be imported as a library:
+`convert(fpath)` returns the datasets of an HDF5 file and `export(dataset, fmt, dest)` writes one. The GUI wraps
+datasets in its own table model (see `gui03_tablemodel.py`).
+
 Author
 ---
 Code by Jared Hidalgo. 
 """
-import itertools, os, pickle, shutil, sys, time
+import contextlib, io, json, os, shutil, sys, tempfile, threading, time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from copy import deepcopy
-from zipfile import ZipFile
+from zipfile import ZipFile, ZIP_STORED
 from datetime import timedelta
 from subprocess import Popen
 from platform import system
@@ -28,13 +34,39 @@ open_directory = od_dict[system()] if system() in od_dict else "xdg-open"
 import h5py
 import numpy as np
 import pandas as pd
-from PySide6.QtCore import (Qt, QAbstractTableModel, QDateTime, Signal)
+
+from code03_cache import func_cache_enabled, func_cache_key, func_cache_load, func_cache_put, func_cache_release
+from code04_stats import ColumnStats, ReadFilter, func_build_indexes, func_column_stats, func_merge_stats, func_parse_filter
+from code05_downsample import func_downsample, func_split_budget
+from code08_progress import Progress, func_format_rate
 
 
 
 DIR_RESULTS = f"{os.sep}".join( __file__.split( os.sep )[:-2] )
-# For command line.
-SPACES = "".join([" "]*20)
+# For parallel conversion (CMD method): Estimated peak memory of a conversion as a multiple of the HDF5 file size.
+MEM_PER_FILE_FACTOR = 6
+# For importing (GUI method): Memory budget of the imported datasets as a fraction of the available memory.
+# Can be changed with the environment variable `CHS_MEMORY_BUDGET` (in GB). See `func_memory_budget()`.
+MEMORY_BUDGET_FRACTION = 0.5
+# Memory estimates (see `func_estimate_memory()`): Bytes of one converted number and of one converted string, and the
+# peak memory of a conversion as a multiple of the values in the HDF5 file (reshaped tables, copies while assembling the
+# DataFrame, sorted indexes). Measured up to 4 times on AEF files.
+MEM_BYTES_NUMBER = 8
+MEM_BYTES_STRING = 64
+MEM_CONVERT_FACTOR = 4
+# For ZIP files: Compressed HDF5 files up to this size (in MB) are decompressed into memory, larger ones into a temporary file.
+# Can be changed with the environment variable `CHS_ZIP_MEMORY_LIMIT` or `--zip-memory-limit` (CMD method).
+ZIP_MEMORY_LIMIT = 1024
+# Output formats of exported datasets and their file extensions. Parquet and Feather require `pyarrow`.
+EXPORT_FORMATS = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+# Parquet: Compression codec and number of rows per row group.
+PARQUET_COMPRESSION = "zstd"
+PARQUET_ROW_GROUP_SIZE = 1_000_000
+# Number of filtered rows copied at a time when exporting the current dataset.
+EXPORT_CHUNK_ROWS = 1_000_000
+# Lazy Timeseries datasets (GUI method): Most filtered rows read into memory. Larger selections show their first rows only
+# and are exported one storm at a time. See `H5_Organized_New._select_lazy()`.
+LAZY_FILTER_MAX_ROWS = 2_000_000
 # Categories of units to add.
 D_UNITS = {"Save Point Latitude": "Latitude Units",
            "Save Point Longitude": "Longitude Units",
@@ -50,49 +82,430 @@ D_COLTYPES = {"Save Point ID": int,
 
 
 
-#
-# Make a custom model for the QTableView window.
-#
-class TableModel(QAbstractTableModel):
+def func_decode_yyyymmddHHMM(arr: np.ndarray) -> pd.DatetimeIndex:
     """
-    Convert dataset to a displayable format for Data Viewer (right).
+    Decode float-encoded date-times (ex. `200001311830.0`) into UTC date-times with array arithmetic.
+
+    Malformed values (NaN, fractions, impossible dates, out of range) become `NaT`, like `pd.to_datetime(..., format="%Y%m%d%H%M.0", errors='coerce')`.
     """
+    v = np.asarray(arr, dtype=float)
+    ok = np.isfinite(v) & (v == np.floor(v)) & (v >= 1e11) & (v < 1e12) # 12 digits
+    i = np.where(ok, v, 0).astype(np.int64)
+    # Split digits.
+    Y = i // 10**8
+    M = i // 10**6 % 100
+    D = i // 10**4 % 100
+    H = i // 10**2 % 100
+    m = i % 100
+    ok &= (Y >= 1677) & (Y <= 2262) & (M >= 1) & (M <= 12) & (D >= 1) & (H <= 23) & (m <= 59)
+    Y = np.where(ok, Y, 1970); M = np.where(ok, M, 1)
+    # Check the number of days in the month.
+    months = ((Y - 1970) * 12 + M - 1).astype("datetime64[M]")
+    ok &= D <= ((months + 1).astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64)
+    # Build date-times in minutes, then keep the range of datetime64[ns].
+    t = months.astype("datetime64[m]") + (D - 1).astype("timedelta64[D]") + H.astype("timedelta64[h]") + m.astype("timedelta64[m]")
+    ok &= (t >= np.datetime64(pd.Timestamp.min.ceil("min"))) & (t <= np.datetime64(pd.Timestamp.max.floor("min")))
+    t = t.astype("datetime64[ns]")
+    t[~ok] = np.datetime64("NaT")
+    return pd.DatetimeIndex(t).tz_localize("UTC")
+
+
+
+def func_hours_to_timedelta(arr: np.ndarray) -> np.ndarray:
+    """
+    Convert float hours into `timedelta64[ns]` with array arithmetic. NaN becomes `NaT`.
 
-    def __init__(self, data, parent=None, *args):
-        QAbstractTableModel.__init__(self, parent, *args)
-        self._data: pd.DataFrame = data
-        """The original DataFrame"""
-    
-    def rowCount(self, index):
-        return len(self._data.index)
-    
-    def columnCount(self, index):
-        return len(self._data.columns)
+    Rounds like `pd.Timedelta(hours=x)`: `hours * 3600 * 1e9` truncated to whole nanoseconds.
+    """
+    h = np.asarray(arr, dtype=float)
+    ok = np.isfinite(h)
+    td = (np.where(ok, h, 0) * 3600 * 1e9).astype(np.int64).astype("timedelta64[ns]")
+    td[~ok] = np.timedelta64("NaT")
+    return td
+
+
+
+@contextlib.contextmanager
+def func_open_h5(fpath: str):
+    """
+    Open an HDF5 file for reading, including an HDF5 file inside a ZIP file, without extracting it to a directory.
+
+    * Stored (uncompressed) HDF5 files are read straight out of the ZIP file.
+    * Compressed HDF5 files are decompressed into memory, or into a temporary file if larger than `ZIP_MEMORY_LIMIT` MB.
+
+    Parameters
+    ---
+    fpath: The complete filepath of the HDF5 file. ZIP references use `[ZIP filepath];[HDF5 filepath in ZIP]`.
+    """
+    if ";" not in fpath:
+        with h5py.File( fpath, 'r' ) as h5:
+            yield h5
+        return
+
+    fs = fpath.split(";")
+    limit = float( os.environ.get("CHS_ZIP_MEMORY_LIMIT", ZIP_MEMORY_LIMIT) ) * 1024**2
+    with contextlib.ExitStack() as stack:
+        z = stack.enter_context( ZipFile(fs[0]) )
+        info = z.getinfo(fs[1])
+        if info.compress_type == ZIP_STORED:
+            f = stack.enter_context( z.open(info) )
+        elif info.file_size <= limit:
+            f = io.BytesIO( z.read(info) )
+        else:
+            f = stack.enter_context( tempfile.TemporaryFile(prefix="CHS_", suffix=".h5") )
+            with z.open(info) as r:
+                shutil.copyfileobj(r, f, 16 * 1024**2)
+            f.seek(0)
+        h5 = stack.enter_context( h5py.File( f, 'r' ) )
+        yield h5
+
+
+
+class StreamWriter:
+    """
+    Appends DataFrames to one CSV, Parquet or Feather file, so a dataset can be exported one part at a time.
+
+    The first DataFrame sets the columns (and the column types for Parquet/Feather). Later DataFrames follow its layout.
+    """
+
+    def __init__(self, fpath: str, fmt: str = "csv"):
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}.")
+        self.fpath = fpath
+        self.fmt = fmt
+        self.columns = None
+        self.schema = None
+        self.writer = None
+        self.pending = [] # Parquet: Small DataFrames (ex. one storm each) are collected into full row groups.
+        if fmt == "csv":
+            self.file = open(fpath, "w", newline="")
+        else:
+            try:
+                import pyarrow as pa
+            except ImportError:
+                raise ImportError(f"Exporting to {fmt.capitalize()} requires the package 'pyarrow'.")
+            self.pa = pa
     
-    def data(self, index, role):
+    def write(self, df: pd.DataFrame):
         """
-        Set format for data object.
+        Append a DataFrame to the file.
         """
-        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
-            value = self._data.iloc[index.row(), index.column()]
-            if isinstance(value, pd.Timestamp):
-                return value.strftime("%m/%d/%Y, %I:%M %p")
+        if self.columns is None:
+            self.columns = list(df.columns)
+        else:
+            df = df.reindex( columns=self.columns )
+
+        if self.fmt == "csv":
+            df.to_csv( self.file, index=False, header=self.writer is None )
+            self.writer = self.file
+            return
+
+        # Parquet/Feather: Keep integer IDs, floats, UTC date-times and strings as their own types.
+        table = self.pa.Table.from_pandas( df, schema=self.schema, preserve_index=False )
+        if self.writer is None:
+            self.schema = table.schema
+            if self.fmt == "parquet":
+                import pyarrow.parquet as pq
+                self.writer = pq.ParquetWriter( self.fpath, self.schema, compression=PARQUET_COMPRESSION )
             else:
-                return str(value)
-        return None
+                options = self.pa.ipc.IpcWriteOptions( compression="zstd" )
+                self.writer = self.pa.ipc.new_file( self.fpath, self.schema, options=options ) # Feather V2 = Arrow IPC file.
+        if self.fmt == "parquet":
+            self.pending.append(table)
+            if sum(t.num_rows for t in self.pending) >= PARQUET_ROW_GROUP_SIZE:
+                self._flush()
+        else:
+            self.writer.write_table( table )
+    
+    def _flush(self):
+        """Parquet: Write the collected DataFrames as row groups."""
+        if self.pending:
+            self.writer.write_table( self.pa.concat_tables(self.pending), row_group_size=PARQUET_ROW_GROUP_SIZE )
+            self.pending = []
     
-    def headerData(self, section, orientation, role):
+    def close(self):
         """
-        Get headers.
+        Close the file.
         """
-        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
-            return str(self._data.columns[section])
+        if self.fmt == "csv":
+            self.file.close()
+        elif self.writer is not None:
+            if self.fmt == "parquet": self._flush()
+            self.writer.close()
     
-    def flags(self, index):
+    def abort(self):
         """
-        Set flags for each element.
+        Close the file and delete it, so a failed export never looks finished.
         """
-        return QAbstractTableModel.flags(self, index) | Qt.ItemFlag.ItemIsSelectable
+        self.pending = []
+        with contextlib.suppress(Exception): # The error that failed the export is the one to report.
+            self.close()
+        if os.path.isfile(self.fpath): os.remove(self.fpath)
+
+
+
+def func_write_dataset(df: pd.DataFrame, fpath: str, fmt: str = "csv"):
+    """
+    Write a dataset to a CSV, Parquet or Feather file.
+
+    Parameters
+    ---
+    df: The dataset.
+    fpath: The filepath of the file.
+    fmt: The output format. One of `EXPORT_FORMATS`.
+    """
+    if fmt == "csv":
+        df.to_csv( fpath, index=False )
+        return
+    writer = StreamWriter( fpath, fmt )
+    try:
+        writer.write(df)
+        writer.close()
+    except BaseException:
+        writer.abort()
+        raise
+
+
+
+def func_timeseries_rows(group: h5py.Group, attrs: dict, start: int, read_filter: ReadFilter = None) -> pd.DataFrame:
+    """
+    Timeseries only: Build the rows of one storm (HDF5 group), sorted by date-time.
+
+    Parameters
+    ---
+    group: The HDF5 group of the storm.
+    attrs: The file and group attributes (one value each), repeated on every row.
+    start: The row number of the first row.
+    read_filter: Rows and columns to keep. Unselected datasets are never read. With a date-time window, the date-times are read first and the other datasets are only read over the span of the window.
+    """
+    n = list(group.values())[0].shape[0] # list(group.values()) = list of datasets
+    t = func_decode_yyyymmddHHMM( group["yyyymmddHHMM"][:] )
+    rows = slice(0, n)
+    mask = None if read_filter is None else read_filter.time_mask(t)
+    if mask is not None:
+        idx = np.flatnonzero(mask)
+        rows = slice(int(idx[0]), int(idx[-1]) + 1) if len(idx) else slice(0, 0)
+    m = rows.stop - rows.start
+    df1 = {key:np.repeat(val, m) for key, val in attrs.items()}
+    dfL = {dataset:col.astype(float)[rows] for dataset, col in group.items()
+           if dataset != "yyyymmddHHMM" and (read_filter is None or read_filter.read_column(dataset))}
+    dfT = {"yyyymmddHHMM":t[rows]}
+    df = pd.DataFrame( df1|dfL|dfT, index = range(start + rows.start, start + rows.stop) ).sort_values(by=["yyyymmddHHMM"])
+    return df if read_filter is None else read_filter.apply(df)
+
+
+
+def func_merge_groups(dfs: list[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Timeseries only: Join the groups of one Storm ID, in file order, and sort them by date-time. Equal date-times keep
+    the file order, as in the full dataset (see `_v1_Timeseries()`).
+    """
+    if len(dfs) == 1: return dfs[0]
+    return pd.concat(dfs).sort_values(by=["yyyymmddHHMM"], kind="stable")
+
+
+
+def func_storm_offsets(spans: list[tuple[int, int]]) -> dict[int, tuple[int, int]]:
+    """
+    Timeseries only: Get the row positions of each storm in the full dataset, from the Storm ID and number of rows of each
+    converted group in file order. The full dataset holds the groups stably sorted by Storm ID, so each storm is one slice.
+
+    Returns a dictionary of Storm ID -> `(start, stop)`, in Storm ID order.
+    """
+    res = {}
+    pos = 0
+    for sID, n in sorted(spans, key=lambda x: x[0]):
+        res[sID] = (res[sID][0] if sID in res else pos, pos + n) # Groups sharing a Storm ID are next to each other.
+        pos += n
+    return res
+
+
+
+class LazyTimeseries:
+    """
+    Timeseries only: The full dataset of a Timeseries file, read from the HDF5 file one storm at a time.
+
+    Only the storm index (Storm ID, HDF5 group, first row) and each storm's attributes are kept. Recently used storms are
+    kept in a cache of `CACHE_STORMS` storms, and the `PREFETCH` neighbouring Storm IDs of a requested storm are read
+    in the background.
+    """
+    CACHE_STORMS = 16
+    """Number of storms kept in memory. Least recently used storms are dropped first."""
+    PREFETCH = 2
+    """Number of neighbouring Storm IDs on each side read in the background."""
+
+    def __init__(self, fpath: str, storms: list[tuple[int, str, int, dict]], columns: list[str], h5: h5py.File = None,
+                 stats: dict[int, dict[str, ColumnStats]] = None, read_filter: ReadFilter = None):
+        """
+        Parameters
+        ---
+        fpath: The complete filepath of the HDF5 file. ZIP references use `[ZIP filepath];[HDF5 filepath in ZIP]`.
+        storms: `(Storm ID, HDF5 group name, first row, attributes)` of every storm, in order of Storm ID.
+        columns: The columns of the dataset.
+        h5: The HDF5 file, if already open (ex. during conversion). Released with `close()`.
+        stats: Statistics of each variable per Storm ID. Lets range filters skip the storms that can't match.
+        read_filter: Rows to keep from each storm (see `ReadFilter`).
+        """
+        self.fpath = fpath
+        self.storms = storms
+        self.columns = columns
+        self.stats = stats or {}
+        self.read_filter = read_filter
+        self.stormIDs = np.unique([x[0] for x in storms])
+        self._init_runtime(h5)
+
+    def _init_runtime(self, h5: h5py.File = None):
+        """Set the parts that are never pickled: the open HDF5 file, the cache and the prefetch thread."""
+        self._h5 = h5
+        self._stack = None
+        self._lock = threading.Lock()
+        """Guards the cache."""
+        self._io_lock = threading.RLock()
+        """Guards the HDF5 file."""
+        self._cache = OrderedDict()
+        """Storm ID -> DataFrame"""
+        self._pending = {}
+        """Storm ID -> Future of its prefetch, while queued or being read. Guarded by `_lock`."""
+        self._pool = None
+
+    def __getstate__(self):
+        return {k: v for k, v in self.__dict__.items() if k in ["fpath", "storms", "columns", "stormIDs", "stats", "read_filter"]}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_runtime()
+
+    def __len__(self):
+        return len(self.storms)
+
+    def _file(self) -> h5py.File:
+        """Open the HDF5 file on first use."""
+        with self._io_lock:
+            if self._h5 is None:
+                self._stack = contextlib.ExitStack()
+                self._h5 = self._stack.enter_context( func_open_h5(self.fpath) )
+            return self._h5
+
+    def _read(self, stormID: int) -> pd.DataFrame:
+        """Read the rows of one Storm ID from the HDF5 file."""
+        with self._io_lock:
+            h5 = self._file()
+            dfs = [func_timeseries_rows(h5[name], attrs, start, self.read_filter) for sID, name, start, attrs in self.storms if sID == stormID]
+        return func_merge_groups(dfs) if dfs else pd.DataFrame(columns=self.columns)
+
+    def _load(self, stormID: int) -> pd.DataFrame:
+        """Get the rows of one Storm ID from the cache or the HDF5 file. A storm being prefetched is waited for, not read twice."""
+        df, future = self._cached(stormID)
+        if df is None and future is not None:
+            with contextlib.suppress(Exception): # A failed prefetch is read again below, which reports the error.
+                future.result()
+            df, _ = self._cached(stormID)
+        if df is None:
+            df = self._read(stormID)
+            self._store(stormID, df)
+        return df
+
+    def _cached(self, stormID: int):
+        """Get the cached rows of one Storm ID (or `None`) and the Future of its prefetch (or `None`)."""
+        with self._lock:
+            df = self._cache.get(stormID)
+            if df is not None: self._cache.move_to_end(stormID)
+            return df, self._pending.get(stormID)
+
+    def _store(self, stormID: int, df: pd.DataFrame):
+        """Add the rows of one Storm ID to the cache. Least recently used storms are dropped."""
+        with self._lock:
+            self._cache[stormID] = df
+            while len(self._cache) > self.CACHE_STORMS:
+                self._cache.popitem(last=False)
+
+    def _prefetch(self, stormID: int):
+        """Read the neighbouring Storm IDs in the background. Storms cached or already queued are skipped."""
+        i = int(np.searchsorted(self.stormIDs, stormID))
+        for j in [*range(i+1, i+1+self.PREFETCH), *range(i-1, i-1-self.PREFETCH, -1)]:
+            if not 0 <= j < len(self.stormIDs): continue
+            sID = int(self.stormIDs[j])
+            with self._lock:
+                if sID in self._cache or sID in self._pending: continue
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=1)
+                # Registered under the lock, so the prefetch can't finish (and unregister) before.
+                self._pending[sID] = self._pool.submit( self._prefetch_one, sID )
+
+    def _prefetch_one(self, stormID: int):
+        """Prefetch thread: Read one Storm ID into the cache, unless it was read meanwhile."""
+        try:
+            with self._lock:
+                if stormID in self._cache: return
+            self._store( stormID, self._read(stormID) )
+        finally:
+            with self._lock:
+                self._pending.pop(stormID, None)
+
+    def get_storm(self, stormID: int) -> pd.DataFrame:
+        """
+        Get the rows of one Storm ID. Don't modify the DataFrame in place: it's shared with the cache.
+        """
+        df = self._load(int(stormID))
+        self._prefetch(int(stormID))
+        return df
+
+    def get_storms(self, stormIDs: list[int]) -> pd.DataFrame:
+        """
+        Get the rows of several Storm IDs, in order of Storm ID.
+        """
+        dfs = [self._load(int(sID)) for sID in sorted(set(int(x) for x in stormIDs))]
+        return pd.concat(dfs) if dfs else pd.DataFrame(columns=self.columns)
+
+    def iter_storms(self, stormIDs: list[int] = None):
+        """
+        Read every storm (or the storms of `stormIDs`) in order of Storm ID, one at a time. Cached storms are reused, but
+        storms read here are never cached, so a full scan doesn't push out the storms being viewed.
+        """
+        for sID in (self.stormIDs if stormIDs is None else stormIDs):
+            with self._lock:
+                df = self._cache.get(int(sID))
+            yield df if df is not None else self._read(int(sID))
+
+    def get_stormIDs_in_range(self, var: str, lo, hi) -> list[int]:
+        """
+        Get the Storm IDs which may have values of `var` within `[lo, hi]`, from the statistics of each storm.
+        """
+        if not self.stats: return list(self.stormIDs)
+        return [sID for sID in self.stormIDs if sID not in self.stats or (var in self.stats[sID] and self.stats[sID][var].overlaps(lo, hi))]
+
+    def select(self, func, stormIDs: list[int] = None) -> pd.DataFrame:
+        """
+        Apply a row filter to every storm (or the storms of `stormIDs`) and join the results.
+
+        Parameters
+        ---
+        func: Function from the DataFrame of a storm to its selected rows.
+        stormIDs: The Storm IDs to read. Default: all.
+        """
+        dfs = [func(df) for df in self.iter_storms(stormIDs)]
+        return pd.concat(dfs) if dfs else pd.DataFrame(columns=self.columns)
+
+    def load_all(self) -> pd.DataFrame:
+        """
+        Read the whole dataset into one DataFrame.
+        """
+        return self.select(lambda df: df)
+
+    def close(self):
+        """
+        Stop the prefetch thread, empty the cache and close (or release) the HDF5 file.
+        """
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        with self._lock:
+            self._cache.clear()
+        with self._io_lock:
+            if self._stack is not None:
+                self._stack.close()
+                self._stack = None
+            self._h5 = None
 
 
 
@@ -102,8 +515,6 @@ class H5_Organized_New:
     """
     Ultimate class to store data from a CHS HDF5 file into a table format (aka a dataset).
     """
-    setCurrentProgress = Signal(int)
-    success = Signal(int)
     dec = 6
 
     has_datetime = False
@@ -111,8 +522,22 @@ class H5_Organized_New:
     is_plottable = False
     is_aef_special = False
     is_locations = False
+    is_streamed = False
+    is_lazy = False
+    export_format = "csv"
+    read_filter = None
     more_steps = 0
+    progress: Progress = None
+    """Progress of the running conversion (see `code08_progress.py`). Never pickled."""
     h5s = None
+    indexes = None
+    """GUI only: Sorted indexes of the filterable columns of the full (Timeseries) or normal dataset. See `SortedIndex`."""
+    positions = None
+    """Row positions of the current dataset in `df_current`, after filters. `None` if not filtered."""
+    is_truncated = False
+    """Lazy Timeseries only: The current dataset only holds the first `LAZY_FILTER_MAX_ROWS` filtered rows."""
+    storm_offsets = None
+    """Timeseries only: Storm ID -> `(start, stop)` row positions of the storm in `df_full`. See `func_storm_offsets()`."""
     
     df_current: pd.DataFrame
     df_full: pd.DataFrame
@@ -124,20 +549,33 @@ class H5_Organized_New:
         """Initialize class without conversion."""
         pass
 
+    def __getstate__(self):
+        """Pickle everything but the progress of the conversion."""
+        return {k: v for k, v in self.__dict__.items() if k != "progress"}
 
 
-    def run(self, fpath: str, will_export: bool, is_cmd: bool):
+
+    def run(self, fpath: str, will_export: bool, is_cmd: bool, export_format: str = "csv", lazy: bool = None, read_filter: ReadFilter = None,
+            progress: Progress = None):
         """
         First function to process the HDF5 file. 
         
-        If in ZIP file, a temporary HDF5 file will be extracted to the "Extracted" subdirectory.
+        If in ZIP file, the HDF5 file is read from the ZIP file directly (see `func_open_h5()`).
 
         Parameters
         ---
         fpath: The complete filepath of the HDF5 file.
         will_export: Boolean for exporting the dataset right after conversion.
         is_cmd: Boolean for running this file from the command line (`True`) or the GUI (`False`).
+        export_format: Output format of the exported dataset. One of `EXPORT_FORMATS`.
+        lazy: Timeseries files only: Read storms when needed instead of holding the full dataset. Default: the GUI method only.
+        read_filter: Storm IDs, date-time window, variable ranges and variables to keep, applied while reading (see `ReadFilter`). Default: all rows and columns.
+        progress: Reporter of the progress of the conversion (see `code08_progress.py`). Default: a new one.
         """
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError(f"Unknown export format '{export_format}'. Choose from: {', '.join(EXPORT_FORMATS)}.")
+        self.export_format = export_format
+        self.read_filter = read_filter if (read_filter is not None and read_filter.is_active) else None
         self.df_normal = {}
         self.fpath = fpath
         x = fpath.split(";")[1] if ";" in fpath else fpath
@@ -145,6 +583,7 @@ class H5_Organized_New:
         self.export = will_export
         self.is_cmd = is_cmd
         self.end_print = "\r" if is_cmd else "\n" # NOTE: Test if we only need "\r".
+        self.progress = progress or Progress( os.path.basename(x), self.end_print )
 
         if will_export and not is_cmd: self.more_steps = 2  #    Exporting from GUI.
         elif will_export or not is_cmd: self.more_steps = 1 # 1) Exporting from CMD. 2) Only importing to GUI.
@@ -154,15 +593,33 @@ class H5_Organized_New:
         self.fileType = f_split[-1]
         self.is_timeseries = self.fileType == "Timeseries"
         self.is_plottable = self.fileType in ["Peaks", "Timeseries"]
+        self.is_lazy = self.is_timeseries and (not is_cmd if lazy is None else lazy)
+
+        with func_open_h5(fpath) as h5:
+            self._run_h5(h5, f_split)
+            if isinstance(self.__dict__.get("df_full"), LazyTimeseries):
+                self.df_full.close() # Release the HDF5 file. It's opened again when a storm is needed.
+        if not is_cmd and not self.is_lazy:
+            for obj in (self.h5s or [self]):
+                obj._build_indexes()
+            self._status(stage="index")
 
-        if ";" in fpath:
-            fs = fpath.split(";")
-            with ZipFile(fs[0]) as z:
-                z.extract(fs[1], path="Extracted")
-            f = "Extracted" + os.sep + fs[1]
-        else:
-            f = fpath
-        h5 = h5py.File( f, 'r' )
+
+
+    def _build_indexes(self):
+        """
+        GUI only: Sort the filterable columns once, so filters are binary searches (see `set_filter()`).
+        """
+        df = self.df_full if self.is_timeseries else self.df_normal
+        if isinstance(df, pd.DataFrame) and getattr(self, "var_min_max", None):
+            self.indexes = func_build_indexes( df, list(self.var_min_max) )
+
+
+
+    def _run_h5(self, h5: h5py.File, f_split: list[str]):
+        """
+        Route the opened HDF5 file to its converter.
+        """
 
         # Extract info.
         fileKeys = list(h5.keys())
@@ -204,14 +661,6 @@ class H5_Organized_New:
             # CASE 8 | UNIVERSAL SETTINGS: ID7 = [STcond, Params, Peaks, AEP]
             else:
                 self._v1_Universal(list(fileVals), fileAttrs, has_groups, first_val, sZ)
-        
-        # Finish.
-        h5.close()
-        if ";" in self.fpath:
-            os.remove(f) # Remove extracted HDF5 file.
-            if is_cmd:
-                shutil.rmtree("Extracted") # Remove temporary folder.
-            
 
 
     
@@ -222,26 +671,28 @@ class H5_Organized_New:
         * ID 7: `AEF`, `AEFcond`
         """
         sizeH = h5["Best Estimate AEF"].shape
-        headers = ["ADCIRC Node ID", "AEF Value", *fileKeys[2:]]
-        print(f"LENGTH: {len(headers) + self.more_steps}")
+        headers = ["ADCIRC Node ID", "AEF Value", *[x for x in fileKeys[2:] if self._read_column(x)]]
+        self._length(len(headers) + self.more_steps)
         self.df_normal["ADCIRC Node ID"] = np.repeat( np.array( h5["ADCIRC Node IDs"], dtype=int ), sizeH[1] )
-        print("STATUS: 1", end=self.end_print)
+        self._status(1, nbytes=self.df_normal["ADCIRC Node ID"].nbytes)
         self.df_normal["AEF Value"] = np.tile( h5["AEF Values"][0], sizeH[0] )
-        print("STATUS: 2", end=self.end_print)
-        for i, col in enumerate(fileKeys[2:]):
+        self._status(2, nbytes=self.df_normal["AEF Value"].nbytes)
+        for i, col in enumerate(headers[2:]):
             self.df_normal[col] = np.array( h5[col] ).flatten()
-            print(f"STATUS: {i+3}", end=self.end_print)
+            self._status(i+3, nbytes=self.df_normal[col].nbytes)
+        
+        self.df_normal = self._filter_rows(self.df_normal)
+        self._status(stage="assemble", rows=sizeH[0] * sizeH[1])
         
         # Manage global mins and maxes.
         if not self.is_cmd:
             self.var_min_max = {}
-            for dataset in headers[1:]:
-                self._minmax_val(self.df_normal, dataset)
-            print(f"STATUS: {len(headers) + 1}", end=self.end_print)
+            self._minmax(self.df_normal, headers[1:])
+            self._status(len(headers) + 1, "stats")
         
         # Laminate!
         self.df_normal = pd.DataFrame(self.df_normal)
-        self._laminate(f"STATUS: {len(headers) + (1 if self.is_cmd else 2)}")
+        self._laminate(len(headers) + (1 if self.is_cmd else 2))
     
 
 
@@ -254,23 +705,22 @@ class H5_Organized_New:
         file_cols = ["Save Point ID", "Save Point Latitude", "Save Point Longitude", "Save Point Depth"]
         grup_cols = ["Storm ID", "Storm Name", "Storm Type"] # Sorting attributes.
         vars_time = ["Landfall Time", "Peak Time"]
-        vars_other = [x for x in fileKeys if x not in [*file_cols, *grup_cols, *vars_time]]
-        print(f"LENGTH: {4 + self.more_steps}")
+        vars_other = [x for x in fileKeys if x not in [*file_cols, *grup_cols, *vars_time] and self._read_column(x)]
+        self._length(4 + self.more_steps)
 
         # Extract and scale desired file attributes.
         n = len(list(first_val))
-        print(self.df_normal.keys())
         self.df_normal.update({ key:np.repeat( fileAttrs[key].astype(D_COLTYPES[key]), n ) for key in file_cols })
-        print(self.df_normal.keys())
-        print(f"STATUS: 1", end=self.end_print)
+        self._status(1)
         # Extract desired group attributes.
         self.df_normal["Storm ID"] = h5["Storm ID"].astype(int)[:]
-        self.df_normal["Storm Name"] = [ x.decode('utf-8') for x in h5["Storm Name"] ]
-        try: self.df_normal["Storm Type"] = [ x.decode('utf-8') for x in h5["Storm Type"] ]
-        except: pass
+        if self._read_column("Storm Name"): self.df_normal["Storm Name"] = [ x.decode('utf-8') for x in h5["Storm Name"] ]
+        if self._read_column("Storm Type"):
+            try: self.df_normal["Storm Type"] = [ x.decode('utf-8') for x in h5["Storm Type"] ]
+            except: pass
         # Extract other variables.
         self.df_normal.update({ key:h5[key].astype(float)[:] for key in vars_other })
-        print("STATUS: 2", end=self.end_print)
+        self._status(2, rows=n, nbytes=sum( self.df_normal[key].nbytes for key in vars_other ))
 
         # Extract variable data.
         no_land = np.isnan(h5["Landfall Time"]).all()
@@ -279,29 +729,25 @@ class H5_Organized_New:
         if not no_date:
             # Manage Landfall Time and Peak Time columns, assuming "Units" attribute == b'hrs since 1970-01-01 00:00:00Z'
             tme = h5["Landfall Time"].attrs["Units"].decode('utf-8').split(" since ")[1][:-1] + " UTC"
-            tme = np.array( pd.to_datetime( tme, format='%Y-%m-%d %H:%M:%S %Z', utc=True ) )
-            t = np.repeat(tme, n)
-            l = [pd.Timedelta(hours=x) for x in h5["Landfall Time"]]
-            p = [pd.Timedelta(hours=x) for x in h5["Peak Time"]]
-            self.df_normal["Landfall Time"] = t + l
+            tme = pd.to_datetime( tme, format='%Y-%m-%d %H:%M:%S %Z', utc=True ).tz_convert(None)
+            t = np.datetime64(tme, "ns")
+            l = func_hours_to_timedelta( h5["Landfall Time"][:] )
+            p = func_hours_to_timedelta( h5["Peak Time"][:] )
+            self.df_normal["Landfall Time"] = pd.DatetimeIndex( t + l ).tz_localize("UTC")
             self.df_normal["Peak Time"]     = p
             self.df_normal["yyyymmddHHMM"]  = self.df_normal["Landfall Time"] - p
-        print("STATUS: 3", end=self.end_print)
+        self.df_normal = self._filter_rows(self.df_normal)
+        self._status(3, "dates")
 
         # Get global mins and maxes.
         if not self.is_cmd:
             self.var_min_max = {}
-            for var in vars_other:
-                self._minmax_val(self.df_normal, var)
-            if not no_date: 
-                self._minmax_date(self.df_normal["yyyymmddHHMM"])
-            print("STATUS: 4", end=self.end_print)
+            self._minmax(self.df_normal, vars_other if no_date else [*vars_other, "yyyymmddHHMM"])
+            self._status(4, "stats")
 
         # Laminate!
-        """for x in self.df_normal.keys():
-            print(x)"""
         self.df_normal = pd.DataFrame(self.df_normal)
-        self._laminate(f"STATUS: {4 if self.is_cmd else 5}")
+        self._laminate(4 if self.is_cmd else 5)
     
 
 
@@ -313,7 +759,7 @@ class H5_Organized_New:
 
         Splits file by groups. Dataset filenames will be `[original filename]^[group title].csv`.
         """
-        if not self.is_cmd: print(f"LENGTH: {sZ+1}")
+        self._length(sZ+1)
         file_cols = ["Save Point ID", "Save Point Latitude", "Save Point Longitude", "Save Point Depth"]
         dict_file_cols = {key:fileAttrs[key].astype(D_COLTYPES[key]) for key in file_cols}
         self.h5s: list[H5_Organized_New] = []
@@ -324,7 +770,7 @@ class H5_Organized_New:
             h5_obj = H5_Organized_New()
             h5_obj.run_AEF_special(group, self, name, dict_file_cols)
             self.h5s.append( h5_obj )
-            if not self.is_cmd: print(f"STATUS: {i+1}", end=self.end_print)
+            self._status(i+1, rows=len(h5_obj.df_normal), nbytes=h5_obj.df_normal.memory_usage(index=False).sum())
     
 
 
@@ -345,6 +791,9 @@ class H5_Organized_New:
         self.export = h5_org.export
         self.is_cmd = h5_org.is_cmd
         self.end_print = h5_org.end_print
+        self.progress = h5_org.progress
+        self.export_format = h5_org.export_format
+        self.read_filter = h5_org.read_filter
         n = len(list(group.values())[0])
         
         # Scale file attribute data
@@ -352,19 +801,19 @@ class H5_Organized_New:
             self.df_normal[attr_key] = np.repeat(obj, n)
 
         # Process data
-        for d in group.keys():
+        for d in filter(self._read_column, group.keys()):
             ls = group[d].astype(float)[:]
             self.df_normal[d] = ls
+        self.df_normal = self._filter_rows(self.df_normal)
         
         # Catch mins + maxes
         if not self.is_cmd:
             self.var_min_max = {}
-            for d in group.keys():
-                self._minmax_val(self.df_normal, d)
+            self._minmax(self.df_normal, group.keys())
         
         # Laminate!
         self.df_normal = pd.DataFrame(self.df_normal)
-        self._laminate("")
+        self._laminate()
     
 
 
@@ -377,7 +826,7 @@ class H5_Organized_New:
         Splits file into groups "Nodes" and "Elements". Dataset filenames will be `[original filename]^[group title].csv`.
         """
         self.is_locations = True
-        print(f"LENGTH: {4 if self.export else 2}")
+        self._length(4 if self.export else 2)
         self.h5s: list[H5_Organized_New] = []
         # Manage Nodes.
         h5_nodes = H5_Organized_New()
@@ -388,14 +837,16 @@ class H5_Organized_New:
         h5_nodes.is_locations = True
         h5_nodes.is_cmd = self.is_cmd   # Necessary for `h5_nodes._laminate()`
         h5_nodes.end_print = self.end_print
+        h5_nodes.progress = self.progress
+        h5_nodes.export_format = self.export_format
         headers = ["ADCIRC Node ID", "Latitude", "Longitude", "Datum Depth"]
-        h5_nodes.df_normal = pd.DataFrame( h5["Nodes"], columns=headers ).astype( {"ADCIRC Node ID":int} )
-        print("STATUS: 1", end=self.end_print)
+        h5_nodes.read_filter = self.read_filter
+        h5_nodes.df_normal = h5_nodes._filter_rows( pd.DataFrame( h5["Nodes"], columns=headers ).astype( {"ADCIRC Node ID":int} ) )
+        self._status(1, rows=len(h5_nodes.df_normal), nbytes=h5["Nodes"].nbytes)
         if not self.is_cmd:
             h5_nodes.var_min_max = {}
-            for c in headers:
-                h5_nodes._minmax_val(h5_nodes.df_normal, c)
-        h5_nodes._laminate("STATUS: 2")
+            h5_nodes._minmax(h5_nodes.df_normal, headers)
+        h5_nodes._laminate(2)
         self.h5s.append(h5_nodes)
         
         # Manage Elements.
@@ -407,16 +858,19 @@ class H5_Organized_New:
         h5_elems.is_locations = True
         h5_elems.is_cmd = self.is_cmd   # Necessary for `h5_elems._laminate()`
         h5_elems.end_print = self.end_print
+        h5_elems.progress = self.progress
+        h5_elems.export_format = self.export_format
         nodes = [f"Node ID {i}" for i in range(1, h5["Elements"].shape[1]-1)]
         h5_elems.df_normal = pd.DataFrame( h5["Elements"], columns=["Triangular element ID", "Number of nodes", *nodes] ).astype(int)
         h5_elems.df_normal.drop( columns=["Number of nodes"], inplace=True )
-        print(f"STATUS: {3 if self.export else 2}", end=self.end_print)
+        h5_elems.read_filter = self.read_filter
+        h5_elems.df_normal = h5_elems._filter_rows(h5_elems.df_normal)
+        self._status(3 if self.export else 2, rows=len(h5_elems.df_normal), nbytes=h5["Elements"].nbytes)
         # Get mins and maxes.
         if not self.is_cmd: 
             h5_elems.var_min_max = {}
-            for c in ["Triangular element ID", *nodes]:
-                h5_elems._minmax_val(h5_elems.df_normal, c)
-        h5_elems._laminate(f"STATUS: 4")
+            h5_elems._minmax(h5_elems.df_normal, ["Triangular element ID", *nodes])
+        h5_elems._laminate(4)
         self.h5s.append(h5_elems)
     
 
@@ -427,7 +881,7 @@ class H5_Organized_New:
         * ID 1: `NACCS`, `SACSNCSEFL`
         * ID 7: `Timeseries`
         """
-        if not self.is_cmd: print(f"LENGTH: {sZ+2 if self.export else sZ+1}")
+        self._length(sZ+2 if self.export and not self.is_cmd else sZ+1)
         file_cols = ["Save Point ID", "Save Point Latitude", "Save Point Longitude"]
         grup_cols = ["Save Point Depth", "Storm ID", "Storm Name", "Storm Type"]
         data_cols = list(h5[fileKeys[0]].keys())
@@ -437,61 +891,108 @@ class H5_Organized_New:
 
         self.var_min_max_byID = {}
         fAll = []; fNorm = []
-        iRange = [1]
-
-        # BEGIN!
-        for i, group in enumerate(fileVals):
-            group: h5py.Group
-            i1 = i+1
-            n = list(group.values())[0].shape[0] # list(group.values()) = list of datasets
-            iRange.append(iRange[i] + n)
-
-            # Manage normal dataset
-            df1 = {key:val if isinstance(val, str) else val.astype(D_COLTYPES[key]) for key, val in fileAttrs.items() if key in file_cols}
-            df2 = {key:val if isinstance(val, str) else val.astype(D_COLTYPES[key]) for key, val in group.attrs.items() if key in grup_cols}
-            sID = str(df2["Storm ID"])
-            dfL = {dataset:str(n)+" x 1" for dataset in group.keys()}
-            df = pd.DataFrame( df1|df2|dfL, index=[i1] )
-            fNorm.append(df)
+        spans = []        # (Storm ID, number of rows) of each converted group.
+        storms = []       # Lazy mode: (Storm ID, HDF5 group name, first row, attributes)
+        stats = {}        # Statistics of each variable, merged storm by storm.
+        stats_byID = {}   # Lazy mode: Statistics of each variable per Storm ID.
+        # Row numbers of each group in file order.
+        sizes = [list(group.values())[0].shape[0] for group in fileVals] # list(group.values()) = list of datasets
+        starts = np.cumsum([1, *sizes[:-1]])
+        order = range(len(fileVals))
+
+        # Streaming export (CMD method, lazy mode): Convert the groups in Storm ID order and append each group to the exported file. `df_full` is never built.
+        self.is_streamed = self.export and (self.is_cmd or self.is_lazy)
+        if self.is_streamed or self.is_lazy:
+            order = np.argsort([group.attrs["Storm ID"] for group in fileVals], kind="stable")
+        if self.is_streamed:
+            writer = StreamWriter( self.get_export_fpath(), self.export_format )
+            pending = [] # Groups of the Storm ID being written. Groups sharing a Storm ID are merged by date-time, like `df_full`.
+
+        # A failed export is deleted, so it never looks finished.
+        try:
+            # BEGIN!
+            columns = None
+            for k, i in enumerate(order):
+                group: h5py.Group = fileVals[i]
+                i1 = i+1
+                n = sizes[i]
+                # Filter by Storm ID before reading any dataset.
+                if self.read_filter and not self.read_filter.keep_stormID( group.attrs.get("Storm ID") ):
+                    self._status(k+1)
+                    continue
+
+                # Manage normal dataset
+                df1 = {key:val if isinstance(val, str) else val.astype(D_COLTYPES[key]) for key, val in fileAttrs.items() if key in file_cols}
+                df2 = {key:val if isinstance(val, str) else val.astype(D_COLTYPES[key]) for key, val in group.attrs.items() if key in grup_cols}
+                sID = str(df2["Storm ID"])
+                dfL = {dataset:str(n)+" x 1" for dataset in group.keys()}
+                df_norm = pd.DataFrame( {key:val for key, val in (df1|df2|dfL).items() if self._keep_column(key)}, index=[i1] )
             
-            # Manage full dataset
-            df1 = {key:np.repeat(val, n) for key, val in df1.items()}
-            df2 = {key:np.repeat(val, n) for key, val in df2.items()}
-            dfL = {dataset:col.astype(float)[:] for dataset, col in group.items() if dataset != "yyyymmddHHMM"}
-            dfT = {"yyyymmddHHMM":np.array( pd.to_datetime( list(group["yyyymmddHHMM"]), format="%Y%m%d%H%M.0", utc=True, errors='coerce' ) )}
-            df = pd.DataFrame( df1|df2|dfL|dfT, index = range(iRange[i], iRange[i1]) ).sort_values(by=["yyyymmddHHMM"])
-            fAll.append(df)
-
-            # Manage mins and maxes by Storm IDs.
-            if not self.is_cmd:
-                x = {}
-                for dataset, col in dfL.items():
-                    if not np.isnan( col ).all():
-                        var_min = np.around( np.nanmin(col), decimals=self.dec )
-                        var_max = np.around( np.nanmax(col), decimals=self.dec )
-                        if var_max > var_min:
-                            x[dataset] = [var_min, var_max]
-                
-                arr = [y for y in dfT["yyyymmddHHMM"] if isinstance(y, pd.Timestamp)]
-                if len(arr) > 0:
-                    var_min = np.nanmin(arr)
-                    var_max = np.nanmax(arr)
-                    if var_max > var_min:
-                        x["yyyymmddHHMM"] = [var_min, var_max]
-                self.var_min_max_byID[sID] = x # "var_min_max_byID" is a dictionary for each Storm ID. The value "x" is a dictionary for each variable.
+                # Manage full dataset
+                df = func_timeseries_rows( group, df1|df2, int(starts[i]), self.read_filter )
+                data_group = [dataset for dataset in group.keys() if dataset != "yyyymmddHHMM" and dataset in df.columns]
+                if columns is None: columns = list(df.columns)
+                if self.read_filter and len(df) == 0: # No row of the storm passes the filter.
+                    self._status(k+1)
+                    continue
+                fNorm.append(df_norm)
+                if self.is_streamed:
+                    if pending and pending[-1]["Storm ID"].iat[0] != df["Storm ID"].iat[0]:
+                        writer.write( func_merge_groups(pending) )
+                        pending = []
+                    pending.append(df)
+                if self.is_lazy:      storms.append( (int(df2["Storm ID"]), group.name, int(starts[i]), df1|df2) )
+                elif not self.is_streamed:
+                    fAll.append(df)
+                    spans.append( (int(df2["Storm ID"]), len(df)) )
+                self._status(rows=len(df), nbytes=df.memory_usage(index=False).sum())
+
+                # Manage mins and maxes by Storm IDs.
+                # The statistics of each storm are merged into the statistics of the whole dataset, so it's never scanned again.
+                if not self.is_cmd:
+                    part = func_column_stats( df, [*data_group, "yyyymmddHHMM"] )
+                    x = {dataset:res for dataset, col in part.items() if (res := col.get_range(self.dec)) is not None}
+                    self.var_min_max_byID[sID] = x # "var_min_max_byID" is a dictionary for each Storm ID. The value "x" is a dictionary for each variable.
+                    func_merge_stats(stats, part)
+                    if self.is_lazy: func_merge_stats( stats_byID.setdefault(int(df2["Storm ID"]), {}), part )
                 
-            print(f"STATUS: {i1}", end=self.end_print)
+                self._status(k+1, "read" if self.is_cmd else "stats")
         
-        # ORGNAIZE
-        self.df_full   = pd.concat(fAll).sort_values(by=["Storm ID"])
+            # ORGNAIZE
+            if not fNorm:
+                # Nothing passes the filter: Empty datasets with the columns of the file.
+                attr_cols = [key for key in fileAttrs.keys() if key in file_cols] + [key for key in fileVals[0].attrs.keys() if key in grup_cols]
+                attr_cols = [key for key in attr_cols if self._keep_column(key)]
+                columns = [*attr_cols, *[x for x in data_but_time if self._keep_column(x)], "yyyymmddHHMM"]
+                fNorm.append( pd.DataFrame(columns=[*attr_cols, *[x for x in data_cols if self._keep_column(x)]]) )
+                fAll.append( pd.DataFrame(columns=columns) )
+                if self.is_streamed: writer.write(fAll[-1])
+            if self.is_streamed:
+                if pending: writer.write( func_merge_groups(pending) )
+                writer.close()
+        except BaseException:
+            if self.is_streamed: writer.abort()
+            raise
+        if self.is_lazy:
+            self.df_full = LazyTimeseries( self.fpath, storms, columns, h5, stats_byID, self.read_filter )
+            if not self.is_cmd: # Keep the Storm IDs in file order, like the default mode.
+                self.var_min_max_byID = {str(x[0]): self.var_min_max_byID[str(x[0])] for x in sorted(storms, key=lambda x: x[2])}
+        elif self.is_streamed:
+            self.df_full = None
+        else:
+            self.df_full = pd.concat(fAll).sort_values(by=["Storm ID"], kind="stable")
+            self.storm_offsets = func_storm_offsets(spans)
+            if len(self.storm_offsets) < len(spans):
+                # Groups sharing a Storm ID: Sort each storm by date-time again, so every storm is one sorted slice.
+                self.df_full.sort_values(by=["Storm ID", "yyyymmddHHMM"], kind="stable", inplace=True)
         self.df_normal = pd.concat(fNorm).sort_values(by=["Storm ID"])
+        self._status(stage="assemble")
         
         if not self.is_cmd:
             self.var_min_max = {}
-            for dataset in data_but_time:
-                self._minmax_val(self.df_full, dataset)
-            self._minmax_date(self.df_full["yyyymmddHHMM"])
-        self._laminate(f"STATUS: {sZ+1}")
+            for dataset in [*data_but_time, "yyyymmddHHMM"]:
+                if dataset in stats: self._minmax_stats( dataset, stats[dataset] )
+        self._laminate(sZ+1)
     
 
 
@@ -505,15 +1006,15 @@ class H5_Organized_New:
         """
         file_cols = ["Save Point ID", "Save Point Latitude", "Save Point Longitude"]
         grup_cols = [x for x in fileKeys if x not in file_cols]
-        print(f"LENGTH: {3 if self.export else 2}")
-        d1 = {key:h5[key].astype(D_COLTYPES[key])[:] for key in file_cols}
-        d2 = {key:h5[key].astype(float)[:] for key in grup_cols}
-        dict_merged =  pd.DataFrame( d1|d2 )
-        print("STATUS: 1", end=self.end_print)
+        self._length(3 if self.export else 2)
+        d1 = {key:h5[key].astype(D_COLTYPES[key])[:] for key in file_cols if self._read_column(key)}
+        d2 = {key:h5[key].astype(float)[:] for key in grup_cols if self._read_column(key)}
+        dict_merged = self._filter_rows( pd.DataFrame( d1|d2 ) )
+        self._status(1, rows=len(dict_merged), nbytes=sum( x.nbytes for x in (d1|d2).values() ))
         
         # Laminate!
         self.df_normal = pd.DataFrame(dict_merged)
-        self._laminate("STATUS: 2")
+        self._laminate(2)
     
 
     
@@ -527,21 +1028,23 @@ class H5_Organized_New:
         """
         headers = ["Save Point ID", "Save Point Latitude", "Save Point Longitude"]
         dict_merged = dict.fromkeys(headers, [])
-        len_task = len(headers) + len([x for g in fileVals[1:] for x in g.keys()]) + (2 if self.export else 1)
-        print(f"LENGTH: {len_task}")
+        len_task = len(headers) + len([x for g in fileVals[1:] for x in g.keys() if self._read_column(x)]) + (2 if self.export else 1)
+        self._length(len_task)
         for i, h in enumerate(headers):
             dict_merged[h] = [row[i].astype(D_COLTYPES[h]) for row in first_val]
-            print(f"STATUS: {i+1}", end=self.end_print)
+            self._status(i+1)
         i = len(headers)+1
         for group in fileVals[1:]:
             for gname, dataset in group.items():
+                if not self._read_column(gname): continue
                 dict_merged[gname] = dataset.astype(float)[:]
-                print(f"STATUS: {i}", end=self.end_print)
+                self._status(i, nbytes=dict_merged[gname].nbytes)
                 i += 1
 
         # Laminate!
-        self.df_normal = pd.DataFrame(dict_merged)
-        self._laminate(f"STATUS: {i}")
+        self.df_normal = self._filter_rows( pd.DataFrame(dict_merged) )
+        self._status(stage="assemble", rows=len(self.df_normal))
+        self._laminate(i)
     
 
 
@@ -570,150 +1073,174 @@ class H5_Organized_New:
         iRange = [1]
 
         if has_groups:
-            if not self.is_cmd: print(f"LENGTH: {sZ + self.more_steps}")
+            self._length(sZ + self.more_steps)
 
             for i, group in enumerate(fileVals):
                 i1 = i+1
-                if self.is_cmd: print(f"Processing group #{i1} {SPACES}", end="\r")
                 
                 n = list(group.values())[0].shape[0] # list(group.values()) = list of datasets
                 iRange.append(iRange[i] + n)
+                # Filter by Storm ID before reading any dataset.
+                if self.read_filter and not self.read_filter.keep_stormID( group.attrs.get("Storm ID") ):
+                    self._status(i1)
+                    continue
 
                 df1 = {} if file_cols == [] else { key:np.repeat(val if isinstance(val, str) else val.astype(D_COLTYPES[key]), n) 
                                                     for key, val in fileAttrs.items() if key in file_cols }
                 df2 = {} if grup_cols == [] else { key:np.repeat(val if isinstance(val, str) else val.astype(D_COLTYPES[key]), n) 
                                                     for key, val in group.items() if key in grup_cols }
-                dfL = {dataset:col.astype(float)[:] for dataset, col in group.items() if dataset != "yyyymmddHHMM"}
-                dfT = {} if not has_time else {"yyyymmddHHMM":np.array( pd.to_datetime( list(group["yyyymmddHHMM"]), format="%Y%m%d%H%M.0", utc=True, errors='coerce' ) )}
+                dfL = {dataset:col.astype(float)[:] for dataset, col in group.items() if dataset != "yyyymmddHHMM" and self._read_column(dataset)}
+                dfT = {} if not has_time else {"yyyymmddHHMM":func_decode_yyyymmddHHMM( group["yyyymmddHHMM"][:] )}
                 df = pd.DataFrame( df1|df2|dfL|dfT, index = range(iRange[i], iRange[i1]) )
                 if has_time: df.sort_values(by=["yyyymmddHHMM"], inplace=True)
-                fAll.append(df)
+                fAll.append( self._filter_rows(df) )
 
-                print(f"STATUS: {i1}", end=self.end_print)
+                self._status(i1, rows=n, nbytes=sum( x.nbytes for x in dfL.values() ))
             
             # ORGANIZE
             self.var_min_max = {}
-            self.df_normal = pd.concat(fAll)
+            self.df_normal = pd.concat(fAll) if fAll else pd.DataFrame(columns=[x for x in [*file_cols, *grup_cols, *data_cols] if self._keep_column(x)])
             if "Storm ID" in list(self.df_normal.columns): 
                 self.df_normal.sort_values(by=["Storm ID"], inplace=True)
 
             # Get global mins and maxes.
             if not self.is_cmd:
                 self.var_min_max = {}
-                if has_time:
-                    for dataset in data_but_time:
-                        self._minmax_val(self.df_normal, dataset)
-                    self._minmax_date(self.df_normal["yyyymmddHHMM"])
-                else:
-                    for dataset in data_cols:
-                        self._minmax_val(self.df_normal, dataset)
-                print(f"STATUS: {sZ + 1}", end=self.end_print)
+                self._minmax(self.df_normal, [*data_but_time, "yyyymmddHHMM"] if has_time else data_cols)
+                self._status(sZ + 1, "stats")
         
         else:
             # NOTE: INSERT UNIVERSAL CODE FOR H5s WITHOUT GROUPS!!!
             pass
         
         # FINISH
-        self._laminate(f"STATUS: {sZ + (1 if self.is_cmd else 2)}")
+        self._laminate(sZ + (1 if self.is_cmd else 2))
 
     
 
-    def _update_steps(self):
+    def _keep_column(self, name: str) -> bool:
+        """Check if a column is in the converted dataset (see `ReadFilter`)."""
+        return self.read_filter is None or self.read_filter.keep_column(name)
+    
+    def _read_column(self, name: str) -> bool:
+        """Check if an HDF5 dataset must be read (see `ReadFilter`)."""
+        return self.read_filter is None or self.read_filter.read_column(name)
+    
+    def _filter_rows(self, dataset) -> pd.DataFrame:
         """
-        Update the number of steps in `LENGTH: ` print. For internal functions that count exporting and min/max finding as extra steps.
+        Keep the rows and columns of an assembled dataset (DataFrame or dictionary of arrays) which pass `self.read_filter`.
         """
-        if self.export: self.more_steps += 1
-        if not self.is_cmd: self.more_steps += 1
+        if not self.read_filter: return dataset
+        return self.read_filter.apply( pd.DataFrame(dataset) )
 
     
 
-    def _func_d_to_Q(self, dt: pd.Timestamp):
+    def _update_steps(self):
         """
-        Convert a Pandas `Timestamp` object to a PySide6 `QDateTime` object. For dateTimeEdit boxes in GUI.
+        Update the number of steps reported by `_length()`. For internal functions that count exporting and min/max finding as extra steps.
         """
-        x = QDateTime.fromString(dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z", "yyyy-MM-ddTHH:mm:ss.zzzZ")
-        x.toUTC()
-        return x
-
+        if self.export: self.more_steps += 1
+        if not self.is_cmd: self.more_steps += 1
 
     
-    def _minmax_val(self, dataset: pd.DataFrame, name: str):
+
+    def _minmax(self, dataset, names: list[str]):
         """
-        Determines if the numerical array has a minimum and a maximum worth filtering.
+        Determines which columns have a minimum and a maximum worth filtering. Each column is scanned once (see `code04_stats.py`).
 
         Parameters
         ---
-        dataset: `self.df_normal`, `self.df_full`
-        name: The name of the column.
+        dataset: `self.df_normal` (DataFrame or dictionary of arrays).
+        names: The names of the columns.
         """
-        all_nan = True
-        try: all_nan = np.isnan(dataset[name]).all()
-        except:
-            try: all_nan = all(np.isnan( np.array(dataset[name], float) ))
-            except: all_nan = all([x == np.nan for x in dataset[name]])
-
-        if not all_nan:
-            var_min = np.around( np.nanmin(dataset[name]), decimals=self.dec )
-            var_max = np.around( np.nanmax(dataset[name]), decimals=self.dec )
-            if var_max > var_min:
-                self.var_min_max[name] = [var_min, var_max]
+        for name in names:
+            if name in dataset: # Unselected variables are missing (see `ReadFilter`).
+                self._minmax_stats( name, ColumnStats(dataset[name]) )
 
 
     
-    def _minmax_date(self, arr: np.ndarray):
+    def _minmax_stats(self, name: str, stats: ColumnStats):
         """
-        Determines if the date-time array has a minimum and a maximum worth filtering.
+        Add the minimum and the maximum of a column to `self.var_min_max` if worth filtering. Date-times stay `Timestamp` objects.
 
         Parameters
         ---
-        arr: The array of date-time values.
+        name: The name of the column.
+        stats: The statistics of the column, possibly merged from chunks.
         """
-        all_nan = True
-        try: all_nan = np.isnan(arr).all() # DEV NOTE: Is this all that's needed??
-        except:
-            try: all_nan = all(np.isnan( np.array(arr, float) ))
-            except: all_nan = all([x == np.nan for x in arr])
-        
-        if not all_nan:
-            arr = [x for x in arr if isinstance(x, pd.Timestamp)]
-            if len(arr) > 0:
-                var_min = np.nanmin(arr)
-                var_max = np.nanmax(arr)
-                if var_max > var_min:
-                    self.var_min_max["yyyymmddHHMM"] = [self._func_d_to_Q(var_min), self._func_d_to_Q(var_max)]
+        res = stats.get_range(self.dec)
+        if res is None: return
+        self.var_min_max[name] = res
 
 
     
-    def _laminate(self, status):
+    def _length(self, steps: int):
+        """Report the number of steps of the conversion (see `code08_progress.py`)."""
+        if self.progress: self.progress.length(steps)
+
+    def _status(self, step: int = None, stage: str = "read", rows: int = 0, nbytes: int = 0):
+        """Report a finished step with its stage and the rows and bytes it processed (see `Progress.status()`)."""
+        if self.progress: self.progress.status(step, stage, rows, nbytes)
+
+    def _laminate(self, step: int = None):
         """
-        Sets the normal dataset to the current dataset. If necessary, exports dataset to CSV and reports status.
+        Sets the normal dataset to the current dataset. If necessary, exports dataset to CSV and reports the step.
         """
-        self.df_current = self.df_normal
+        self._reset_filters()
         if self.export: 
-            self.export_csv()
-            print(status, end=self.end_print)
+            if not self.is_streamed: # Streamed datasets are already exported.
+                self.export_data()
+            fpath = self.get_export_fpath()
+            self._status( step, "export", nbytes=os.path.getsize(fpath) if os.path.isfile(fpath) else 0 )
     
 
 
+    def export_data(self, fmt: str = None, fpath: str = None):
+        """
+        Exports complete dataset to CSV, Parquet or Feather.
+
+        Parameters
+        ---
+        fmt: The output format. One of `EXPORT_FORMATS`. Default: the format given to `run()`.
+        fpath: The filepath of the file. Default: `get_export_fpath()`.
+        """
+        fmt = fmt or self.export_format
+        fpath = fpath or self.get_export_fpath(fmt)
+        df = self.df_full if self.is_timeseries else self.df_normal
+        if isinstance(df, LazyTimeseries):
+            # Lazy mode: Export one storm at a time.
+            writer = StreamWriter( fpath, fmt )
+            try:
+                for part in df.iter_storms():
+                    writer.write(part)
+                writer.close()
+            except BaseException:
+                writer.abort()
+                raise
+        else:
+            func_write_dataset( df, fpath, fmt )
+    
     def export_csv(self):
         """
         Exports complete dataset to CSV.
         """
-        fpath = os.path.join( DIR_RESULTS, f"{self.name}.csv" )
-        if self.is_timeseries: self.df_full.to_csv( fpath, index=False )
-        else:                self.df_normal.to_csv( fpath, index=False )
+        self.export_data("csv")
+    
+    def get_export_fpath(self, fmt: str = None):
+        """Get the filepath of the exported dataset."""
+        return os.path.join( DIR_RESULTS, self.name + EXPORT_FORMATS[fmt or self.export_format] )
     
 
 
     def get_data_current(self):
-        """Get the current dataset."""
-        return self.df_current
+        """Get the current dataset. Copies the filtered rows (see `export_current()` to write them without a copy)."""
+        return self.df_current if self.positions is None else self.df_current.take(self.positions)
     def get_data_normal(self):
         """Get the default dataset."""
         return self.df_normal
     def get_data_timeseries(self):
         """Timeseries only: Get the full dataset of the Timeseries file."""
-        return self.df_full
+        return self.df_full.load_all() if isinstance(self.df_full, LazyTimeseries) else self.df_full
     def get_fileType(self):
         """Get the type of file/model used in the dataset."""
         return self.fileType
@@ -723,57 +1250,325 @@ class H5_Organized_New:
     def get_stormIDs(self):
         """Timeseries only: Get the unique storm IDs."""
         return np.unique( self.df_normal["Storm ID"] ).astype(str)
+    def get_filters(self):
+        """Get the active filters as `(variable, minimum, maximum)`, in order."""
+        return list(self.filters)
+    def get_view(self):
+        """Get the current dataset as `(DataFrame, row positions)`. The positions are `None` if not filtered. For the GUI's table."""
+        return self.df_current, self.positions
     def get_dataset(self):
-        """Get the noraml dataset as TableModel when switching databases."""
-        self.df_current = self.df_normal
-        return TableModel(self.df_current)
+        """Get the noraml dataset as a view (see `get_view()`) when switching databases. Removes all filters."""
+        self._reset_filters()
+        return self.get_view()
     def get_stormID_subset(self, stormID):
-        """Timeseries only: Get sub-dataset of storm ID as TableModel."""
-        self.df_current = self.df_full[ self.df_full["Storm ID"] == stormID ].sort_values(by=["yyyymmddHHMM"])
-        return TableModel(self.df_current)
+        """Timeseries only: Get sub-dataset of storm ID as a view. Active filters are applied to it."""
+        self.stormID = int(stormID)
+        return self._apply_filters()
+    def clear_stormID(self):
+        """Timeseries only: Remove the Storm ID subset. Active filters are applied to the full dataset again."""
+        self.stormID = None
+        return self._apply_filters()
     
 
 
-    def set_filter(self, var, min, max, is_not_id):
+    def _reset_filters(self):
+        """
+        Remove all filters and the Storm ID subset.
+        """
+        self.filters = []
+        """Active filters: `(variable, minimum, maximum)`."""
+        self.stormID = None
+        self._base = None
+        """The dataset the filters select rows from. See `_get_base()`."""
+        self._base_key = None
+        self._steps = []
+        """Row positions in `_base` after each filter."""
+        self._masks = {}
+        """Filter -> boolean mask over `_base`."""
+        self.df_current = self.df_normal
+        self.positions = None
+        self.is_truncated = False
+        self._lazy_stats = None
+        """Lazy Timeseries only: Statistics of every filtered row, including the rows left out of a truncated dataset."""
+
+
+
+    def _get_base(self) -> pd.DataFrame:
         """
-        Manage a filtered dataset.
+        Get the dataset the filters select rows from: the Storm ID subset, the full dataset (Timeseries) or the normal dataset.
 
-        Option 1 if first time, but showing an abridged time series dataset. Option 2 for current state of dataset.
+        Lazy Timeseries datasets have no full dataset in memory, so only the rows matching every filter are read (see
+        `_select_lazy()`). Adding a filter narrows the rows already read, unless they were truncated.
         """
-        df = self.df_full if (self.is_timeseries and is_not_id) else self.df_current
-        if var == "yyyymmddHHMM":
-            df = df[df[var] != pd.NaT]
-        self.df_current = df[(df[var] >= min) & (df[var] <= max)]
-        return TableModel(self.df_current)
-    
+        is_lazy = isinstance(self.__dict__.get("df_full"), LazyTimeseries)
+        if self.stormID is not None: key = ("Storm ID", self.stormID)
+        elif self.is_timeseries and is_lazy:
+            key = ("Lazy", tuple(self.filters))
+            prev = self._base_key
+            if prev and prev[0] == "Lazy" and not self.is_truncated and prev[1] == key[1][:len(prev[1])]:
+                key = prev
+        else: key = ("Full",)
+        if key != self._base_key:
+            # New base dataset: Every filter is applied again.
+            self.is_truncated = False
+            self._lazy_stats = None
+            if key[0] == "Storm ID":
+                self._base = self._get_storms( [self.stormID] )
+            elif key[0] == "Lazy":
+                self._base, self._lazy_stats, self.is_truncated = self._select_lazy( self.filters )
+            else:
+                self._base = self.df_full if self.is_timeseries else self.df_normal
+            self._base_key = key
+            self._steps = []
+            self._masks = {}
+        return self._base
+
+
+
+    def _lazy_stormIDs(self, filters: list[tuple]) -> list[int]:
+        """
+        Lazy Timeseries only: Get the Storm IDs which may match every filter, from the statistics of each storm.
+        """
+        stormIDs = self.df_full.stormIDs
+        for var, lo, hi in filters:
+            stormIDs = np.intersect1d( stormIDs, self.df_full.get_stormIDs_in_range(var, lo, hi) )
+        return list(stormIDs)
+
+
+
+    def _rows_mask(self, df: pd.DataFrame, filters: list[tuple]) -> np.ndarray:
+        """
+        Get the boolean mask of the rows of `df` matching every filter, by scanning the columns.
+        """
+        mask = np.ones(len(df), dtype=bool)
+        for var, lo, hi in filters:
+            col = df[var]
+            mask &= ((col >= lo) & (col <= hi)).to_numpy(dtype=bool, na_value=False)
+        return mask
+
+
+
+    def _select_lazy(self, filters: list[tuple]) -> tuple[pd.DataFrame, dict[str, ColumnStats], bool]:
+        """
+        Lazy Timeseries only: Read the rows matching every filter, one storm at a time. Storms which can't match are skipped.
 
+        At most `LAZY_FILTER_MAX_ROWS` rows are kept in memory. The later storms are still scanned (and dropped) for the
+        statistics of the whole selection, so the variable ranges of the GUI stay exact.
 
-    def get_plot_data(self, var, min_dt, max_dt, stormIDs = None, only_one_dt = False):
-        """Get data to plot peaks or timeseries data."""
+        Returns the kept rows, the statistics of every matching row and a boolean for a truncated selection.
+        """
+        dfs, n_rows, stats, is_truncated = [], 0, {}, False
+        for df in self.df_full.iter_storms( self._lazy_stormIDs(filters) ):
+            df = df[ self._rows_mask(df, filters) ]
+            if len(df) == 0: continue
+            func_merge_stats( stats, func_column_stats(df, [x for x in self.var_min_max if x in df.columns]) )
+            if n_rows < LAZY_FILTER_MAX_ROWS:
+                if n_rows + len(df) > LAZY_FILTER_MAX_ROWS:
+                    df = df.iloc[ :LAZY_FILTER_MAX_ROWS - n_rows ]
+                    is_truncated = True
+                dfs.append(df)
+                n_rows += len(df)
+            else:
+                is_truncated = True
+        base = pd.concat(dfs) if dfs else pd.DataFrame(columns=self.df_full.columns)
+        return base, stats, is_truncated
+
+
+
+    def _get_storms(self, stormIDs: list[int]) -> pd.DataFrame:
+        """
+        Timeseries only: Get the rows of some Storm IDs, sorted by Storm ID and date-time.
+
+        Each storm is a slice of `df_full` (see `storm_offsets`), so no row outside the storms is scanned.
+        """
+        if isinstance(self.df_full, LazyTimeseries):
+            return self.df_full.get_storms(stormIDs).sort_values(by=["Storm ID", "yyyymmddHHMM"])
+        if self.storm_offsets is None:
+            df = self.df_full[ self.df_full["Storm ID"].isin(stormIDs) ]
+            return df.sort_values(by=["Storm ID", "yyyymmddHHMM"])
+        spans = [self.storm_offsets[x] for x in sorted(set(stormIDs)) if x in self.storm_offsets]
+        if len(spans) == 1:
+            return self.df_full.iloc[ spans[0][0]:spans[0][1] ]
+        return self.df_full.iloc[ np.concatenate([np.arange(a, b) for a, b in spans]) if spans else [] ]
+
+
+
+    def _filter_mask(self, base: pd.DataFrame, var: str, lo, hi) -> np.ndarray:
+        """
+        Get the boolean mask of the rows of `base` within `[lo, hi]`. Binary search if `var` has a sorted index.
+        """
+        if self.indexes and var in self.indexes and base is (self.df_full if self.is_timeseries else self.df_normal):
+            return self.indexes[var].range_mask(lo, hi)
+        col = base[var]
+        return ((col >= lo) & (col <= hi)).to_numpy(dtype=bool, na_value=False)
+
+
+
+    def _apply_filters(self, start: int = 0):
+        """
+        Recombine the filters from the `start`-th one and get the current dataset as a view (see `get_view()`).
+
+        The row positions after each earlier filter and the mask of each filter are memoized, so removing or undoing
+        a filter only intersects the masks of the filters after it. The base dataset is never copied: the current
+        dataset is the base dataset read through `self.positions`.
+        """
+        if not self.filters and self.stormID is None:
+            self._reset_filters()
+            return self.get_view()
+        base = self._get_base()
+        del self._steps[start:]
+        for f in self.filters[len(self._steps):]:
+            mask = self._masks.get(f)
+            if mask is None:
+                mask = self._masks[f] = self._filter_mask(base, *f)
+            prev = self._steps[-1] if self._steps else None
+            self._steps.append( np.flatnonzero(mask) if prev is None else prev[ mask[prev] ] )
+        self._masks = {f: mask for f, mask in self._masks.items() if f in self.filters}
+        self.df_current = base
+        self.positions = self._steps[-1] if self._steps else None
+        return self.get_view()
+
+
+
+    def set_filter(self, var, min, max):
+        """
+        Add a filter to the current dataset.
+
+        Each filter narrows the rows of the previous filters. Timeseries datasets are filtered from the full dataset (or the Storm ID subset).
+        With sorted indexes, the rows of a filter are found by binary search.
+        """
+        if isinstance(min, np.ndarray): min = min.item() # The GUI gives date-times as 0-d arrays.
+        if isinstance(max, np.ndarray): max = max.item()
+        self.filters.append( (var, min, max) )
+        return self._apply_filters( len(self.filters) - 1 )
+
+
+
+    def remove_filter(self, i: int):
+        """
+        Remove the `i`-th filter. Only the filters after it are recombined.
+        """
+        del self.filters[i]
+        return self._apply_filters(i)
+
+
+
+    def undo_filter(self):
+        """
+        Remove the last filter.
+        """
+        return self.remove_filter( len(self.filters) - 1 )
+
+
+
+    def set_filters(self, filters: list[tuple]):
+        """
+        Replace the active filters (ex. reordered). Only the filters after the unchanged first ones are recombined.
+        """
+        start = 0
+        while start < min(len(filters), len(self.filters)) and filters[start] == self.filters[start]:
+            start += 1
+        self.filters = list(filters)
+        return self._apply_filters(start)
+
+
+
+    def export_current(self, fpath: str, fmt: str = "csv"):
+        """
+        Exports the current dataset to CSV, Parquet or Feather. Filtered rows are written `EXPORT_CHUNK_ROWS` at a time, never copied whole.
+        Truncated lazy Timeseries datasets are read and written again one storm at a time, so every filtered row is exported.
+
+        Parameters
+        ---
+        fpath: The filepath of the file.
+        fmt: The output format. One of `EXPORT_FORMATS`.
+        """
+        if self.is_truncated:
+            writer = StreamWriter( fpath, fmt )
+            try:
+                for df in self.df_full.iter_storms( self._lazy_stormIDs(self.filters) ):
+                    mask = self._rows_mask(df, self.filters)
+                    if mask.any() or writer.columns is None: writer.write( df[mask] )
+                writer.close()
+            except BaseException:
+                writer.abort()
+                raise
+            return
+        if self.positions is None:
+            func_write_dataset( self.df_current, fpath, fmt )
+            return
+        writer = StreamWriter( fpath, fmt )
+        try:
+            for i in range(0, max(len(self.positions), 1), EXPORT_CHUNK_ROWS):
+                writer.write( self.df_current.take(self.positions[i : i+EXPORT_CHUNK_ROWS]) )
+            writer.close()
+        except BaseException:
+            writer.abort()
+            raise
+
+
+
+    def get_current_min_max(self, names: list[str]) -> dict:
+        """
+        Get the minimum and maximum of variables in the current dataset, or `None` if all NaN. Numbers are rounded.
+
+        Filtered datasets are only read at the positions of the filtered rows. Truncated lazy Timeseries datasets use the
+        statistics of every filtered row (see `_select_lazy()`).
+        """
+        res = {}
+        for name in names:
+            if self.is_truncated and name in self._lazy_stats:
+                stats = self._lazy_stats[name]
+            else:
+                col = self.df_current[name].array
+                stats = ColumnStats( col if self.positions is None else col.take(self.positions) )
+            if stats.is_all_nan:
+                res[name] = None
+            elif stats.is_datetime:
+                res[name] = [stats.get_min(), stats.get_max()]
+            else:
+                res[name] = [np.around( stats.min, decimals=self.dec ), np.around( stats.max, decimals=self.dec )]
+        return res
+
+
+
+    def get_plot_data(self, var, min_dt, max_dt, stormIDs = None, only_one_dt = False, max_points: int = None, method: str = "lttb"):
+        """
+        Get data to plot peaks or timeseries data.
+
+        Parameters
+        ---
+        max_points: Downsample the lines to about this many points in total, shared by the Storm IDs (see `code05_downsample.py`). Default: every point.
+        method: The downsampling method. One of `DOWNSAMPLE_METHODS`.
+        """
         if self.is_timeseries and len(stormIDs) > 1:
             # Get truncated dataset of Storm IDs and necessary data.
-            ids_chosen = [int(x) for x in stormIDs]
-            ids_full_dataset = self.df_full["Storm ID"]
-            indxs = [i for i, z in enumerate(ids_full_dataset) if z in ids_chosen]
-            df = self.df_full.iloc[indxs]
-            df = df[["Storm ID", var, "yyyymmddHHMM"]].sort_values(by=["Storm ID", "yyyymmddHHMM"])
-            # Get time stamps of every Storm ID
-            _, cnts = np.unique(df["Storm ID"], return_counts=True)
-            timesteps = [np.arange(1, x+1) for x in cnts]
-            timesteps = np.array( list(itertools.chain(*timesteps)) )
+            df = self._get_storms( sorted({int(x) for x in stormIDs}) )[["Storm ID", var, "yyyymmddHHMM"]]
+            # Get time stamps of every Storm ID: 1, 2, ... from the first row of each storm.
+            _, firsts, cnts = np.unique(df["Storm ID"], return_index=True, return_counts=True)
+            timesteps = np.arange(1, len(df)+1) - np.repeat(firsts, cnts)
+            if max_points is not None and len(df) > max_points:
+                # Downsample each Storm ID on its own budget.
+                y = df[var].to_numpy()
+                pos = np.concatenate([ a + func_downsample( timesteps[a:a+n], y[a:a+n], k, method )
+                                       for a, n, k in zip(firsts, cnts, func_split_budget(cnts, max_points)) ])
+                df = df.iloc[pos]
+                timesteps = timesteps[pos]
             timesteps = timesteps[:, np.newaxis]
             df = np.concatenate( (timesteps, df.to_numpy()), axis=1 ) # Add time steps
             return pd.DataFrame(df, columns=['Time Step', 'Storm ID', var, 'Date-Time'])
         
         else:
             if self.is_timeseries:
-                df = self.df_full.loc[ self.df_full["Storm ID"] == int(stormIDs[0]) ]
-                df.sort_values( by=["Storm ID", "yyyymmddHHMM"], inplace=True )
+                df = self._get_storms( [int(stormIDs[0])] )
             else:
                 df = self.df_normal.sort_values( by=["yyyymmddHHMM"] )
             df = df[df["yyyymmddHHMM"] != pd.NaT]
             if min_dt != None: # If there is a time filter.
                 df = df[ (df["yyyymmddHHMM"] >= min_dt) & (df["yyyymmddHHMM"] <= max_dt) ]
+            if max_points is not None and len(df) > max_points:
+                x = np.arange(len(df)) if only_one_dt else df["yyyymmddHHMM"] # Lines are drawn in row order.
+                df = df.iloc[ func_downsample( x, df[var], max_points, method ) ]
             if only_one_dt:
                 return pd.DataFrame({ "Storm ID":df["Storm ID"], var:df[var] })
             else:
@@ -782,65 +1577,484 @@ class H5_Organized_New:
 
 
 
-def func_processFile(fpath: str, msg: str):
+def func_convert(fpath: str, will_export: bool, is_cmd: bool, fmt: str = "csv", use_cache: bool = True, read_filter: ReadFilter = None):
+    """
+    Converts one file, or loads it from the conversion cache (see `code03_cache.py`) if it was converted before.
+
+    Parameters
+    ---
+    fpath, will_export, is_cmd, fmt, read_filter: See `H5_Organized_New.run()`.
+    use_cache: Boolean for using the cache. Also off if `CHS_CACHE=0` or with an active `read_filter` (filtered datasets are never cached).
+
+    Returns the `H5_Organized_New` object and the filepath of its cached descriptor (`None` if not cached).
+    The performance report of the conversion is in `h5.progress.report` (see `code08_progress.py`).
+    """
+    progress = Progress( os.path.basename(fpath.split(";")[-1]), "\r" if is_cmd else "\n" )
+    use_cache = use_cache and func_cache_enabled() and not (read_filter and read_filter.is_active)
+    if use_cache:
+        key, info = func_cache_key(fpath)
+        h5, fpath_desc = func_cache_load( key, complete=not is_cmd )
+        if h5 is not None:
+            print(f"Loaded from cache: {os.path.dirname(fpath_desc)}")
+            progress.status( stage="cache" )
+            h5.progress = progress
+            for obj in (h5.h5s or [h5]):
+                obj.fpath = fpath
+                obj.export = will_export
+                obj.is_cmd = is_cmd
+                obj.end_print = "\r" if is_cmd else "\n"
+                obj.export_format = fmt
+                obj.progress = progress
+                if will_export: obj._laminate()
+            if is_cmd: func_cache_release(fpath_desc) # Exported: The columns aren't used anymore.
+            progress.finish()
+            return h5, fpath_desc
+
+    h5 = H5_Organized_New()
+    h5.run( fpath, will_export, is_cmd, fmt, read_filter=read_filter, progress=progress )
+    fpath_desc = None
+    # Streamed datasets (CMD method) are never held in memory, so they can't be cached.
+    if use_cache and not h5.is_streamed:
+        fpath_desc = func_cache_put( key, info, h5, complete=not is_cmd )
+        if is_cmd and fpath_desc: func_cache_release(fpath_desc)
+        progress.status( stage="cache" )
+    progress.finish()
+    return h5, fpath_desc
+
+
+
+def convert(fpath: str, read_filter: ReadFilter = None, use_cache: bool = False, verbose: bool = False) -> dict[str, H5_Organized_New]:
+    """
+    Library API: Converts one HDF5 file without exporting it. The datasets can be filtered, plotted and exported like in the GUI.
+
+    Parameters
+    ---
+    fpath: The complete filepath of the HDF5 file. ZIP references use `[ZIP filepath];[HDF5 filepath in ZIP]`.
+    read_filter: Storm IDs, date-time window, variable ranges and variables to keep, applied while reading (see `func_parse_filter()`).
+    use_cache: Boolean for using the conversion cache (see `code03_cache.py`). Off by default, like the CMD method. Datasets loaded
+               from the cache map its files, so their entries are kept until `func_cache_release()` or the end of the process.
+    verbose: Boolean for printing the progress of the conversion.
+
+    Returns a dictionary of dataset names to `H5_Organized_New` objects. Most files yield one dataset.
+    """
+    with contextlib.ExitStack() as stack:
+        if not verbose:
+            stack.enter_context( contextlib.redirect_stdout(stack.enter_context(open(os.devnull, "w"))) )
+        h5, _ = func_convert( fpath, False, False, use_cache=use_cache, read_filter=read_filter )
+    return {obj.name: obj for obj in (h5.h5s or [h5])}
+
+
+
+def export(dataset, fmt: str = "csv", dest: str = None) -> str:
+    """
+    Library API: Exports a dataset to CSV, Parquet or Feather.
+
+    Parameters
+    ---
+    dataset: An `H5_Organized_New` object (the complete dataset is written) or a DataFrame (ex. `get_data_current()`).
+    fmt: The output format. One of `EXPORT_FORMATS`.
+    dest: The filepath of the file, or a directory for `[dataset name][extension]`. Default: `DIR_RESULTS`. DataFrames need a filepath.
+
+    Returns the filepath of the file.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'. Choose from: {', '.join(EXPORT_FORMATS)}.")
+    is_dir = dest is None or os.path.isdir(dest)
+    if isinstance(dataset, pd.DataFrame):
+        if is_dir: raise ValueError("Exporting a DataFrame needs the filepath of the file.")
+        func_write_dataset( dataset, dest, fmt )
+        return dest
+    fpath = os.path.join( dest or DIR_RESULTS, dataset.name + EXPORT_FORMATS[fmt] ) if is_dir else dest
+    dataset.export_data( fmt, fpath )
+    return fpath
+
+
+
+def func_processFile(fpath: str, msg: str, fmt: str = "csv", read_filter: ReadFilter = None):
+    """
+    Converts one file (CMD method, one worker). Returns the same as `func_processFile_worker()`, and fails the same way.
+    """
     print(f"\n{msg}: Converting {fpath}")
     t1 = time.time()
-    h5 = H5_Organized_New()
-    h5.run( fpath, True, True )
-    print(f"\nTime elapsed: {str(timedelta(seconds = time.time() - t1))}")
-    t = f"Output saved in {DIR_RESULTS}"
-    print(t)
+    report = None
+    try:
+        h5, _ = func_convert( fpath, True, True, fmt, read_filter=read_filter )
+        err = None
+        report = h5.progress.report
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}"
+        print(f"\nFAILED ({err})")
+    else:
+        rate = f" | {func_format_rate(report['rows_per_s'], report['mb_per_s'])}" if report["rows"] else ""
+        print(f"\nTime elapsed: {str(timedelta(seconds = time.time() - t1))}{rate}")
+        t = f"Output saved in {DIR_RESULTS}"
+        print(t)
+    return fpath, time.time() - t1, err, report
+
+
+
+def func_processFile_worker(fpath: str, fmt: str = "csv", read_filter: ReadFilter = None):
+    """
+    Converts one file inside a worker process (CMD method, `--jobs`). Progress prints are silenced so workers don't interleave.
+
+    Returns the filepath, the time elapsed in seconds, the error message (`None` if successful) and the performance report (`None` if failed).
+    """
+    t1 = time.time()
+    report = None
+    try:
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            h5, _ = func_convert( fpath, True, True, fmt, read_filter=read_filter )
+        err = None
+        report = h5.progress.report
+    except Exception as e:
+        err = f"{type(e).__name__}: {e}"
+    return fpath, time.time() - t1, err, report
+
+
+
+def func_available_memory():
+    """
+    Get the available physical memory in bytes. Returns `None` if it can't be determined.
+    """
+    try:
+        if system() == "Windows":
+            import ctypes
+            class MEMORYSTATUSEX(ctypes.Structure):
+                _fields_ = [("dwLength", ctypes.c_ulong), ("dwMemoryLoad", ctypes.c_ulong),
+                            ("ullTotalPhys", ctypes.c_ulonglong), ("ullAvailPhys", ctypes.c_ulonglong),
+                            ("ullTotalPageFile", ctypes.c_ulonglong), ("ullAvailPageFile", ctypes.c_ulonglong),
+                            ("ullTotalVirtual", ctypes.c_ulonglong), ("ullAvailVirtual", ctypes.c_ulonglong),
+                            ("ullAvailExtendedVirtual", ctypes.c_ulonglong)]
+            stat = MEMORYSTATUSEX()
+            stat.dwLength = ctypes.sizeof(MEMORYSTATUSEX)
+            ctypes.windll.kernel32.GlobalMemoryStatusEx(ctypes.byref(stat))
+            return int(stat.ullAvailPhys)
+        if system() == "Linux":
+            with open("/proc/meminfo") as r:
+                for line in r:
+                    if line.startswith("MemAvailable:"):
+                        return int(line.split()[1]) * 1024
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except:
+        return None
+
+
+
+def func_file_size(fpath: str):
+    """
+    Get the size of an HDF5 file in bytes. For `[ZIP filepath];[HDF5 filepath in ZIP]`, get the uncompressed size of the HDF5 file.
+    """
+    if ";" in fpath:
+        fs = fpath.split(";")
+        with ZipFile(fs[0]) as z:
+            return z.getinfo(fs[1]).file_size
+    return os.path.getsize(fpath)
+
+
+
+def func_memory_budget():
+    """
+    Get the memory budget of imported datasets in bytes: `CHS_MEMORY_BUDGET` (in GB) if set, else `MEMORY_BUDGET_FRACTION` of the available memory.
+    """
+    if os.environ.get("CHS_MEMORY_BUDGET"):
+        return int( float(os.environ["CHS_MEMORY_BUDGET"]) * 1024**3 )
+    mem = func_available_memory()
+    return int( MEMORY_BUDGET_FRACTION * mem ) if mem else 4 * 1024**3
+
+
+
+def func_file_type(fpath: str) -> str:
+    """Get the type of an HDF5 file from the last part of its filename (ex. "Peaks", "Timeseries")."""
+    return os.path.basename(fpath.split(";")[-1]).split(".")[0].split("_")[-1]
+
+
+
+def _func_count_attrs(attrs) -> tuple[int, int]:
+    """Count the numerical and the string attributes of an HDF5 file or group."""
+    n_str = sum( isinstance(v, (str, bytes)) or getattr(v, "dtype", np.dtype(float)).kind in "SOU" for v in attrs.values() )
+    return len(attrs) - n_str, n_str
+
+
+
+def func_estimate_memory(fpath: str) -> tuple[int, int]:
+    """
+    Estimate the memory of importing an HDF5 file from its metadata only: the shapes and types of its datasets and the
+    attributes of its groups. No dataset is read.
+
+    Each group is a table: its datasets are columns and its attributes are repeated on every row. The file's attributes are metadata.
+    Numbers take `MEM_BYTES_NUMBER` bytes and strings take `MEM_BYTES_STRING` bytes.
+
+    Returns the estimated bytes of:
+    * Kept: What the imported dataset keeps in the GUI. Numerical columns and sorted indexes are memory-mapped from the
+      handed-off files (see `code02_columnar.py`), so only text columns count. Timeseries files keep one row per storm and
+      the `LazyTimeseries.CACHE_STORMS` largest storms.
+    * Convert: The peak memory of the worker converting the file: the values of the file times `MEM_CONVERT_FACTOR`.
+      Timeseries files are converted one storm at a time, so only their largest storm counts.
+
+    Compressed HDF5 files in ZIP files can't be opened without decompressing them, so both are `MEM_PER_FILE_FACTOR` times their size.
+
+    Parameters
+    ---
+    fpath: The complete filepath of the HDF5 file. ZIP references use `[ZIP filepath];[HDF5 filepath in ZIP]`.
+    """
+    if ";" in fpath:
+        fs = fpath.split(";")
+        with ZipFile(fs[0]) as z:
+            info = z.getinfo(fs[1])
+        if info.compress_type != ZIP_STORED:
+            return MEM_PER_FILE_FACTOR * info.file_size, MEM_PER_FILE_FACTOR * info.file_size
+    is_timeseries = func_file_type(fpath) == "Timeseries"
+    kept = total = 0
+    sizes = [] # Timeseries: Size of each storm.
+    with func_open_h5(fpath) as h5:
+        f_num, f_str = _func_count_attrs(h5.attrs)
+        for g in [h5, *[x for x in h5.values() if isinstance(x, h5py.Group)]]:
+            datasets = [x for x in g.values() if isinstance(x, h5py.Dataset)]
+            if not datasets: continue
+            rows = max( x.size for x in datasets )
+            g_num, g_str = (0, 0) if g is h5 else _func_count_attrs(g.attrs)
+            n_num = sum( x.size for x in datasets if x.dtype.kind not in "SOU" ) + rows * g_num
+            n_str = sum( x.size for x in datasets if x.dtype.kind in "SOU" ) + rows * g_str
+            size = n_num * MEM_BYTES_NUMBER + n_str * MEM_BYTES_STRING
+            total += size
+            if is_timeseries: # One row per storm.
+                kept += (len(datasets) + f_num + f_str + g_num + g_str) * MEM_BYTES_STRING
+                sizes.append(size)
+            else:
+                kept += n_str * MEM_BYTES_STRING
+    if not is_timeseries:
+        return kept, MEM_CONVERT_FACTOR * total
+    sizes.sort(reverse=True)
+    largest = sizes[0] if sizes else 0
+    return kept + sum(sizes[:LazyTimeseries.CACHE_STORMS]), kept + MEM_CONVERT_FACTOR * largest
+
+
+
+def func_default_jobs(lst: list[tuple[str, str, int]]):
+    """
+    Pick the number of worker processes from the number of cores and the available memory.
+
+    Each worker is assumed to need the peak memory of converting the largest file (see `func_estimate_memory()`).
+    Only the largest Timeseries file and the largest other file are estimated, so no other file is opened.
+
+    Parameters
+    ---
+    lst: The files to convert: `(filepath, message, size in bytes)` (see `func_collect_files()`).
+    """
+    n_jobs = min( os.cpu_count() or 1, len(lst) )
+    mem = func_available_memory()
+    if mem and lst:
+        largest = {} # Is Timeseries: (size, filepath).
+        for fpath, _, size in lst:
+            is_timeseries = func_file_type(fpath) == "Timeseries"
+            largest[is_timeseries] = max( largest.get(is_timeseries, (-1, "")), (size, fpath) )
+        per_job = 0
+        for size, fpath in largest.values():
+            try:
+                per_job = max( per_job, func_estimate_memory(fpath)[1] )
+            except Exception: # Ex. corrupt files: Their conversion fails anyway.
+                per_job = max( per_job, MEM_PER_FILE_FACTOR * size )
+        if per_job > 0:
+            n_jobs = min( n_jobs, mem // per_job )
+    return max( int(n_jobs), 1 )
+
+
+
+def func_collect_files(paths: list[str]):
+    """
+    Find every HDF5 file to convert from the command line inputs. Returns a list of `(filepath, message, size in bytes)`.
+
+    ZIP files yield `[ZIP filepath];[HDF5 filepath in ZIP]` and the uncompressed size of the HDF5 file, read once from the
+    directory of the ZIP file. Directories are scanned through all subdirectories.
+    """
+    lst = []
+    for fpath in paths:
+        ftype = fpath.split(".")[-1]
+        
+        # Process 1 HDF5 file.
+        if ftype == "h5":
+            lst.append( (fpath, "1 HDF5 file", os.path.getsize(fpath) if os.path.isfile(fpath) else 0) )
+        
+        # Process 1 ZIP file.
+        elif ftype == "zip":
+            with ZipFile(fpath) as czip:
+                # Find HDF5 file path within ZIP file.
+                for info in czip.infolist():
+                    if info.filename.split(".")[-1] == "h5":
+                        lst.append( (f"{fpath};{info.filename}", "1 ZIP file", info.file_size) )
+        
+        # Process a directory of HDF5 files throughout all subdirectories.
+        elif os.path.isdir(fpath):
+            # Find all compatible files.
+            lst_dir = []
+            for (root, dirs, files) in os.walk(fpath):
+                if len(files) > 0:
+                    lst_dir.extend( [os.path.join(root, f) for f in files if f.split(".")[-1] == "h5"] )
+            print(f"Directory (HDF5): FOUND {str(len(lst_dir))} FILES")
+            lst.extend( [(f, "Directory (HDF5)", os.path.getsize(f)) for f in lst_dir] )
+        
+        # Invalid input.
+        else:
+            print(f"\nIncompatible file or folder: {fpath}")
+    return lst
 
 
 
+def func_processBatch(lst: list[tuple[str, str, int]], n_jobs: int, fmt: str = "csv", read_filter: ReadFilter = None):
+    """
+    Converts all files with a pool of `n_jobs` worker processes. Prints one summary of the time spent on each file.
 
-if len(sys.argv) > 1:
+    Returns a list of `(filepath, seconds, error, report)` (see `func_processFile_worker()`). A file whose worker died
+    (ex. killed for running out of memory) is failed. The pool then breaks, so every file still pending is failed too.
+    """
+    from concurrent.futures import ProcessPoolExecutor # Imports multiprocessing. Only needed by the CMD method.
+    print(f"\nBatch: CONVERTING {len(lst)} FILES WITH {n_jobs} WORKERS")
+    t1 = time.time()
+    results = []
+    with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+        futures = {pool.submit(func_processFile_worker, fpath, fmt, read_filter): fpath for fpath, *_ in lst}
+        for i, future in enumerate(as_completed(futures)):
+            try:
+                fpath, secs, err, report = future.result()
+            except Exception as e: # Ex. `BrokenProcessPool`.
+                fpath, secs, err, report = futures[future], 0.0, f"{type(e).__name__}: {e}", None
+            results.append( (fpath, secs, err, report) )
+            res = "Finished!" if err is None else f"FAILED ({err})"
+            print(f"[{i+1}/{len(lst)}] {res} {str(timedelta(seconds = secs))} | {fpath}")
+    
+    # Summary.
+    t_wall = time.time() - t1
+    t_files = sum(x[1] for x in results)
+    failed = [x for x in results if x[2] is not None]
+    print("\nSummary")
+    print(f"* Files converted: {len(results) - len(failed)}/{len(results)}")
+    print(f"* Slowest file: {str(timedelta(seconds = max(x[1] for x in results)))} | {max(results, key=lambda x: x[1])[0]}")
+    print(f"* Time spent on all files: {str(timedelta(seconds = t_files))}")
+    print(f"* Time elapsed: {str(timedelta(seconds = t_wall))} (x{t_files / t_wall if t_wall > 0 else 1:.1f} speedup)")
+    for fpath, _, err, _ in failed:
+        print(f"* FAILED: {fpath} | {err}")
+    print(f"Output saved in {DIR_RESULTS}")
+    return results
+
+
+
+def func_save_report(results: list[tuple], t_wall: float, n_jobs: int, fmt: str) -> str:
+    """
+    Write the performance report of a run (CMD method) as JSON next to the exported datasets: `CHS_Report_[date-time].json`.
 
-    # Running from program.
-    if sys.argv[1] == "1":
-        will_export = eval(sys.argv[2])
-        fpath = str(sys.argv[3])
-        h5 = H5_Organized_New()
-        h5.run( fpath, will_export, False )
-        sys.stdout.buffer.write( pickle.dumps( [h5] ) )
-        sys.stdout.buffer.flush()
+    Parameters
+    ---
+    results: List of `(filepath, seconds, error, report)` of each file. See `Progress.finish()` for the reports.
+    t_wall: The time elapsed of the run in seconds.
+    n_jobs, fmt: The number of worker processes and the output format.
+
+    Returns the filepath of the report.
+    """
+    files = [{**(report or {}), "path": fpath, "seconds": round(secs, 3), "error": err} for fpath, secs, err, report in results]
+    rows = sum(f.get("rows", 0) for f in files)
+    nbytes = sum(f.get("bytes", 0) for f in files)
+    stages = {}
+    for f in files:
+        for name, stage in f.get("stages", {}).items():
+            x = stages.setdefault( name, {"seconds": 0.0, "rows": 0, "bytes": 0} )
+            for k in x: x[k] += stage[k]
+    run = {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "format": fmt, "jobs": n_jobs, "seconds": round(t_wall, 3),
+           "files_converted": sum(f["error"] is None for f in files), "files_failed": sum(f["error"] is not None for f in files),
+           "rows": rows, "bytes": nbytes, "rows_per_s": round(rows / t_wall) if t_wall > 0 else 0,
+           "mb_per_s": round(nbytes / t_wall / 1e6, 2) if t_wall > 0 else 0,
+           "stages": {k: {**v, "seconds": round(v["seconds"], 3)} for k, v in stages.items()}, "files": files}
+    fpath = os.path.join( DIR_RESULTS, f"CHS_Report_{time.strftime('%Y%m%d-%H%M%S')}.json" )
+    with open(fpath, "w") as w:
+        json.dump(run, w, indent=1)
+    return fpath
+
+
+
+
+if __name__ == "__main__" and len(sys.argv) > 1:
+
+    # Running from program: Persistent worker of the GUI's pool. Reads one job per line from stdin: "[0 or 1 for exporting]\t[filepath]".
+    # Stdout only carries JSON events (see `code08_progress.py`). Other prints go to stderr.
+    if sys.argv[1] == "2":
+        import traceback
+        # Import these files as modules so the descriptor unpickles as `code01_h5organize.H5_Organized_New` in the GUI,
+        # and events go through the stream of the imported module.
+        from code01_h5organize import func_convert
+        from code02_columnar import func_dump
+        from code08_progress import func_emit, func_set_event_stream
+        func_set_event_stream(sys.stdout)
+        sys.stdout = sys.stderr
+        func_emit( "ready" )
+        for line in sys.stdin:
+            if not line.strip(): continue
+            will_export, fpath = line.rstrip("\n").split("\t", 1)
+            # The GUI locked the cache entries of the last job when it mapped them (see `func_cache_acquire()`).
+            func_cache_release()
+            try:
+                h5, fpath_desc = func_convert( fpath, will_export == "1", False )
+                func_emit( "result", path=fpath_desc or func_dump(h5) )
+            except Exception as e:
+                traceback.print_exc()
+                func_emit( "failed", error=f"{type(e).__name__}: {e}" )
+            func_emit( "done" )
 
     # Running from command line.
     else:
+        import argparse
+        # Import this file as a module so cached datasets unpickle as `code01_h5organize.H5_Organized_New` in the GUI.
+        from code01_h5organize import func_collect_files, func_default_jobs, func_processBatch, func_processFile, func_save_report
+        def func_jobs(x: str):
+            """Parse `--jobs`: 'auto' or a positive number of worker processes."""
+            if x == "auto": return x
+            try:
+                n = int(x)
+            except ValueError:
+                n = 0
+            if n < 1: raise argparse.ArgumentTypeError(f"expected 'auto' or a positive integer, got '{x}'")
+            return n
+        parser = argparse.ArgumentParser( prog="code01_h5organize.py", description="The CHS HDF5 Converter: The CMD Method." )
+        parser.add_argument( "paths", nargs="+", help="HDF5 files, ZIP files and/or directories of HDF5 files." )
+        parser.add_argument( "-j", "--jobs", default="auto", type=func_jobs,
+                             help="Number of worker processes. Default: 'auto' (based on the number of cores and the available memory)." )
+        parser.add_argument( "-f", "--format", default="csv", choices=list(EXPORT_FORMATS),
+                             help="Output format of the datasets. Parquet and Feather keep the column types and are much smaller. Default: csv." )
+        parser.add_argument( "--zip-memory-limit", type=float, metavar="MB",
+                             help=f"Largest compressed HDF5 file in a ZIP file to decompress into memory instead of a temporary file. Default: {ZIP_MEMORY_LIMIT} MB." )
+        parser.add_argument( "--cache", action="store_true",
+                             help="Use the conversion cache (see code03_cache.py): load unchanged files from it and store new ones. "
+                                  "Every converted dataset is then written twice: once exported and once in the cache." )
+        # Filters applied while reading: Storms and rows outside them are never converted nor exported.
+        parser.add_argument( "--storms", metavar="IDS", help="Storm IDs to keep, ex. '1,4,10-20'." )
+        parser.add_argument( "--start", metavar="DATETIME", help="First date-time to keep (UTC), ex. '2000-01-31 18:30'." )
+        parser.add_argument( "--end", metavar="DATETIME", help="Last date-time to keep (UTC)." )
+        parser.add_argument( "--range", action="append", metavar="VAR:MIN:MAX", dest="ranges",
+                             help="Range of a variable to keep, ex. 'Hm0:0.5:3' or 'Water Elevation::2'. Can be repeated." )
+        parser.add_argument( "--vars", metavar="VARS",
+                             help="Variables (HDF5 datasets and attribute columns) to keep, ex. 'Water Elevation,Hm0'. Other datasets are never read. Storm ID and yyyymmddHHMM are always kept." )
+        args = parser.parse_args()
+        try:
+            read_filter = func_parse_filter( args.storms, args.start, args.end, args.ranges, args.vars )
+        except ValueError as e:
+            parser.error(str(e))
+        if not args.cache:
+            os.environ["CHS_CACHE"] = "0" # Inherited by worker processes.
+        if args.zip_memory_limit is not None:
+            os.environ["CHS_ZIP_MEMORY_LIMIT"] = str(args.zip_memory_limit) # Inherited by worker processes.
+
         print("\nRunning the CHS HDF5 Converter: The CMD Method...\n")
+        if read_filter.is_active: print(f"Filters: {read_filter}\n")
         # Open results folder.
         x = Popen( [open_directory, DIR_RESULTS] )
         time.sleep(1)
         x.kill()
 
         # Process all files.
-        for fpath in sys.argv[1:]:
-            ftype = fpath.split(".")[-1]
-            
-            # Process 1 HDF5 file.
-            if ftype == "h5":
-                func_processFile( fpath, "1 HDF5 file" )
-            
-            # Process 1 ZIP file.
-            elif ftype == "zip":
-                with ZipFile(fpath) as czip:
-                    # Find HDF5 file path within ZIP file.
-                    for subf in czip.namelist():
-                        if subf.split(".")[-1] == "h5":
-                            func_processFile( f"{fpath};{subf}", "1 ZIP file" )
-            
-            # Process a directory of HDF5 files throughout all subdirectories.
-            elif os.path.isdir(fpath):
-                # Find all compatible files.
-                lst = []
-                for (root, dirs, files) in os.walk(fpath):
-                    if len(files) > 0:
-                        lst.extend( [os.path.join(root, f) for f in files if f.split(".")[-1] == "h5"] )
-                # Process files.
-                print(f"Directory (HDF5): CONVERTING {str(len(lst))} FILES")
-                for f in lst:
-                    func_processFile( f, "Directory (HDF5)" )
-            
-            # Invalid input.
-            else:
-                print(f"\nIncompatible file or folder: {fpath}")
\ No newline at end of file
+        lst = func_collect_files(args.paths)
+        n_jobs = func_default_jobs(lst) if args.jobs == "auto" else min( args.jobs, len(lst) )
+        t1 = time.time()
+        if n_jobs > 1:
+            results = func_processBatch(lst, n_jobs, args.format, read_filter)
+        else:
+            results = [func_processFile( fpath, msg, args.format, read_filter ) for fpath, msg, _ in lst]
+        if results:
+            print(f"Performance report: {func_save_report( results, time.time() - t1, n_jobs, args.format )}")
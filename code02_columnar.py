@@ -0,0 +1,191 @@
+"""
+StormSim: File 3
+===
+Columnar handoff
+
+About
+---
+code02_columnar.py: Hands converted datasets between processes as memory-mapped column files.
+
+The converter writes each column of each DataFrame to its own `.npy` file and pickles the `H5_Organized_New`
+object without its DataFrames and sorted indexes (the descriptor). The other process maps the columns back with `np.load(..., mmap_mode="r")`,
+so numerical columns are never copied.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import os, pickle, shutil, tempfile, time
+
+import numpy as np
+import pandas as pd
+
+
+
+PREFIX = "CHS_Handoff_"
+"""Prefix of temporary handoff directories."""
+FRAMES = ["df_normal", "df_full", "df_current"]
+"""Attributes of `H5_Organized_New` objects holding DataFrames."""
+DESCRIPTOR = "descriptor.pkl"
+"""Filename of the pickled descriptor in a handoff directory."""
+INDEXES = "indexes"
+"""Attribute of `H5_Organized_New` objects holding sorted indexes (see `code04_stats.py`)."""
+INDEX_ARRAYS = ["order", "values"]
+"""Attributes of a sorted index holding arrays."""
+
+
+
+def _objects(h5) -> list:
+    """
+    Get the `H5_Organized_New` object and its sub-objects (`h5s`).
+    """
+    return [h5, *h5.h5s] if getattr(h5, "h5s", None) else [h5]
+
+
+
+def _dump_array(arr, fpath: str) -> dict:
+    """
+    Save one array (a column or an index) as an `.npy` file. Returns how to rebuild it.
+    """
+    info = {"file": os.path.basename(fpath), "kind": "array"}
+    if isinstance(arr, pd.RangeIndex):
+        return {"kind": "range", "start": arr.start, "stop": arr.stop, "step": arr.step}
+    if isinstance(arr.dtype, pd.DatetimeTZDtype):
+        info.update(kind="datetime_tz", tz=str(arr.dtype.tz))
+        arr = np.asarray(arr.tz_convert(None) if isinstance(arr, pd.Index) else arr.dt.tz_convert(None), dtype="datetime64[ns]")
+    elif arr.dtype.kind in "biufcmM":
+        arr = np.asarray(arr)
+    else:
+        # Text columns (Storm Name, Storm Type...) are saved as fixed-width strings when possible.
+        values = np.asarray(arr, dtype=object)
+        if all(isinstance(x, str) for x in values):
+            info["kind"] = "str"
+            arr = values.astype(str)
+        else:
+            info["kind"] = "object"
+            arr = values
+    np.save( fpath, arr, allow_pickle=(info["kind"] == "object") )
+    return info
+
+
+
+def _load_array(dir_in: str, info: dict):
+    """
+    Map one array from its `.npy` file.
+    """
+    if info["kind"] == "range":
+        return pd.RangeIndex(info["start"], info["stop"], info["step"])
+    fpath = os.path.join(dir_in, info["file"])
+    if info["kind"] == "object":
+        return np.load(fpath, allow_pickle=True)
+    arr = np.load(fpath, mmap_mode="r")
+    if info["kind"] == "datetime_tz":
+        return pd.DatetimeIndex(arr).tz_localize(info["tz"])
+    if info["kind"] == "str":
+        return arr.astype(object)
+    return arr
+
+
+
+def func_dump(h5, dir_out: str = None) -> str:
+    """
+    Write the DataFrames of an `H5_Organized_New` object to column files and pickle the rest as a descriptor.
+
+    Parameters
+    ---
+    h5: The `H5_Organized_New` object.
+    dir_out: The directory for the files. Default: a new temporary directory, inside `$CHS_HANDOFF_DIR` if set (ex. by the GUI's worker pool).
+
+    Returns the filepath of the descriptor.
+    """
+    if dir_out is None: dir_out = tempfile.mkdtemp(prefix=PREFIX, dir=os.environ.get("CHS_HANDOFF_DIR"))
+    os.makedirs(dir_out, exist_ok=True)
+    frames = {}    # id(DataFrame) -> frame number. DataFrames shared by attributes are written once.
+    manifest = {}  # frame number -> columns + index
+    stripped = []  # (object, attribute, DataFrame)
+    try:
+        for k, obj in enumerate(_objects(h5)):
+            for attr in FRAMES:
+                df = obj.__dict__.get(attr)
+                if not isinstance(df, pd.DataFrame): continue
+                if id(df) not in frames:
+                    j = len(frames)
+                    frames[id(df)] = j
+                    manifest[j] = {
+                        "columns": [ (col, _dump_array(df[col], os.path.join(dir_out, f"f{j}_c{i}.npy")))
+                                     for i, col in enumerate(df.columns) ],
+                        "index": _dump_array(df.index, os.path.join(dir_out, f"f{j}_index.npy"))
+                    }
+                stripped.append( (obj, attr, df) )
+                setattr(obj, attr, ("frame", frames[id(df)]))
+            # Sorted indexes: One `.npy` file per array.
+            for i, index in enumerate( (obj.__dict__.get(INDEXES) or {}).values() ):
+                for attr in INDEX_ARRAYS:
+                    arr = index.__dict__[attr]
+                    fname = f"x{k}_{i}_{attr}.npy"
+                    np.save( os.path.join(dir_out, fname), np.asarray(arr) )
+                    stripped.append( (index, attr, arr) )
+                    setattr(index, attr, ("array", fname))
+
+        # Pickle the descriptor without DataFrames.
+        fpath = os.path.join(dir_out, DESCRIPTOR)
+        with open(fpath, "wb") as w:
+            pickle.dump({"h5": h5, "frames": manifest}, w)
+    finally:
+        for obj, attr, df in stripped:
+            setattr(obj, attr, df)
+    return fpath
+
+
+
+def func_load(fpath: str):
+    """
+    Rebuild an `H5_Organized_New` object from a descriptor. Numerical columns stay memory-mapped from their files.
+
+    Parameters
+    ---
+    fpath: The filepath of the descriptor.
+    """
+    dir_in = os.path.dirname(fpath)
+    with open(fpath, "rb") as r:
+        d = pickle.load(r)
+    frames = {}
+    for j, info in d["frames"].items():
+        cols = {col: _load_array(dir_in, col_info) for col, col_info in info["columns"]}
+        index = _load_array(dir_in, info["index"])
+        frames[j] = pd.DataFrame(cols, index=index, columns=[col for col, _ in info["columns"]], copy=False)
+
+    h5 = d["h5"]
+    for obj in _objects(h5):
+        for attr in FRAMES:
+            x = obj.__dict__.get(attr)
+            if isinstance(x, tuple) and len(x) == 2 and x[0] == "frame":
+                setattr(obj, attr, frames[x[1]])
+        for index in (obj.__dict__.get(INDEXES) or {}).values():
+            for attr in INDEX_ARRAYS:
+                x = index.__dict__.get(attr)
+                if isinstance(x, tuple) and len(x) == 2 and x[0] == "array":
+                    setattr(index, attr, np.load( os.path.join(dir_in, x[1]), mmap_mode="r" ))
+    return h5
+
+
+
+def func_remove(fpath: str):
+    """
+    Delete a handoff directory from the filepath of its descriptor.
+    """
+    shutil.rmtree(os.path.dirname(fpath), ignore_errors=True)
+
+
+
+def func_remove_stale(max_age: float = 86400):
+    """
+    Delete temporary handoff directories older than `max_age` seconds (ex. left behind by a crash).
+    """
+    dir_tmp = tempfile.gettempdir()
+    for d in os.listdir(dir_tmp):
+        fpath = os.path.join(dir_tmp, d)
+        try:
+            if d.startswith(PREFIX) and time.time() - os.path.getmtime(fpath) > max_age:
+                shutil.rmtree(fpath, ignore_errors=True)
+        except OSError: pass
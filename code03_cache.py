@@ -0,0 +1,408 @@
+"""
+StormSim: File 4
+===
+Conversion cache
+
+About
+---
+code03_cache.py: Keeps converted datasets on disk, so unchanged HDF5 files are never converted twice.
+
+Each entry is a directory of column files and a descriptor (see `code02_columnar.py`), named after a key made from the
+source file (path, size, modification time, a fast content hash and the ZIP member) and the version of the converter.
+The least recently used entries are deleted once the cache grows over its size limit. Entries whose columns are mapped by
+a process (ex. a dataset imported in the GUI) are locked and never deleted (see `func_cache_acquire()`).
+
+Run `python code03_cache.py list` to inspect the cache and `python code03_cache.py prune` to clean it.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import argparse, hashlib, json, os, re, shutil, time
+from datetime import datetime
+from zipfile import ZipFile
+
+from code02_columnar import DESCRIPTOR, func_dump, func_load
+
+
+
+DIR_PROGRAM = os.path.dirname( os.path.abspath(__file__) )
+# Directory of the cache. Can be changed with the environment variable `CHS_CACHE_DIR`.
+if os.name == "nt":
+    DIR_CACHE = os.path.join( os.environ.get("LOCALAPPDATA", os.path.expanduser("~")), "CHS_HDF5_Converter", "cache" )
+else:
+    DIR_CACHE = os.path.join( os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")), "chs_hdf5_converter" )
+# Size limit of the cache in GB. Can be changed with the environment variable `CHS_CACHE_MAX_SIZE`.
+CACHE_MAX_SIZE = 20
+# Files hashed to version the converter, along with the program's modules they import (see `func_converter_files()`).
+# Changing any of them invalidates the cache.
+CONVERTER_FILES = ["code01_h5organize.py"]
+# Fast content hash: Bytes read from the start, middle and end of an HDF5 file.
+HASH_SAMPLE = 1024**2
+META = "meta.json"
+"""Filename of the entry's metadata (source file, size, completeness). Its modification time is the last access."""
+LOCK_PREFIX = "inuse_"
+"""Prefix of the lock files of an entry: `inuse_[process ID]`, locked while that process maps the entry's columns."""
+_locks = {}
+"""Entry directory -> open lock file of this process."""
+
+
+
+def func_cache_dir() -> str:
+    """Get the directory of the cache."""
+    return os.environ.get("CHS_CACHE_DIR", DIR_CACHE)
+
+
+
+def func_cache_max_size() -> int:
+    """Get the size limit of the cache in bytes."""
+    return int( float( os.environ.get("CHS_CACHE_MAX_SIZE", CACHE_MAX_SIZE) ) * 1024**3 )
+
+
+
+def func_cache_enabled() -> bool:
+    """The cache is off if the environment variable `CHS_CACHE` is "0" or its size limit is 0."""
+    return os.environ.get("CHS_CACHE", "1") != "0" and func_cache_max_size() > 0
+
+
+
+def func_converter_files() -> list[str]:
+    """
+    Get `CONVERTER_FILES` and every module of the program they import, directly or not (ex. `code04_stats.py`).
+    """
+    files = list(CONVERTER_FILES)
+    for f in files:
+        with open( os.path.join(DIR_PROGRAM, f), "r", encoding="utf8" ) as r:
+            for m in re.findall( r"^\s*(?:from|import)\s+(code\w+|gui\w+)", r.read(), flags=re.MULTILINE ):
+                if f"{m}.py" not in files and os.path.isfile( os.path.join(DIR_PROGRAM, f"{m}.py") ):
+                    files.append(f"{m}.py")
+    return sorted(files)
+
+
+
+_version = None
+def func_converter_version() -> str:
+    """
+    Get the version of the converter: a hash of `func_converter_files()`.
+    """
+    global _version
+    if _version is None:
+        h = hashlib.blake2b(digest_size=16)
+        for f in func_converter_files():
+            with open( os.path.join(DIR_PROGRAM, f), "rb" ) as r:
+                h.update( r.read() )
+        _version = h.hexdigest()
+    return _version
+
+
+
+def _hash_sample(f, size: int) -> str:
+    """Hash the start, middle and end of a file."""
+    h = hashlib.blake2b(digest_size=16)
+    for pos in sorted({ 0, max(size // 2 - HASH_SAMPLE // 2, 0), max(size - HASH_SAMPLE, 0) }):
+        f.seek(pos)
+        h.update( f.read(HASH_SAMPLE) )
+    return h.hexdigest()
+
+
+
+def func_source_info(fpath: str) -> dict:
+    """
+    Get the identity of a source file.
+
+    Parameters
+    ---
+    fpath: The complete filepath of the HDF5 file. ZIP references use `[ZIP filepath];[HDF5 filepath in ZIP]`.
+    """
+    fs = fpath.split(";")
+    path = os.path.abspath(fs[0])
+    st = os.stat(path)
+    info = {"path": path, "member": fs[1] if len(fs) > 1 else None, "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if info["member"]:
+        # The ZIP file already stores a checksum of each member.
+        with ZipFile(path) as z:
+            zi = z.getinfo(info["member"])
+        info["hash"] = f"crc32:{zi.CRC:08x}:{zi.file_size}"
+    else:
+        with open(path, "rb") as r:
+            info["hash"] = _hash_sample(r, st.st_size)
+    return info
+
+
+
+def func_cache_key(fpath: str) -> tuple[str, dict]:
+    """
+    Get the cache key of a source file and its identity.
+    """
+    info = func_source_info(fpath)
+    key = hashlib.blake2b( json.dumps( info | {"version": func_converter_version()}, sort_keys=True ).encode("utf8"),
+                           digest_size=16 ).hexdigest()
+    return key, info
+
+
+
+def _func_try_lock(f) -> bool:
+    """Lock an open file without waiting. The OS releases the lock when the file is closed or its process ends."""
+    try:
+        if os.name == "nt":
+            import msvcrt
+            f.seek(0)
+            msvcrt.locking( f.fileno(), msvcrt.LK_NBLCK, 1 )
+        else:
+            import fcntl
+            fcntl.flock( f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB )
+        return True
+    except OSError:
+        return False
+
+
+
+def func_cache_acquire(fpath: str) -> bool:
+    """
+    Lock a cache entry for this process, so other processes never delete it while its columns are mapped.
+    Locks last until `func_cache_release()` or the end of the process. Returns `False` if `fpath` isn't in the cache.
+
+    Parameters
+    ---
+    fpath: The filepath of a descriptor (see `func_cache_get()`). Handoff directories outside the cache are ignored.
+    """
+    d = os.path.dirname( os.path.abspath(fpath) )
+    if os.path.dirname(d) != os.path.abspath( func_cache_dir() ): return False
+    if d in _locks: return True
+    try:
+        f = open( os.path.join(d, f"{LOCK_PREFIX}{os.getpid()}"), "a+" )
+    except OSError:
+        return False
+    if not _func_try_lock(f):
+        f.close()
+        return False
+    _locks[d] = f
+    return True
+
+
+
+def func_cache_release(fpath: str = None):
+    """
+    Unlock a cache entry locked by this process (see `func_cache_acquire()`). Default: All of them.
+    """
+    dirs = list(_locks) if fpath is None else [ os.path.dirname( os.path.abspath(fpath) ) ]
+    for d in dirs:
+        f = _locks.pop(d, None)
+        if f is None: continue
+        f.close()
+        try: os.remove(f.name)
+        except OSError: pass
+
+
+
+def func_cache_in_use(d: str) -> bool:
+    """
+    Check if a process maps the columns of an entry. Lock files left by ended processes are deleted.
+
+    Parameters
+    ---
+    d: The directory of the entry.
+    """
+    d = os.path.abspath(d)
+    if d in _locks: return True
+    try:
+        names = [x for x in os.listdir(d) if x.startswith(LOCK_PREFIX)]
+    except OSError:
+        return False
+    for name in names:
+        try:
+            with open( os.path.join(d, name), "a+" ) as f:
+                if not _func_try_lock(f): return True
+            os.remove( os.path.join(d, name) )
+        except OSError:
+            return True # Locked (Windows can't open or delete a locked file).
+    return False
+
+
+
+def func_cache_get(key: str, complete: bool = False):
+    """
+    Get the filepath of a cached descriptor, or `None` on a cache miss. Marks the entry as recently used.
+
+    Parameters
+    ---
+    key: The cache key (see `func_cache_key()`).
+    complete: Only accept entries converted by the GUI, which include the filter metadata (`var_min_max_byID`).
+    """
+    d = os.path.join( func_cache_dir(), key )
+    try:
+        with open( os.path.join(d, META), "r" ) as r:
+            meta = json.load(r)
+        if complete and not meta["complete"]: return None
+        fpath = os.path.join(d, DESCRIPTOR)
+        if not os.path.isfile(fpath): return None
+        os.utime( os.path.join(d, META) )
+        return fpath
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+
+def func_cache_load(key: str, complete: bool = False):
+    """
+    Load a cached `H5_Organized_New` object and lock its entry for this process (see `func_cache_acquire()`). Broken entries are deleted.
+
+    Returns the object and the filepath of its descriptor, or `(None, None)` on a cache miss.
+    """
+    fpath = func_cache_get(key, complete)
+    if fpath is None: return None, None
+    func_cache_acquire(fpath)
+    try:
+        return func_load(fpath), fpath
+    except Exception:
+        func_cache_release(fpath)
+        shutil.rmtree( os.path.dirname(fpath), ignore_errors=True )
+        return None, None
+
+
+
+def func_cache_put(key: str, info: dict, h5, complete: bool):
+    """
+    Store a converted `H5_Organized_New` object and lock its entry for this process (see `func_cache_acquire()`).
+    Returns the filepath of the cached descriptor (`None` if it can't be stored).
+
+    The entry is written to a temporary directory first, so other processes never see half-written entries.
+    """
+    d_cache = func_cache_dir()
+    d = os.path.join(d_cache, key)
+    d_tmp = f"{d}.tmp{os.getpid()}"
+    try:
+        os.makedirs(d_cache, exist_ok=True)
+        shutil.rmtree(d_tmp, ignore_errors=True)
+        func_dump(h5, d_tmp)
+        size = sum( os.path.getsize(os.path.join(d_tmp, f)) for f in os.listdir(d_tmp) )
+        if size > func_cache_max_size():
+            # Would be the only entry and still over the size limit.
+            shutil.rmtree(d_tmp, ignore_errors=True)
+            return None
+        with open( os.path.join(d_tmp, META), "w" ) as w:
+            json.dump( info | {"version": func_converter_version(), "name": h5.name, "bytes": size,
+                               "complete": complete, "created": time.time()}, w, indent=1 )
+        if os.path.isdir(d):
+            # Replace an older entry (ex. a CMD entry by a complete GUI entry), unless a process maps it.
+            if func_cache_in_use(d): raise OSError("An older entry is in use.")
+            shutil.rmtree(d, ignore_errors=True)
+        os.rename(d_tmp, d)
+    except OSError as e:
+        print(f"WARNING: Can't store {h5.name} in the cache: {e}")
+        shutil.rmtree(d_tmp, ignore_errors=True)
+        return None
+    fpath = os.path.join(d, DESCRIPTOR)
+    func_cache_acquire(fpath)
+    func_cache_evict( keep=key )
+    return fpath
+
+
+
+def func_cache_entries() -> list[dict]:
+    """
+    Get the metadata of every cache entry, least recently used first. Adds `key`, `dir` and `last_access`.
+    """
+    d_cache = func_cache_dir()
+    res = []
+    if not os.path.isdir(d_cache): return res
+    for key in os.listdir(d_cache):
+        d = os.path.join(d_cache, key)
+        try:
+            if ".tmp" in key and time.time() - os.path.getmtime(d) < 3600: continue # Being written by another process.
+        except OSError: continue
+        try:
+            with open( os.path.join(d, META), "r" ) as r:
+                meta = json.load(r)
+            meta.update( key=key, dir=d, last_access=os.path.getmtime(os.path.join(d, META)) )
+        except (OSError, ValueError):
+            if not os.path.isdir(d): continue
+            # Broken or half-written entry.
+            meta = {"key": key, "dir": d, "name": "?", "bytes": 0, "last_access": os.path.getmtime(d), "broken": True}
+        res.append(meta)
+    return sorted( res, key=lambda m: m["last_access"] )
+
+
+
+def func_cache_evict(max_size: int = None, keep: str = None) -> list[dict]:
+    """
+    Delete the least recently used entries until the cache fits in `max_size` bytes. Entries in use are skipped
+    (see `func_cache_in_use()`). Returns the deleted entries.
+
+    Parameters
+    ---
+    max_size: Size limit in bytes. Default: `func_cache_max_size()`.
+    keep: Key of an entry to never delete (ex. the one just stored).
+    """
+    if max_size is None: max_size = func_cache_max_size()
+    entries = func_cache_entries()
+    total = sum( m["bytes"] for m in entries )
+    deleted = []
+    for m in entries:
+        if total <= max_size: break
+        if m["key"] == keep or func_cache_in_use(m["dir"]): continue
+        shutil.rmtree(m["dir"], ignore_errors=True)
+        total -= m["bytes"]
+        deleted.append(m)
+    return deleted
+
+
+
+def func_cache_is_stale(meta: dict) -> bool:
+    """
+    Check if an entry can never be used again: broken, made by another version of the converter, or its source file changed or is gone.
+    """
+    if meta.get("broken") or meta.get("version") != func_converter_version(): return True
+    try:
+        st = os.stat(meta["path"])
+        return st.st_size != meta["size"] or st.st_mtime_ns != meta["mtime_ns"]
+    except OSError:
+        return True
+
+
+
+def _size_str(n: float) -> str:
+    """Print bytes in readable units."""
+    for unit in ["B", "KB", "MB", "GB"]:
+        if n < 1024: return f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} TB"
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser( prog="code03_cache.py", description="The CHS HDF5 Converter: Inspect and prune the conversion cache." )
+    parser.add_argument( "command", choices=["list", "prune", "clear"],
+                         help="list: Show the cached datasets. prune: Delete stale entries and fit the cache in its size limit. clear: Delete the whole cache." )
+    parser.add_argument( "--max-size", type=float, metavar="GB", help=f"prune: Size limit. Default: {CACHE_MAX_SIZE} GB (or $CHS_CACHE_MAX_SIZE)." )
+    args = parser.parse_args()
+    d_cache = func_cache_dir()
+
+    if args.command == "list":
+        entries = func_cache_entries()
+        print(f"Cache: {d_cache}")
+        print(f"Entries: {len(entries)} | Size: {_size_str(sum(m['bytes'] for m in entries))} / {_size_str(func_cache_max_size())}\n")
+        for m in reversed(entries):
+            src = m.get("path", "?") + (f";{m['member']}" if m.get("member") else "")
+            flags = "stale" if func_cache_is_stale(m) else ("GUI" if m.get("complete") else "CMD")
+            if func_cache_in_use(m["dir"]): flags += ", in use"
+            print(f"{datetime.fromtimestamp(m['last_access']):%Y-%m-%d %H:%M}  {_size_str(m['bytes']):>10}  {flags:<12}  {m['name']}  ({src})")
+
+    elif args.command == "prune":
+        stale = [m for m in func_cache_entries() if func_cache_is_stale(m) and not func_cache_in_use(m["dir"])]
+        for m in stale:
+            shutil.rmtree(m["dir"], ignore_errors=True)
+        max_size = None if args.max_size is None else int(args.max_size * 1024**3)
+        evicted = func_cache_evict(max_size)
+        print(f"Deleted {len(stale)} stale and {len(evicted)} least recently used entries "
+              f"({_size_str(sum(m['bytes'] for m in stale + evicted))}).")
+
+    else:
+        in_use = [m for m in func_cache_entries() if func_cache_in_use(m["dir"])]
+        if in_use:
+            evicted = func_cache_evict(0)
+            print(f"Deleted {len(evicted)} entries. {len(in_use)} entries are in use (close the GUI first).")
+        else:
+            shutil.rmtree(d_cache, ignore_errors=True)
+            print(f"Deleted {d_cache}")
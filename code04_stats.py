@@ -0,0 +1,384 @@
+"""
+StormSim: File 5
+===
+Column statistics
+
+About
+---
+code04_stats.py: Computes the statistics of dataset columns (minimum, maximum, number of NaN values) and their sorted
+indexes for the filters, and describes the filters applied while reading HDF5 files.
+
+Statistics are built one chunk at a time (ex. one storm of a Timeseries file) and merged, so they are ready when the
+conversion ends without scanning the finished dataset again. Sorted indexes turn a range filter into a binary search.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import numpy as np
+import pandas as pd
+
+
+
+NAT = np.iinfo(np.int64).min
+"""Integer value of `NaT` in a `datetime64[ns]` array."""
+KEY_COLUMNS = ["Storm ID", "yyyymmddHHMM"]
+"""Columns always kept by a variable selection: Datasets are sorted and split by them."""
+
+
+
+class ColumnStats:
+    """
+    Statistics of one column: number of values, number of NaN/NaT values, minimum and maximum.
+
+    Date-times are kept as nanoseconds since 1970 (`int64`). Text columns only count values.
+    """
+
+    def __init__(self, values=None):
+        self.count = 0
+        self.n_nan = 0
+        self.min = None
+        """Minimum value, ignoring NaN/NaT. `None` if there are no values."""
+        self.max = None
+        """Maximum value, ignoring NaN/NaT. `None` if there are no values."""
+        self.is_datetime = False
+        self.is_numeric = True
+        self.tz = None
+        if values is not None: self.update(values)
+
+
+    def update(self, values) -> "ColumnStats":
+        """
+        Add a chunk of values (array, Series or Index) in one vectorized pass.
+        """
+        n = len(values)
+        if n == 0: return self
+        self.count += n
+
+        dtype = getattr(values, "dtype", None)
+        if isinstance(dtype, pd.DatetimeTZDtype) or (isinstance(dtype, np.dtype) and dtype.kind == "M"):
+            # Date-times: Compare nanoseconds. NaT is the smallest integer, so only the minimum has to skip it.
+            self.is_datetime = True
+            idx = pd.DatetimeIndex(values)
+            self.tz = idx.tz
+            arr = idx.as_unit("ns").asi8
+            valid = arr != NAT
+            n_valid = int(np.count_nonzero(valid))
+            self.n_nan += n - n_valid
+            if n_valid == 0: return self
+            mn = int( np.min(arr, where=valid, initial=np.iinfo(np.int64).max) )
+            mx = int( arr.max() )
+
+        else:
+            arr = np.asarray(values)
+            if arr.dtype.kind not in "iuf":
+                try:
+                    arr = arr.astype(float)
+                except (TypeError, ValueError):
+                    self.is_numeric = False # Text
+                    return self
+            if arr.dtype.kind == "f":
+                n_nan = int(np.count_nonzero(np.isnan(arr)))
+                self.n_nan += n_nan
+                if n_nan == n: return self
+                mn, mx = np.fmin.reduce(arr), np.fmax.reduce(arr) # Skip NaN.
+            else:
+                mn, mx = arr.min(), arr.max()
+
+        self.min = mn if self.min is None else min(self.min, mn)
+        self.max = mx if self.max is None else max(self.max, mx)
+        return self
+
+
+    def merge(self, other: "ColumnStats") -> "ColumnStats":
+        """
+        Add the statistics of another chunk of the same column.
+        """
+        self.count += other.count
+        self.n_nan += other.n_nan
+        self.is_datetime |= other.is_datetime
+        self.is_numeric &= other.is_numeric
+        self.tz = self.tz or other.tz
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        return self
+
+
+    @property
+    def is_all_nan(self) -> bool:
+        """No value other than NaN/NaT."""
+        return self.min is None
+
+    @property
+    def is_distinct(self) -> bool:
+        """More than one distinct value (ignoring NaN/NaT)."""
+        return self.min is not None and self.max > self.min
+
+    def get_min(self):
+        """Get the minimum. `Timestamp` for date-times."""
+        return pd.Timestamp(self.min, tz=self.tz) if self.is_datetime and self.min is not None else self.min
+
+    def get_max(self):
+        """Get the maximum. `Timestamp` for date-times."""
+        return pd.Timestamp(self.max, tz=self.tz) if self.is_datetime and self.max is not None else self.max
+
+
+    def overlaps(self, lo, hi) -> bool:
+        """
+        Check if some values may be within `[lo, hi]`. Used to skip chunks (ex. storms) that can't match a range filter.
+        """
+        if self.min is None: return False
+        if not self.is_numeric: return True
+        return self.min <= func_to_key(hi, self.is_datetime) and self.max >= func_to_key(lo, self.is_datetime)
+
+
+    def get_range(self, dec: int = None):
+        """
+        Get `[minimum, maximum]` if the column is worth filtering, else `None`.
+
+        Parameters
+        ---
+        dec: Number of decimals to round numbers to. The rounded maximum must still be above the rounded minimum.
+        """
+        if not self.is_numeric or self.min is None: return None
+        if self.is_datetime:
+            return [self.get_min(), self.get_max()] if self.max > self.min else None
+        var_min, var_max = self.min, self.max
+        if dec is not None:
+            var_min = np.around( var_min, decimals=dec )
+            var_max = np.around( var_max, decimals=dec )
+        return [var_min, var_max] if var_max > var_min else None
+
+
+
+class SortedIndex:
+    """
+    Sorted index of one column: the positions of its rows in order of value and the sorted values.
+
+    NaN/NaT values are left out, since they never match a range. Date-times are kept as nanoseconds since 1970 (`int64`).
+    """
+
+    def __init__(self, order: np.ndarray, values: np.ndarray, n_rows: int, is_datetime: bool = False):
+        """
+        Parameters
+        ---
+        order: Positions of the rows, in order of value.
+        values: The sorted values.
+        n_rows: Number of rows of the column (including NaN/NaT).
+        is_datetime: Boolean for date-time columns.
+        """
+        self.order = order
+        self.values = values
+        self.n_rows = n_rows
+        self.is_datetime = is_datetime
+
+
+    @classmethod
+    def build(cls, values) -> "SortedIndex":
+        """
+        Sort a column (array or Series).
+        """
+        n = len(values)
+        dtype = getattr(values, "dtype", None)
+        is_datetime = isinstance(dtype, pd.DatetimeTZDtype) or (isinstance(dtype, np.dtype) and dtype.kind == "M")
+        if is_datetime:
+            arr = pd.DatetimeIndex(values).as_unit("ns").asi8
+            valid = np.flatnonzero(arr != NAT)
+        else:
+            arr = np.asarray(values)
+            if arr.dtype.kind not in "iuf": arr = arr.astype(float)
+            valid = np.flatnonzero(~np.isnan(arr)) if arr.dtype.kind == "f" else None
+        if valid is not None and len(valid) < n:
+            order = valid[ np.argsort(arr[valid]) ]
+        else:
+            order = np.argsort(arr)
+        return cls(order, arr[order], n, is_datetime)
+
+
+    def range_mask(self, lo, hi) -> np.ndarray:
+        """
+        Get the boolean mask of the rows within `[lo, hi]` with two binary searches.
+        """
+        i = np.searchsorted( self.values, func_to_key(lo, self.is_datetime), side="left" )
+        j = np.searchsorted( self.values, func_to_key(hi, self.is_datetime), side="right" )
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[ self.order[i:j] ] = True
+        return mask
+
+
+
+def func_to_key(x, is_datetime: bool = False):
+    """
+    Convert a filter bound to the values of `ColumnStats` and `SortedIndex`: nanoseconds for date-times, else a number.
+    """
+    if isinstance(x, np.ndarray): x = x.item() # The GUI gives date-times as 0-d arrays.
+    return pd.Timestamp(x).as_unit("ns").value if is_datetime else x
+
+
+
+def func_build_indexes(df: pd.DataFrame, columns: list[str]) -> dict[str, SortedIndex]:
+    """
+    Build the sorted indexes of columns of a DataFrame.
+
+    Parameters
+    ---
+    df: The DataFrame.
+    columns: The columns. Columns missing from `df` are skipped.
+    """
+    return {col: SortedIndex.build(df[col]) for col in columns if col in df.columns}
+
+
+
+def func_column_stats(df: pd.DataFrame, columns: list[str] = None) -> dict[str, ColumnStats]:
+    """
+    Get the statistics of columns of a DataFrame (chunk).
+
+    Parameters
+    ---
+    df: The DataFrame.
+    columns: The columns. Default: all columns.
+    """
+    return {col: ColumnStats(df[col]) for col in (df.columns if columns is None else columns)}
+
+
+
+def func_merge_stats(total: dict[str, ColumnStats], part: dict[str, ColumnStats]) -> dict[str, ColumnStats]:
+    """
+    Merge the statistics of a chunk into the statistics of the whole dataset. Returns `total`.
+    """
+    for col, stats in part.items():
+        total.setdefault(col, ColumnStats()).merge(stats)
+    return total
+
+
+
+class ReadFilter:
+    """
+    Rows and columns to keep while reading an HDF5 file: a set of Storm IDs, a date-time window (`yyyymmddHHMM`),
+    ranges of variables and a selection of variables.
+
+    Storms are skipped before their datasets are read, unselected datasets are never read, and rows are filtered one
+    chunk (ex. one storm) at a time. Each condition only applies to datasets which have its column (ex. AEF files have no Storm ID).
+    """
+
+    def __init__(self, stormIDs=None, start=None, end=None, ranges: dict = None, variables=None):
+        """
+        Parameters
+        ---
+        stormIDs: The Storm IDs to keep. Default: all.
+        start, end: The first and last date-times to keep (UTC if no time zone). Default: no limit.
+        ranges: Variable -> `(minimum, maximum)`. `None` for no limit on that side.
+        variables: The HDF5 datasets and attribute columns to keep (`KEY_COLUMNS` are always kept). Default: all.
+        """
+        self.stormIDs = None if stormIDs is None else {int(x) for x in stormIDs}
+        self.start = None if start is None else _func_utc(start)
+        self.end = None if end is None else _func_utc(end)
+        self.ranges = {var: (-np.inf if lo is None else lo, np.inf if hi is None else hi) for var, (lo, hi) in (ranges or {}).items()}
+        self.variables = None if variables is None else [*dict.fromkeys(variables)]
+
+    def __repr__(self):
+        res = []
+        if self.stormIDs is not None: res.append(f"{len(self.stormIDs)} Storm ID(s)")
+        if self.start is not None or self.end is not None: res.append(f"yyyymmddHHMM: [{self.start}, {self.end}]")
+        res += [f"{var}: [{lo}, {hi}]" for var, (lo, hi) in self.ranges.items()]
+        if self.variables is not None: res.append(f"Variables: {', '.join(self.variables)}")
+        return "; ".join(res) or "No filter"
+
+    @property
+    def is_active(self) -> bool:
+        """Any condition at all."""
+        return (self.stormIDs is not None or self.start is not None or self.end is not None or len(self.ranges) > 0
+                or self.variables is not None)
+
+    def keep_column(self, name: str) -> bool:
+        """
+        Check if a column is in the converted dataset.
+        """
+        return self.variables is None or name in self.variables or name in KEY_COLUMNS
+
+    def read_column(self, name: str) -> bool:
+        """
+        Check if a dataset must be read from the HDF5 file: kept, or needed by a range.
+        """
+        return self.keep_column(name) or name in self.ranges
+
+    def keep_stormID(self, stormID) -> bool:
+        """
+        Check a Storm ID (ex. a group attribute) before reading the group.
+        """
+        return self.stormIDs is None or stormID is None or int(stormID) in self.stormIDs
+
+    def time_mask(self, t) -> np.ndarray:
+        """
+        Get the boolean mask of date-times within the window, or `None` without a window. NaT is never kept.
+        """
+        if self.start is None and self.end is None: return None
+        t = pd.DatetimeIndex(t)
+        mask = ~t.isna()
+        if self.start is not None: mask &= t >= self.start
+        if self.end is not None:   mask &= t <= self.end
+        return np.asarray(mask)
+
+    def mask(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Get the boolean mask of the rows of a chunk to keep.
+        """
+        mask = np.ones(len(df), dtype=bool)
+        if self.stormIDs is not None and "Storm ID" in df.columns:
+            mask &= np.isin( df["Storm ID"].to_numpy(), list(self.stormIDs) )
+        if "yyyymmddHHMM" in df.columns:
+            t = self.time_mask( df["yyyymmddHHMM"] )
+            if t is not None: mask &= t
+        for var, (lo, hi) in self.ranges.items():
+            if var in df.columns:
+                col = df[var]
+                mask &= ((col >= lo) & (col <= hi)).to_numpy(dtype=bool, na_value=False)
+        return mask
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Keep the rows of a chunk which pass every condition, and the selected columns.
+        """
+        if not self.is_active: return df
+        mask = self.mask(df)
+        if not mask.all(): df = df[mask]
+        if self.variables is not None and not all(self.keep_column(col) for col in df.columns):
+            df = df[[col for col in df.columns if self.keep_column(col)]]
+        return df
+
+
+
+def _func_utc(x) -> pd.Timestamp:
+    """Read a date-time as UTC. Date-times without a time zone are in UTC."""
+    x = pd.Timestamp(x)
+    return x.tz_localize("UTC") if x.tz is None else x.tz_convert("UTC")
+
+
+
+def func_parse_filter(storms: str = None, start: str = None, end: str = None, ranges: list[str] = None, variables: str = None) -> ReadFilter:
+    """
+    Build a `ReadFilter` from command line options.
+
+    Parameters
+    ---
+    storms: Storm IDs and ranges of Storm IDs, ex. `"1,4,10-20"`.
+    start, end: Date-times, ex. `"2000-01-31 18:30"`.
+    ranges: `"[variable]:[minimum]:[maximum]"` for each variable, ex. `"Hm0:0.5:"`. An empty bound has no limit.
+    variables: The variables to keep, ex. `"Water Elevation,Hm0"`.
+    """
+    stormIDs = None
+    if storms:
+        stormIDs = set()
+        for x in storms.split(","):
+            a, _, b = x.strip().partition("-")
+            stormIDs.update( range(int(a), int(b or a) + 1) )
+    res = {}
+    for x in ranges or []:
+        try:
+            var, lo, hi = x.rsplit(":", 2)
+            res[var] = ( float(lo) if lo.strip() else None, float(hi) if hi.strip() else None )
+        except ValueError:
+            raise ValueError(f"Bad range '{x}'. Use [variable]:[minimum]:[maximum], ex. 'Hm0:0.5:3'.")
+    variables = None if not variables else [x.strip() for x in variables.split(",") if x.strip()]
+    return ReadFilter( stormIDs, start or None, end or None, res, variables )
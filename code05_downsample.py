@@ -0,0 +1,142 @@
+"""
+StormSim: File 6
+===
+Graph downsampling
+
+About
+---
+code05_downsample.py: Reduces the lines of a graph to a budget of points before they are plotted.
+
+Two shape-preserving methods are available: Largest-Triangle-Three-Buckets (LTTB), which keeps the points that
+change the shape of the line the most, and min/max bucketing, which keeps the lowest and highest point of each
+bucket so no peak is lost. The first and last points of a line are always kept.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import numpy as np
+import pandas as pd
+
+
+
+DOWNSAMPLE_METHODS = ["lttb", "minmax"]
+"""Downsampling methods. See `func_downsample()`."""
+PLOT_POINT_BUDGET = 20_000
+"""Default number of points of a downsampled graph, shared by its lines."""
+MIN_POINTS = 3
+"""Fewest points kept of a line."""
+
+
+
+def _func_numeric(x) -> np.ndarray:
+    """Read a column as floats. Date-times become nanoseconds since 1970 and NaT becomes NaN."""
+    dtype = getattr(x, "dtype", None)
+    if isinstance(dtype, pd.DatetimeTZDtype) or getattr(dtype, "kind", "") == "M":
+        x = pd.DatetimeIndex(x).as_unit("ns")
+        return np.where( x.isna(), np.nan, x.asi8.astype(float) )
+    return np.asarray(x, dtype=float)
+
+
+
+def func_lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Largest-Triangle-Three-Buckets: Get the positions of `n_out` points which keep the shape of the line.
+
+    Parameters
+    ---
+    x, y: The coordinates of the line as floats without NaN, sorted by `x`.
+    n_out: The number of points to keep.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3: return np.arange(n)
+    # Bucket `i` holds the points `edges[i]` to `edges[i+1]`. The first and last points are their own buckets.
+    edges = np.floor( np.arange(n_out - 1) * (n - 2) / (n_out - 2) ).astype(np.int64) + 1
+    edges[-1] = n - 1
+    # Averages of each bucket from prefix sums.
+    cx = np.concatenate(( [0.0], np.cumsum(x) ))
+    cy = np.concatenate(( [0.0], np.cumsum(y) ))
+    res = np.empty(n_out, dtype=np.int64)
+    res[0] = 0
+    a = 0
+    for i in range(n_out - 2):
+        s, e = edges[i], edges[i+1]
+        if i + 2 < len(edges):
+            ns, ne = edges[i+1], edges[i+2]
+            avg_x = (cx[ne] - cx[ns]) / (ne - ns)
+            avg_y = (cy[ne] - cy[ns]) / (ne - ns)
+        else:
+            avg_x, avg_y = x[n-1], y[n-1]
+        # Largest triangle between the last kept point, a point of the bucket and the average of the next bucket.
+        xa, ya = x[a], y[a]
+        area = np.abs( (xa - avg_x) * (y[s:e] - ya) - (xa - x[s:e]) * (avg_y - ya) )
+        a = s + int(np.argmax(area))
+        res[i+1] = a
+    res[-1] = n - 1
+    return res
+
+
+
+def func_minmax(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Min/max bucketing: Get the positions of the first and last points, and of the lowest and highest points of `(n_out - 2) // 2` buckets of equal size.
+
+    Parameters
+    ---
+    x, y: The coordinates of the line as floats without NaN, sorted by `x`.
+    n_out: The number of points to keep (at most).
+    """
+    n = len(y)
+    n_buckets = max((n_out - 2) // 2, 1)
+    if n_out >= n: return np.arange(n)
+    size = -(-n // n_buckets)
+    padded = np.full(n_buckets * size, np.nan)
+    padded[:n] = y
+    padded = padded.reshape(n_buckets, size)
+    offsets = np.arange(n_buckets) * size
+    lo = offsets + np.argmin( np.where(np.isnan(padded), np.inf, padded), axis=1 )
+    hi = offsets + np.argmax( np.where(np.isnan(padded), -np.inf, padded), axis=1 )
+    res = np.unique( np.concatenate(( [0, n - 1], lo, hi )) )
+    return res[res < n]
+
+
+
+def func_downsample(x, y, n_out: int, method: str = "lttb") -> np.ndarray:
+    """
+    Get the positions of the points of a line to plot, at most about `n_out`. Points with NaN or NaT are skipped.
+
+    Parameters
+    ---
+    x, y: The coordinates of the line (numbers or date-times), sorted by `x`.
+    n_out: The number of points to keep.
+    method: One of `DOWNSAMPLE_METHODS`.
+    """
+    if method not in DOWNSAMPLE_METHODS:
+        raise ValueError(f"Unknown downsampling method '{method}'. Choose from: {', '.join(DOWNSAMPLE_METHODS)}.")
+    x = _func_numeric(x)
+    y = _func_numeric(y)
+    valid = np.flatnonzero( ~np.isnan(x) & ~np.isnan(y) )
+    if len(valid) <= n_out: return valid
+    f = func_lttb if method == "lttb" else func_minmax
+    return valid[ f(x[valid], y[valid], max(n_out, MIN_POINTS)) ]
+
+
+
+def func_split_budget(sizes: list[int], budget: int) -> np.ndarray:
+    """
+    Share a budget of points between lines. Short lines keep all their points and leave the rest to the longer lines.
+
+    Parameters
+    ---
+    sizes: The number of points of each line.
+    budget: The total number of points.
+    """
+    sizes = np.asarray(sizes, dtype=np.int64)
+    res = np.zeros(len(sizes), dtype=np.int64)
+    left = budget
+    order = np.argsort(sizes, kind="stable")
+    for k, i in enumerate(order):
+        share = max( left // (len(sizes) - k), MIN_POINTS )
+        res[i] = min( sizes[i], share )
+        left = max( left - res[i], 0 )
+    return res
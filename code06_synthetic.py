@@ -0,0 +1,340 @@
+"""
+StormSim: File 7
+===
+Synthetic CHS files
+
+About
+---
+code06_synthetic.py: Writes synthetic CHS HDF5 files, so the converter can be tested and timed without a CHS download.
+
+Each file has the layout its converter reads (see `H5_Organized_New._run_h5()`): the "CHS File Format" attribute,
+save point attributes, one group per storm with its attributes and `yyyymmddHHMM` floats, node and element matrices...
+Filenames follow the 7-part convention, so each file takes the same route as a real one. The values are random.
+
+Run `python code06_synthetic.py [directory]` to write one file of every layout. See `--help` for the scale parameters.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import argparse, os, time
+from zipfile import ZipFile, ZIP_DEFLATED, ZIP_STORED
+
+import h5py
+import numpy as np
+
+
+
+# Default scale of the files.
+N_STORMS = 100
+N_TIMESTEPS = 500
+N_NODES = 10_000
+N_AEF_BINS = 22
+N_SAVE_POINTS = 1
+# Variables of each layout.
+VARS_TIMESERIES = ["Water Elevation", "Hm0", "Tp", "Wave Direction"]
+VARS_PEAKS = ["Water Elevation", "Hm0", "Tp"]
+VARS_AEF = ["Best Estimate", "CL02", "CL16", "CL50", "CL84", "CL98"]
+# Fraction of NaN values in the variables, like the missing values of real files.
+NAN_FRACTION = 0.01
+# First date-time of the storms and the time step of Timeseries files.
+T_START = np.datetime64("1979-01-01T00:00")
+T_STEP = np.timedelta64(30, "m")
+ZIP_MODES = {"stored": ZIP_STORED, "deflated": ZIP_DEFLATED}
+"""Compression of ZIP files. Stored HDF5 files are read straight out of the ZIP file, deflated ones are decompressed first."""
+
+
+
+class Scale:
+    """
+    Size of the synthetic files.
+    """
+
+    def __init__(self, storms: int = N_STORMS, timesteps: int = N_TIMESTEPS, nodes: int = N_NODES,
+                 aef_bins: int = N_AEF_BINS, save_points: int = N_SAVE_POINTS, seed: int = 0):
+        self.storms = storms
+        """Number of storms: groups of Timeseries, Peaks and STcond files, and rows of SACSNCSEFL Peaks files."""
+        self.timesteps = timesteps
+        """Number of date-times per storm in Timeseries files."""
+        self.nodes = nodes
+        """Number of ADCIRC nodes (AEF and Locations files), and of save points listed in NLR and SRR files."""
+        self.aef_bins = aef_bins
+        """Number of AEF/AEP values per node or save point."""
+        self.save_points = save_points
+        """Number of files of the layouts with one save point per file (Timeseries, Peaks, AEF, AEP, STcond)."""
+        self.seed = seed
+        """Seed of the random values. The same scale and seed always write the same files."""
+
+    def __repr__(self):
+        return ", ".join( f"{k}={v}" for k, v in self.__dict__.items() )
+
+
+
+def func_encode_yyyymmddHHMM(t: np.ndarray) -> np.ndarray:
+    """
+    Encode date-times as floats (ex. `200001311830.0`), like CHS files. The inverse of `func_decode_yyyymmddHHMM()` (see `code01_h5organize.py`).
+    """
+    t = np.asarray(t, dtype="datetime64[m]")
+    months = t.astype("datetime64[M]")
+    Y = months.astype(np.int64) // 12 + 1970
+    M = months.astype(np.int64) % 12 + 1
+    D = (t.astype("datetime64[D]") - months.astype("datetime64[D]")).astype(np.int64) + 1
+    m = (t - t.astype("datetime64[D]")).astype(np.int64)
+    return (Y*10**8 + M*10**6 + D*10**4 + (m // 60)*10**2 + m % 60).astype(float)
+
+
+
+def _values(rng: np.random.Generator, shape, lo: float = 0.0, hi: float = 5.0) -> np.ndarray:
+    """Random floats with `NAN_FRACTION` of NaN."""
+    x = rng.uniform(lo, hi, shape)
+    x[ rng.random(shape) < NAN_FRACTION ] = np.nan
+    return x
+
+
+
+def _save_point_attrs(f: h5py.File, rng: np.random.Generator, sp: int, depth: bool = False):
+    """Write the save point attributes of a file."""
+    f.attrs["Save Point ID"] = np.int32(sp)
+    f.attrs["Save Point Latitude"] = rng.uniform(25, 45)
+    f.attrs["Save Point Longitude"] = rng.uniform(-95, -65)
+    if depth: f.attrs["Save Point Depth"] = rng.uniform(1, 50)
+
+
+
+def _storm_attrs(g: h5py.Group, sid: int, depth: float = None):
+    """Write the storm attributes of a group."""
+    if depth is not None: g.attrs["Save Point Depth"] = depth
+    g.attrs["Storm ID"] = np.int32(sid)
+    g.attrs["Storm Name"] = f"Synthetic_{sid:04d}"
+    g.attrs["Storm Type"] = "TC" if sid % 2 else "XC"
+
+
+
+def _storm_starts(rng: np.random.Generator, n: int) -> np.ndarray:
+    """First date-time of each storm, spread over 40 years."""
+    return T_START + rng.integers(0, 40*365*24*2, n) * T_STEP
+
+
+
+def func_write_v3_AEF(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v3 AEF file: Node IDs (n x 1), AEF values (1 x bins) and one (n x bins) matrix per confidence level ("Best Estimate AEF"...).
+    """
+    f.attrs["CHS File Format"] = np.bytes_("V3")
+    f["ADCIRC Node IDs"] = np.arange(1, sc.nodes+1, dtype=np.int32)[:, np.newaxis]
+    f["AEF Values"] = np.geomspace(10, 1e-4, sc.aef_bins)[np.newaxis, :]
+    for var in VARS_AEF:
+        f[f"{var} AEF"] = np.sort( _values(rng, (sc.nodes, sc.aef_bins)), axis=1 )
+
+
+
+def func_write_v2_Peaks(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v2 SACSNCSEFL Peaks file: One row per storm. Landfall and peak times are hours since 1970 with a "Units" attribute.
+    """
+    f.attrs["CHS File Format"] = np.bytes_("V2")
+    _save_point_attrs(f, rng, sp, depth=True)
+    n = sc.storms
+    f["Storm ID"] = np.arange(1, n+1, dtype=np.int32)
+    f["Storm Name"] = np.array([f"Synthetic_{i:04d}".encode() for i in range(1, n+1)])
+    f["Storm Type"] = np.array([b"TC" if i % 2 else b"XC" for i in range(1, n+1)])
+    hours = (_storm_starts(rng, n) - np.datetime64("1970-01-01T00:00")).astype("timedelta64[m]").astype(float) / 60
+    f["Landfall Time"] = hours
+    f["Landfall Time"].attrs["Units"] = np.bytes_("hrs since 1970-01-01 00:00:00Z")
+    f["Peak Time"] = rng.uniform(-24, 24, n)
+    for var in VARS_PEAKS:
+        f[var] = _values(rng, n)
+
+
+
+def func_write_v2_AEF(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v2 SACSNCSEFL AEF file: One group per variable, each with the AEF values and one column per confidence level.
+    """
+    f.attrs["CHS File Format"] = np.bytes_("V2")
+    _save_point_attrs(f, rng, sp, depth=True)
+    for var in VARS_PEAKS:
+        g = f.create_group(var)
+        g["AEF"] = np.geomspace(10, 1e-4, sc.aef_bins)
+        for cl in VARS_AEF:
+            g[cl] = np.sort( _values(rng, sc.aef_bins) )
+
+
+
+def func_write_v1_Locations(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v1 Locations file: "Nodes" (ID, latitude, longitude, depth) and "Elements" (ID, number of nodes, 3 node IDs).
+    """
+    n = sc.nodes
+    f["Nodes"] = np.column_stack(( np.arange(1, n+1), rng.uniform(25, 45, n), rng.uniform(-95, -65, n), rng.uniform(-5, 200, n) ))
+    m = 2 * n
+    f["Elements"] = np.column_stack(( np.arange(1, m+1), np.full(m, 3), rng.integers(1, n+1, (m, 3)) )).astype(np.int32)
+
+
+
+def func_write_v1_Timeseries(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v1 Timeseries file: One group per storm with its attributes, `yyyymmddHHMM` floats and one dataset per variable.
+    """
+    _save_point_attrs(f, rng, sp)
+    depth = rng.uniform(1, 50)
+    t = np.arange(sc.timesteps) * T_STEP
+    for sid, t0 in zip(range(1, sc.storms+1), _storm_starts(rng, sc.storms)):
+        g = f.create_group(f"Storm {sid:04d}")
+        _storm_attrs(g, sid, depth)
+        g["yyyymmddHHMM"] = func_encode_yyyymmddHHMM(t0 + t)
+        for var in VARS_TIMESERIES:
+            g[var] = _values(rng, sc.timesteps)
+
+
+
+def func_write_v1_NLR(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v1 NLR file: Datasets of one value per save point.
+    """
+    n = sc.nodes
+    f["Save Point ID"] = np.arange(1, n+1, dtype=np.int32)
+    f["Save Point Latitude"] = rng.uniform(25, 45, n)
+    f["Save Point Longitude"] = rng.uniform(-95, -65, n)
+    for var in ["NLR Intercept", "NLR Slope", "NLR RMSE"]:
+        f[var] = _values(rng, n)
+
+
+
+def func_write_v1_SRR(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v1 SRR file: A matrix of save points (ID, latitude, longitude), then groups of one value per save point.
+    """
+    n = sc.nodes
+    f["Save Points"] = np.column_stack(( np.arange(1, n+1), rng.uniform(25, 45, n), rng.uniform(-95, -65, n) ))
+    g = f.create_group("Storm Recurrence Rate")
+    for var in ["SRR TC", "SRR XC"]:
+        g[var] = _values(rng, n, 0, 1)
+
+
+
+def func_write_v1_Peaks(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v1 Peaks file: One group per storm with its attributes, the date-time of the peak and one value per variable.
+    """
+    _save_point_attrs(f, rng, sp)
+    depth = rng.uniform(1, 50)
+    for sid, t0 in zip(range(1, sc.storms+1), _storm_starts(rng, sc.storms)):
+        g = f.create_group(f"Storm {sid:04d}")
+        _storm_attrs(g, sid, depth)
+        g["yyyymmddHHMM"] = func_encode_yyyymmddHHMM([t0])
+        for var in VARS_PEAKS:
+            g[var] = _values(rng, 1)
+
+
+
+def func_write_v1_AEP(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v1 AEP file: One group per variable, each with the AEP values and one column per confidence level.
+    """
+    _save_point_attrs(f, rng, sp)
+    for var in VARS_PEAKS:
+        g = f.create_group(var)
+        g["AEP"] = np.geomspace(1, 1e-4, sc.aef_bins)
+        for cl in VARS_AEF:
+            g[cl] = np.sort( _values(rng, sc.aef_bins) )
+
+
+
+def func_write_v1_STcond(f: h5py.File, sc: Scale, rng: np.random.Generator, sp: int):
+    """
+    CHS v1 STcond file: One group per storm with its name and type, and conditional values per AEF bin.
+    """
+    for sid in range(1, sc.storms+1):
+        g = f.create_group(f"Storm {sid:04d}")
+        g.attrs["Storm Name"] = f"Synthetic_{sid:04d}"
+        g.attrs["Storm Type"] = "TC" if sid % 2 else "XC"
+        for var in VARS_PEAKS:
+            g[var] = _values(rng, sc.aef_bins)
+
+
+
+LAYOUTS = {
+    "v3_aef":        ("CHS-LA_TS_SimSyn_Post0_Nodes_Hm0_AEF",             False, func_write_v3_AEF),
+    "v2_peaks":      ("SACSNCSEFL_TC_SimSyn_Post0_SP{:04d}_ADCIRC_Peaks",  True,  func_write_v2_Peaks),
+    "v2_aef":        ("SACSNCSEFL_TC_SimSyn_Post0_SP{:04d}_ADCIRC_AEF",    True,  func_write_v2_AEF),
+    "v1_locations":  ("CHS-LA_TS_SimSyn_Post0_Grid_ADCIRC01_Locations",    False, func_write_v1_Locations),
+    "v1_timeseries": ("NACCS_TS_SimSyn_Post0_SP{:04d}_STWAVE_Timeseries",  True,  func_write_v1_Timeseries),
+    "v1_nlr":        ("NACCS_TC_SimSyn_Post0_Nodes_ADCIRC_NLR",           False, func_write_v1_NLR),
+    "v1_srr":        ("NACCS_TC_SimSyn_Post0_Nodes_ADCIRC_SRR",           False, func_write_v1_SRR),
+    "v1_peaks":      ("NACCS_TC_SimSyn_Post0_SP{:04d}_ADCIRC_Peaks",       True,  func_write_v1_Peaks),
+    "v1_aep":        ("NACCS_TC_SimSyn_Post0_SP{:04d}_ADCIRC_AEP",         True,  func_write_v1_AEP),
+    "v1_stcond":     ("NACCS_TC_SimSyn_Post0_SP{:04d}_ADCIRC_STcond",      True,  func_write_v1_STcond),
+}
+"""Converter path -> (filename without extension, one file per save point, writer). Covers every converter of `H5_Organized_New`."""
+
+
+
+def func_generate(dir_out: str, layouts: list[str] = None, scale: Scale = None, zip_mode: str = None) -> list[str]:
+    """
+    Write synthetic CHS HDF5 files.
+
+    Parameters
+    ---
+    dir_out: The directory of the files.
+    layouts: The converter paths to write. One of `LAYOUTS` each. Default: all of them.
+    scale: The size of the files. Default: `Scale()`.
+    zip_mode: Pack the files into `CHS_Synthetic.zip` instead, "stored" or "deflated" (see `ZIP_MODES`). Default: no ZIP file.
+
+    Returns the filepaths of the HDF5 files. ZIP references use `[ZIP filepath];[HDF5 filepath in ZIP]`.
+    """
+    layouts = list(LAYOUTS) if layouts is None else layouts
+    for x in layouts:
+        if x not in LAYOUTS: raise ValueError(f"Unknown layout '{x}'. Choose from: {', '.join(LAYOUTS)}.")
+    if zip_mode is not None and zip_mode not in ZIP_MODES:
+        raise ValueError(f"Unknown ZIP mode '{zip_mode}'. Choose from: {', '.join(ZIP_MODES)}.")
+    scale = scale or Scale()
+    os.makedirs(dir_out, exist_ok=True)
+    rng = np.random.default_rng(scale.seed)
+    fpaths = []
+    for x in layouts:
+        name, per_save_point, writer = LAYOUTS[x]
+        for sp in range(1, (scale.save_points if per_save_point else 1) + 1):
+            fpath = os.path.join( dir_out, name.format(sp) + ".h5" )
+            with h5py.File(fpath, "w") as f:
+                writer(f, scale, rng, sp)
+            fpaths.append(fpath)
+    if zip_mode is None:
+        return fpaths
+
+    # Pack the files and delete them.
+    fpath_zip = os.path.join(dir_out, "CHS_Synthetic.zip")
+    with ZipFile(fpath_zip, "w", ZIP_MODES[zip_mode]) as z:
+        for fpath in fpaths:
+            z.write( fpath, "CHS_Synthetic/" + os.path.basename(fpath) )
+            os.remove(fpath)
+    return [f"{fpath_zip};CHS_Synthetic/{os.path.basename(fpath)}" for fpath in fpaths]
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser( prog="code06_synthetic.py", description="The CHS HDF5 Converter: Write synthetic CHS HDF5 files for testing and benchmarks." )
+    parser.add_argument( "dir", nargs="?", default="CHS_Synthetic", help="Directory of the files. Default: CHS_Synthetic." )
+    parser.add_argument( "--layouts", default=",".join(LAYOUTS), metavar="NAMES",
+                         help=f"Converter paths to write, separated by commas. Default: all ({', '.join(LAYOUTS)})." )
+    parser.add_argument( "--storms", type=int, default=N_STORMS, help=f"Number of storms. Default: {N_STORMS}." )
+    parser.add_argument( "--timesteps", type=int, default=N_TIMESTEPS, help=f"Number of date-times per storm (Timeseries). Default: {N_TIMESTEPS}." )
+    parser.add_argument( "--nodes", type=int, default=N_NODES, help=f"Number of nodes (AEF, Locations) and save points (NLR, SRR). Default: {N_NODES}." )
+    parser.add_argument( "--aef-bins", type=int, default=N_AEF_BINS, help=f"Number of AEF/AEP values. Default: {N_AEF_BINS}." )
+    parser.add_argument( "--save-points", type=int, default=N_SAVE_POINTS,
+                         help=f"Number of files of the layouts with one save point per file. Default: {N_SAVE_POINTS}." )
+    parser.add_argument( "--seed", type=int, default=0, help="Seed of the random values. Default: 0." )
+    parser.add_argument( "--zip", choices=list(ZIP_MODES), help="Pack the files into a ZIP file, stored or deflated." )
+    args = parser.parse_args()
+    scale = Scale( args.storms, args.timesteps, args.nodes, args.aef_bins, args.save_points, args.seed )
+
+    print(f"\nWriting synthetic CHS HDF5 files ({scale})...\n")
+    t1 = time.time()
+    try:
+        fpaths = func_generate( args.dir, [x.strip() for x in args.layouts.split(",") if x.strip()], scale, args.zip )
+    except ValueError as e:
+        parser.error(str(e))
+    for fpath in fpaths:
+        print(fpath if args.zip else f"{os.path.getsize(fpath) / 1024**2:10.1f} MB  {fpath}")
+    print(f"\n{len(fpaths)} files in {time.time() - t1:.1f} s. Output saved in {os.path.abspath(args.dir)}")
@@ -0,0 +1,363 @@
+"""
+StormSim: File 8
+===
+Benchmarks
+
+About
+---
+code07_benchmark.py: Times every converter on synthetic files (see `code06_synthetic.py`) and tracks regressions.
+
+Each case (converter path x file size) runs in a new process, so its peak memory is its own. The time of a conversion
+is split into stages by timing the functions of each stage:
+* read: HDF5 reads (`h5py.Dataset`).
+* dates: Date-time parsing (`func_decode_yyyymmddHHMM()`, `func_hours_to_timedelta()`).
+* stats: Minimums, maximums and sorted indexes for filters (GUI mode).
+* export: Writing the CSV, Parquet or Feather file.
+* assemble: Everything else: building, sorting and concatenating the columns.
+
+The GUI's boot (time-to-window, see `BOOT_BUDGET` in `begin_stormsim.py`) is timed as the "boot" case, so it's tracked like the converters.
+
+Every run is appended to a history file (one JSON object per line). `compare` checks a run against a stored baseline.
+
+Run `python code07_benchmark.py run`, `python code07_benchmark.py compare` and `python code07_benchmark.py --help`.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import argparse, contextlib, json, os, platform, shutil, subprocess, sys, tempfile, time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+
+from code06_synthetic import LAYOUTS, Scale, func_generate
+
+
+
+DIR_PROGRAM = os.path.dirname( os.path.abspath(__file__) )
+BENCH_HISTORY = os.path.join(DIR_PROGRAM, "benchmark_history.jsonl")
+"""History of the runs. One JSON object per line."""
+BENCH_BASELINE = os.path.join(DIR_PROGRAM, "benchmark_baseline.json")
+"""The run that `compare` checks against."""
+SIZES = {
+    "small":  Scale(storms=50,   timesteps=200,  nodes=5_000,   aef_bins=22),
+    "medium": Scale(storms=500,  timesteps=1000, nodes=50_000,  aef_bins=22),
+    "large":  Scale(storms=2000, timesteps=2000, nodes=500_000, aef_bins=22),
+}
+"""File sizes of the cases."""
+STAGES = ["read", "assemble", "dates", "stats", "export"]
+# A case regresses if it's slower (or uses more memory) than the baseline by more than `THRESHOLD` and `MIN_DELTA_S` seconds (or `MIN_DELTA_MB` MB).
+THRESHOLD = 0.10
+MIN_DELTA_S = 0.05
+MIN_DELTA_MB = 10
+
+
+
+class StageTimer:
+    """
+    Times the stages of a conversion by wrapping the functions of each stage. Time is counted once: a stage called
+    inside another stage (ex. HDF5 reads while exporting a lazy dataset) pauses the outer stage.
+    """
+
+    def __init__(self):
+        self.times: dict[str, float] = {}
+        """Seconds spent in each stage."""
+        self._stack = []
+        """Stages running now, innermost last, as `[stage, start]`."""
+        self.reset()
+
+    def reset(self):
+        """Clear the times before a new run."""
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self._stack = []
+
+    def wrap(self, stage: str, f):
+        """Get `f` timed as part of `stage`."""
+        def timed(*args, **kwargs):
+            t = time.perf_counter()
+            if self._stack:
+                outer = self._stack[-1]
+                self.times[outer[0]] += t - outer[1]
+            self._stack.append([stage, t])
+            try:
+                return f(*args, **kwargs)
+            finally:
+                t = time.perf_counter()
+                self.times[stage] += t - self._stack.pop()[1]
+                if self._stack: self._stack[-1][1] = t
+        return timed
+
+    def install(self):
+        """Wrap the functions of every stage. Only for the benchmark's worker processes."""
+        import h5py
+        import code01_h5organize as c01
+        H5 = c01.H5_Organized_New
+        for cls, name, stage in [
+            (h5py.Dataset, "__getitem__", "read"), (h5py.Dataset, "__array__", "read"),
+            (c01, "func_decode_yyyymmddHHMM", "dates"), (c01, "func_hours_to_timedelta", "dates"),
+            (c01, "func_column_stats", "stats"), (c01, "func_merge_stats", "stats"),
+            (H5, "_minmax", "stats"), (H5, "_minmax_stats", "stats"), (H5, "_build_indexes", "stats"),
+            (H5, "export_data", "export"), (c01, "func_write_dataset", "export"),
+            (c01.StreamWriter, "write", "export"), (c01.StreamWriter, "close", "export"),
+        ]:
+            setattr( cls, name, self.wrap(stage, getattr(cls, name)) )
+
+
+
+def func_peak_rss() -> float:
+    """
+    Get the peak memory (resident set size) of this process in MB. Returns `None` if it can't be determined.
+    """
+    try:
+        if platform.system() == "Windows":
+            import ctypes
+            from ctypes import wintypes
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            pmc = PROCESS_MEMORY_COUNTERS()
+            pmc.cb = ctypes.sizeof(pmc)
+            ctypes.windll.psapi.GetProcessMemoryInfo( ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(pmc), pmc.cb )
+            return pmc.PeakWorkingSetSize / 1024**2
+        import resource
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / 1024**2 if platform.system() == "Darwin" else rss / 1024 # Bytes on macOS, KB on Linux.
+    except Exception:
+        return None
+
+
+
+def func_bench_case(fpath: str, mode: str, fmt: str, repeat: int) -> dict:
+    """
+    Convert and export one file `repeat` times in this process. Returns the fastest run and the peak memory.
+
+    Parameters
+    ---
+    fpath: The filepath of the HDF5 file.
+    mode: "cmd" (CMD method) or "gui" (GUI method: lazy Timeseries files, min/max and sorted indexes).
+    fmt: The output format. One of `EXPORT_FORMATS`.
+    repeat: The number of runs.
+    """
+    import code01_h5organize as c01
+    timer = StageTimer()
+    timer.install()
+    c01.DIR_RESULTS = tempfile.mkdtemp(prefix="CHS_Bench_")
+    best = None
+    try:
+        for _ in range(repeat):
+            timer.reset()
+            t1 = time.perf_counter()
+            with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+                h5 = c01.H5_Organized_New()
+                h5.run( fpath, True, mode == "cmd", fmt )
+            secs = time.perf_counter() - t1
+            if best is None or secs < best["seconds"]:
+                stages = dict(timer.times)
+                stages["assemble"] = max( secs - sum(v for k, v in stages.items() if k != "assemble"), 0.0 )
+                best = {"seconds": secs, "stages": stages}
+            del h5
+    finally:
+        shutil.rmtree(c01.DIR_RESULTS, ignore_errors=True)
+    best["rss_peak_mb"] = func_peak_rss()
+    return best
+
+
+
+def func_bench_boot(repeat: int) -> dict:
+    """
+    Launch the GUI `repeat` times and time its boot: from launch to the window showing. Returns the fastest boot, or `None`
+    if the GUI can't start (ex. PySide6 not installed or no display).
+
+    Parameters
+    ---
+    repeat: The number of launches.
+    """
+    env = os.environ | {"CHS_BOOT_ONLY": "1"}
+    best = None
+    for _ in range(repeat):
+        res = subprocess.run( [sys.executable, os.path.join(DIR_PROGRAM, "begin_stormsim.py")], env=env, capture_output=True, text=True, timeout=300 )
+        lines = [x for x in res.stdout.splitlines() if x.startswith("{")]
+        if not lines:
+            err = (res.stderr.strip().splitlines() or ["no output"])[-1]
+            print(f"{'boot':<22} skipped: the GUI didn't start ({err})")
+            return None
+        x = json.loads(lines[-1])
+        if best is None or x["boot_seconds"] < best["seconds"]:
+            best = {"seconds": x["boot_seconds"], "budget": x["budget"]}
+    return {"case": "boot", "layout": "boot", "size": "-", "file_mb": 0.0, "stages": {}, "rss_peak_mb": None} | best
+
+
+
+def func_git_commit() -> str:
+    """Get the current git commit of the program, or `None`."""
+    try:
+        res = subprocess.run( ["git", "rev-parse", "--short", "HEAD"], cwd=DIR_PROGRAM, capture_output=True, text=True, timeout=10 )
+        return res.stdout.strip() or None
+    except Exception:
+        return None
+
+
+
+def func_run(layouts: list[str], sizes: list[str], mode: str = "cmd", fmt: str = "csv", repeat: int = 3, label: str = None,
+             boot: bool = True) -> dict:
+    """
+    Benchmark every layout at every size, and the GUI's boot if `boot`. Each case runs in a new process.
+
+    Returns the run: its settings and one result per case.
+    """
+    from code03_cache import func_converter_version
+    run = {"time": datetime.now().isoformat(timespec="seconds"), "label": label, "commit": func_git_commit(),
+           "version": func_converter_version(), "python": platform.python_version(), "platform": platform.platform(),
+           "mode": mode, "format": fmt, "repeat": repeat, "results": []}
+    if boot and (res := func_bench_boot(repeat)) is not None:
+        run["results"].append(res)
+        print( func_format_result(res) )
+    for size in sizes:
+        dir_tmp = tempfile.mkdtemp(prefix="CHS_Bench_")
+        try:
+            fpaths = func_generate( dir_tmp, layouts, SIZES[size] )
+            for layout in layouts:
+                name = LAYOUTS[layout][0].format(1)
+                for fpath in [f for f in fpaths if os.path.basename(f).startswith(name)]:
+                    with ProcessPoolExecutor( max_workers=1, mp_context=get_context("spawn") ) as pool:
+                        res = pool.submit( func_bench_case, fpath, mode, fmt, repeat ).result()
+                    res = {"case": f"{layout}/{size}", "layout": layout, "size": size, "file_mb": os.path.getsize(fpath) / 1024**2} | res
+                    run["results"].append(res)
+                    print( func_format_result(res) )
+        finally:
+            shutil.rmtree(dir_tmp, ignore_errors=True)
+    return run
+
+
+
+def func_format_result(res: dict) -> str:
+    """One line of a result: total, stages and peak memory."""
+    stages = "  ".join( f"{k} {res['stages'][k]:7.3f}" for k in STAGES ) if res["stages"] else f"budget {res['budget']:.1f} s"
+    rss = "?" if res["rss_peak_mb"] is None else f"{res['rss_peak_mb']:.0f}"
+    return f"{res['case']:<22} {res['file_mb']:8.1f} MB  {res['seconds']:8.3f} s  |  {stages}  |  peak {rss} MB"
+
+
+
+def func_load_history(fpath: str = BENCH_HISTORY) -> list[dict]:
+    """Get every run of a history file, oldest first."""
+    if not os.path.isfile(fpath): return []
+    with open(fpath, "r") as r:
+        return [json.loads(line) for line in r if line.strip()]
+
+
+
+def func_save_run(run: dict, fpath: str = BENCH_HISTORY):
+    """Append a run to a history file."""
+    with open(fpath, "a") as w:
+        w.write( json.dumps(run) + "\n" )
+
+
+
+def func_compare(base: dict, run: dict, threshold: float = THRESHOLD) -> list[dict]:
+    """
+    Compare the cases of two runs. A case regresses if its time or peak memory grew by more than `threshold`
+    (and by more than `MIN_DELTA_S` seconds or `MIN_DELTA_MB` MB, to ignore noise), or if it's over its time budget (the boot).
+
+    Returns one row per case found in both runs, with the stage that grew the most.
+    """
+    old = {res["case"]: res for res in base["results"]}
+    rows = []
+    for res in run["results"]:
+        b = old.get(res["case"])
+        if b is None: continue
+        dt = res["seconds"] - b["seconds"]
+        is_slower = dt > MIN_DELTA_S and res["seconds"] > b["seconds"] * (1 + threshold)
+        is_faster = -dt > MIN_DELTA_S and res["seconds"] < b["seconds"] * (1 - threshold)
+        rss, rss_b = res.get("rss_peak_mb"), b.get("rss_peak_mb")
+        is_bigger = rss is not None and rss_b is not None and rss - rss_b > MIN_DELTA_MB and rss > rss_b * (1 + threshold)
+        is_over = res.get("budget") is not None and res["seconds"] > res["budget"]
+        stage = max( STAGES, key=lambda k: res["stages"].get(k, 0) - b["stages"].get(k, 0) ) if res["stages"] else None
+        rows.append( {"case": res["case"], "old": b["seconds"], "new": res["seconds"], "change": dt / b["seconds"] if b["seconds"] else 0.0,
+                      "rss_old": rss_b, "rss_new": rss, "stage": stage, "regression": is_slower or is_bigger or is_over,
+                      "flag": "SLOWER" if is_slower else ("MEMORY" if is_bigger else ("BUDGET" if is_over else ("faster" if is_faster else ""))) } )
+    return rows
+
+
+
+def _run_name(run: dict) -> str:
+    """Print a run in one line."""
+    return f"{run['time']}  {run.get('commit') or '-':<9} {run['mode']}/{run['format']}  {run.get('label') or ''}"
+
+
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser( prog="code07_benchmark.py", description="The CHS HDF5 Converter: Benchmark the converters and track regressions." )
+    parser.add_argument( "--history", default=BENCH_HISTORY, help="History file (JSON lines). Default: benchmark_history.jsonl." )
+    parser.add_argument( "--baseline", default=BENCH_BASELINE, help="Baseline file (JSON). Default: benchmark_baseline.json." )
+    sub = parser.add_subparsers( dest="command", required=True )
+    p = sub.add_parser( "run", help="Benchmark the converters and append the run to the history." )
+    p.add_argument( "--layouts", default=",".join(LAYOUTS), metavar="NAMES", help=f"Converter paths, separated by commas. Default: all ({', '.join(LAYOUTS)})." )
+    p.add_argument( "--sizes", default="small,medium", metavar="NAMES", help=f"File sizes, separated by commas ({', '.join(SIZES)}). Default: small,medium." )
+    p.add_argument( "--mode", choices=["cmd", "gui"], default="cmd", help="Convert like the CMD method or the GUI method. Default: cmd." )
+    p.add_argument( "-f", "--format", default="csv", choices=["csv", "parquet", "feather"], help="Output format. Default: csv." )
+    p.add_argument( "--repeat", type=int, default=3, help="Runs per case. The fastest counts. Default: 3." )
+    p.add_argument( "--label", help="Name of the run, ex. the change being tested." )
+    p.add_argument( "--no-boot", action="store_true", help="Skip the \"boot\" case (the GUI's time-to-window)." )
+    p.add_argument( "--save-baseline", action="store_true", help="Also store this run as the baseline." )
+    p = sub.add_parser( "compare", help="Compare a run with the baseline. Exits with code 1 if any case regressed." )
+    p.add_argument( "--run", type=int, default=-1, help="Run to check, by its number in `list`. Default: the last one." )
+    p.add_argument( "--against", type=int, help="Compare with this run of the history instead of the baseline file." )
+    p.add_argument( "--threshold", type=float, default=THRESHOLD, help=f"Fraction of slowdown counted as a regression. Default: {THRESHOLD}." )
+    sub.add_parser( "list", help="List the runs of the history." )
+    p = sub.add_parser( "baseline", help="Store a run of the history as the baseline." )
+    p.add_argument( "run", type=int, nargs="?", default=-1, help="Number of the run in `list`. Default: the last one." )
+    args = parser.parse_args()
+
+    if args.command == "run":
+        layouts = [x.strip() for x in args.layouts.split(",") if x.strip()]
+        sizes = [x.strip() for x in args.sizes.split(",") if x.strip()]
+        for x in layouts:
+            if x not in LAYOUTS: parser.error(f"Unknown layout '{x}'. Choose from: {', '.join(LAYOUTS)}.")
+        for x in sizes:
+            if x not in SIZES: parser.error(f"Unknown size '{x}'. Choose from: {', '.join(SIZES)}.")
+        print(f"\nBenchmarking {len(layouts)} converters x {len(sizes)} sizes ({args.mode}, {args.format}, best of {args.repeat})...\n")
+        run = func_run( layouts, sizes, args.mode, args.format, max(args.repeat, 1), args.label, not args.no_boot )
+        func_save_run( run, args.history )
+        print(f"\nSaved in {args.history}")
+        if args.save_baseline:
+            with open(args.baseline, "w") as w:
+                json.dump(run, w, indent=1)
+            print(f"Baseline saved in {args.baseline}")
+
+    elif args.command == "list":
+        for i, run in enumerate( func_load_history(args.history) ):
+            print(f"{i:>4}  {_run_name(run)}  ({len(run['results'])} cases)")
+
+    elif args.command == "baseline":
+        history = func_load_history(args.history)
+        if not history: parser.error(f"No runs in {args.history}.")
+        with open(args.baseline, "w") as w:
+            json.dump(history[args.run], w, indent=1)
+        print(f"Baseline: {_run_name(history[args.run])}")
+
+    else:
+        history = func_load_history(args.history)
+        if not history: parser.error(f"No runs in {args.history}.")
+        run = history[args.run]
+        if args.against is not None:
+            base = history[args.against]
+        elif os.path.isfile(args.baseline):
+            with open(args.baseline, "r") as r:
+                base = json.load(r)
+        else:
+            parser.error(f"No baseline. Store one with `run --save-baseline` or `baseline`, or use --against.")
+        print(f"\nBaseline: {_run_name(base)}\nRun:      {_run_name(run)}\n")
+        if (base["mode"], base["format"]) != (run["mode"], run["format"]):
+            print(f"WARNING: The runs use different modes or formats. Their times are not comparable.\n")
+        rows = func_compare( base, run, args.threshold )
+        for r in rows:
+            rss = "" if r["rss_new"] is None or r["rss_old"] is None else f"{r['rss_old']:.0f} -> {r['rss_new']:.0f} MB"
+            print(f"{r['case']:<22} {r['old']:8.3f} -> {r['new']:8.3f} s  {r['change']:+7.1%}  {rss:<18} {r['flag']:<7}"
+                  + (f" (most growth: {r['stage']})" if r["regression"] and r["stage"] else ""))
+        n = sum(r["regression"] for r in rows)
+        print(f"\n{n} regression(s) in {len(rows)} cases.")
+        sys.exit(1 if n else 0)
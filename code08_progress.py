@@ -0,0 +1,171 @@
+"""
+StormSim: File 9
+===
+Progress events
+
+About
+---
+code08_progress.py: Reports the progress and the performance of a conversion as events.
+
+Converters report each step with its stage (ex. "read", "stats", "export") and the rows and bytes it processed.
+`Progress` times each stage and derives the throughput and the ETA of the conversion.
+
+Events are JSON lines, ex. `{"event": "progress", "step": 3, "steps": 10, ...}`, written to a dedicated stream (see
+`func_set_event_stream()`). The GUI's worker processes write them to stdout and print everything else to stderr (see
+`gui02_workerpool.py`). Without a stream, a progress line is printed instead (CMD method).
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import json, time
+from datetime import timedelta
+
+
+
+EVENT_STREAM = None
+"""Stream of the JSON events. `None`: Print a progress line instead. See `func_set_event_stream()`."""
+SPACES = "".join([" "]*20)
+"""For command line."""
+
+
+
+def func_set_event_stream(stream):
+    """
+    Send events as JSON lines to a stream (ex. `sys.stdout` of a worker process). `None` prints progress lines instead.
+    """
+    global EVENT_STREAM
+    EVENT_STREAM = stream
+
+
+
+def func_emit(event: str, **fields):
+    """
+    Write one event to `EVENT_STREAM`. Does nothing without a stream.
+
+    Parameters
+    ---
+    event: The kind of event, ex. "ready", "length", "progress", "report", "result", "failed", "done".
+    fields: The contents of the event. Must be JSON serializable.
+    """
+    if EVENT_STREAM is None: return
+    EVENT_STREAM.write( json.dumps({"event": event, **fields}) + "\n" )
+    EVENT_STREAM.flush()
+
+
+
+def func_parse_event(line: str) -> dict:
+    """
+    Read one line of an event stream. Returns `None` if the line isn't an event.
+    """
+    try:
+        x = json.loads(line)
+    except ValueError:
+        return None
+    return x if isinstance(x, dict) and "event" in x else None
+
+
+
+def func_format_eta(seconds) -> str:
+    """Format a number of seconds as `H:MM:SS`. `None` is unknown."""
+    return "--:--:--" if seconds is None else str(timedelta(seconds = round(seconds)))
+
+
+
+def func_format_rate(rows_per_s: float, mb_per_s: float) -> str:
+    """Format the throughput of a conversion."""
+    return f"{rows_per_s:,.0f} rows/s | {mb_per_s:,.1f} MB/s"
+
+
+
+class Progress:
+    """
+    Progress of the conversion of one file. Each step reports its stage and the rows and bytes it processed.
+
+    The time between two steps is counted in the stage of the second one. The ETA assumes the remaining steps go as fast as the past steps.
+    """
+
+    def __init__(self, name: str, end_print: str = "\n"):
+        """
+        Parameters
+        ---
+        name: The filename of the converted file.
+        end_print: The end of progress lines: "\\r" for the CMD method.
+        """
+        self.name = name
+        self.end_print = end_print
+        self.steps = 0
+        """Number of steps, reported by the converter."""
+        self.step = 0
+        self.rows = 0
+        self.nbytes = 0
+        self.stages: dict[str, dict] = {}
+        """Stage name -> seconds, rows and bytes of the stage."""
+        self.report: dict = None
+        """Performance report, set by `finish()`."""
+        self.t_start = self.t_last = time.perf_counter()
+
+
+    def length(self, steps: int):
+        """Set the number of steps of the conversion."""
+        self.steps = steps
+        func_emit( "length", file=self.name, steps=steps )
+
+
+    def status(self, step: int = None, stage: str = "read", rows: int = 0, nbytes: int = 0):
+        """
+        Report a finished step.
+
+        Parameters
+        ---
+        step: The number of steps done so far. `None` counts the time in `stage` without advancing.
+        stage: The stage of the step.
+        rows: The number of rows the step produced.
+        nbytes: The number of bytes the step read or wrote.
+        """
+        now = time.perf_counter()
+        s = self.stages.setdefault( stage, {"seconds": 0.0, "rows": 0, "bytes": 0} )
+        s["seconds"] += now - self.t_last
+        s["rows"] += int(rows)
+        s["bytes"] += int(nbytes)
+        self.t_last = now
+        self.rows += int(rows)
+        self.nbytes += int(nbytes)
+        if step is None: return
+        self.step = step
+        elapsed = now - self.t_start
+        eta = self.get_eta(elapsed)
+        rows_per_s, mb_per_s = self.get_rates(elapsed)
+        if EVENT_STREAM is not None:
+            func_emit( "progress", file=self.name, stage=stage, step=step, steps=self.steps, rows=self.rows, bytes=self.nbytes,
+                       elapsed=round(elapsed, 3), rows_per_s=round(rows_per_s), mb_per_s=round(mb_per_s, 2),
+                       eta=None if eta is None else round(eta, 1) )
+        else:
+            print(f"{stage:<7} {step}/{self.steps} | {func_format_rate(rows_per_s, mb_per_s)} | ETA {func_format_eta(eta)}{SPACES}",
+                  end=self.end_print)
+
+
+    def get_eta(self, elapsed: float) -> float:
+        """Get the seconds left from the fraction of steps done. `None` if unknown."""
+        if not self.steps or self.step <= 0: return None
+        f = min( self.step / self.steps, 1.0 )
+        return elapsed * (1 - f) / f
+
+
+    def get_rates(self, elapsed: float) -> tuple[float, float]:
+        """Get the rows per second and the megabytes per second so far."""
+        if elapsed <= 0: return 0.0, 0.0
+        return self.rows / elapsed, self.nbytes / elapsed / 1e6
+
+
+    def finish(self) -> dict:
+        """
+        End the conversion: Set and emit the performance report of the file.
+        """
+        elapsed = time.perf_counter() - self.t_start
+        rows_per_s, mb_per_s = self.get_rates(elapsed)
+        self.report = {"file": self.name, "seconds": round(elapsed, 3), "rows": self.rows, "bytes": self.nbytes,
+                       "rows_per_s": round(rows_per_s), "mb_per_s": round(mb_per_s, 2),
+                       "stages": {k: {**v, "seconds": round(v["seconds"], 3)} for k, v in self.stages.items()}}
+        func_emit( "report", **self.report )
+        return self.report
@@ -0,0 +1,342 @@
+"""
+StormSim: File 10
+===
+Worker pool
+
+About
+---
+gui02_workerpool.py: Keeps a pool of pre-warmed converter processes for the GUI.
+
+Each worker runs `code01_h5organize.py 2` and stays alive between files, so h5py, numpy and pandas are only imported once per worker.
+Workers report through JSON events on stdout (see `code08_progress.py`). Anything else they print comes through stderr.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+import os, shutil, sys, tempfile, time
+from datetime import timedelta
+
+from PySide6.QtCore import (QObject, QProcess, QProcessEnvironment, Signal)
+
+from code08_progress import func_format_eta, func_format_rate, func_parse_event
+
+# `code02_columnar.py` imports numpy and pandas, so it's imported when first needed, after the GUI shows.
+
+DIR_PROGRAM = os.path.dirname( os.path.abspath(__file__) )
+
+STATES = { QProcess.ProcessState.NotRunning: 'Not running',
+           QProcess.ProcessState.Starting: 'Initializing',
+           QProcess.ProcessState.Running: 'Running' }
+"""For printing the state of the QProcess."""
+
+
+
+class Job:
+    """
+    One file to convert.
+    """
+
+    def __init__(self, i: int, fname: str, fpath: str, will_export: bool, memory: int = 0):
+        self.i = i
+        """Position of the job in the run. For the progress bar."""
+        self.fname = fname
+        self.fpath = fpath
+        self.will_export = will_export
+        self.memory = memory
+        """Estimated peak memory of the conversion in bytes (see `func_estimate_memory()` in `code01_h5organize.py`)."""
+        self.progress = 0.0
+        """Fraction of the job done."""
+        self.flim = 0
+        """Number of steps reported by the "length" event."""
+        self.rows = 0
+        self.nbytes = 0
+        """Rows and bytes processed so far, from "progress" events."""
+        self.report: dict = None
+        """Performance report of the conversion, from the "report" event."""
+        self.h5 = None
+        self.timestamp = time.time()
+        self.is_cancelled = False
+
+
+
+class Worker(QObject):
+    """
+    One persistent converter process. Converts one job at a time.
+    """
+    ready = Signal(object)
+    """Emits itself when idle."""
+    progress = Signal(object)
+    """Emits the current `Job` when its progress changes."""
+    done = Signal(object, object)
+    """Emits itself and the finished `Job`."""
+
+    def __init__(self, dir_handoff: str, parent=None):
+        super().__init__(parent)
+        self.dir_handoff = dir_handoff
+        self.job: Job = None
+        self.is_ready = False
+        self.is_stopping = False
+        self.buffer = b""
+        self._start()
+
+
+    def _start(self):
+        """
+        Launch the converter process. It reports "READY" after importing its packages.
+        """
+        self.is_ready = False
+        self.buffer = b""
+        self.process = QProcess(self)
+        self.process.readyReadStandardOutput.connect( self.process_stdout )
+        self.process.readyReadStandardError.connect( self.process_stderr )
+        self.process.finished.connect( self.process_finished )
+        env = QProcessEnvironment.systemEnvironment()
+        env.insert( "CHS_HANDOFF_DIR", self.dir_handoff ) # Handed-off datasets are written inside the pool's directory.
+        self.process.setProcessEnvironment(env)
+        self.process.setProgram( str(sys.executable) )
+        self.process.setArguments( ['-u', os.path.join( DIR_PROGRAM, "code01_h5organize.py" ), "2"] )
+        self.process.start()
+
+
+    def submit(self, job: Job):
+        """
+        Send a job to the process.
+        """
+        self.job = job
+        self.is_ready = False
+        job.timestamp = time.time()
+        print(f"Converting file {job.i+1}: {job.fname} | {STATES[self.process.state()]}")
+        self.process.write( f"{int(job.will_export)}\t{job.fpath}\n".encode("utf8") )
+
+
+    def cancel(self):
+        """
+        Cancel the current job by killing the process. A new process is started in its place.
+        """
+        if self.job:
+            self.job.is_cancelled = True
+        self.process.kill()
+
+
+    def stop(self):
+        """
+        Stop the process for good.
+        """
+        self.is_stopping = True
+        self.process.closeWriteChannel()
+        if not self.process.waitForFinished(1000):
+            self.process.kill()
+            self.process.waitForFinished(1000)
+
+
+    def process_stdout(self):
+        """
+        Decode the JSON events line by line (see `code08_progress.py`). Incomplete lines wait for the next read.
+
+        "length"/"progress" update the job's progress. "report" keeps its performance. "result" maps the handed-off dataset(s). "done" finishes the job.
+        """
+        self.buffer += self.process.readAllStandardOutput().data()
+        *lines, self.buffer = self.buffer.split(b"\n")
+        for line in lines:
+            ev = func_parse_event( line.decode("utf8", errors="replace") )
+            job = self.job
+            if ev is None:
+                if line.strip(): print(f"Unknown output: {line.decode('utf8', errors='replace').strip()}")
+                continue
+            kind = ev["event"]
+            if kind == "ready":
+                self.is_ready = True
+                self.ready.emit(self)
+            elif job is None:
+                continue
+            elif kind == "length":
+                job.flim = int(ev["steps"])
+            elif kind == "progress":
+                job.flim = int(ev["steps"]) or job.flim
+                job.rows, job.nbytes = ev["rows"], ev["bytes"]
+                if job.flim:
+                    job.progress = min( ev["step"] / job.flim, 1.0 )
+                self.progress.emit(job)
+            elif kind == "report":
+                job.report = ev
+            elif kind == "result":
+                try:
+                    from code02_columnar import func_load
+                    from code03_cache import func_cache_acquire
+                    func_cache_acquire( ev["path"] ) # Cached columns are never evicted while imported.
+                    job.h5 = func_load( ev["path"] )
+                except Exception as e:
+                    print(f"Can't load converted dataset: {e}")
+            elif kind == "failed":
+                print(f"FAILED: {ev['error']}")
+            elif kind == "done":
+                self._finish()
+
+
+    def process_stderr(self):
+        """Print error in CMD that terminated conversion."""
+        print( bytes( self.process.readAllStandardError() ).decode("utf8") )
+
+
+    def process_finished(self, exit_code, exit_status):
+        """
+        The process ended: Finish the current job, then replace the process unless the pool is stopping.
+        """
+        if self.job:
+            self._finish()
+        if not self.is_stopping:
+            self._start()
+
+
+    def _finish(self):
+        """Report the finished job and become idle."""
+        job, self.job = self.job, None
+        job.progress = 1.0
+        te = str(timedelta(seconds = time.time() - job.timestamp))
+        res = "Cancelled." if job.is_cancelled else ("Finished!" if job.h5 else "Not imported.")
+        rate = f" | {func_format_rate(job.report['rows_per_s'], job.report['mb_per_s'])}" if job.report and job.report["rows"] else ""
+        print(f"{res} Time elapsed: {te}{rate}\n")
+        self.done.emit(self, job)
+        if self.process.state() == QProcess.ProcessState.Running and not self.is_stopping:
+            self.is_ready = True
+            self.ready.emit(self)
+
+
+
+class WorkerPool(QObject):
+    """
+    Pool of persistent converter processes, started with the GUI. Runs several files at once.
+    """
+    setCurrentProgress = Signal(int)
+    """Total progress of the run. 100 per file."""
+    message = Signal(str)
+    """Status bar message."""
+    eta = Signal(str, str)
+    """ETA and throughput of the run, ex. `("0:01:20", "120,000 rows/s | 45.0 MB/s")`."""
+    success = Signal(dict)
+    """Dictionary of dataset names to `H5_Organized_New` objects after all jobs finish."""
+
+    def __init__(self, n_workers: int = None, memory_budget: int = None, parent=None):
+        super().__init__(parent)
+        if n_workers is None:
+            n_workers = max( 1, min( (os.cpu_count() or 2) // 2, 4 ) )
+        self.memory_budget = memory_budget
+        """Bytes the running jobs may use together (see `_dispatch()`). `None`: No limit."""
+        self.queue: list[Job] = []
+        self.jobs: list[Job] = []
+        self.t_start = time.time()
+        """Start of the current run. For the ETA."""
+        from code02_columnar import PREFIX
+        self.dir_handoff = tempfile.mkdtemp(prefix=PREFIX)
+        """Directory of handed-off datasets. Deleted at `shutdown()`."""
+        self.workers = [Worker(self.dir_handoff, self) for _ in range(n_workers)]
+        for w in self.workers:
+            w.ready.connect( self._dispatch )
+            w.progress.connect( self._report )
+            w.done.connect( self._done )
+
+
+    def submit(self, tasks: list[tuple[str, str, bool, int]]):
+        """
+        Queue a run of files.
+
+        Parameters
+        ---
+        tasks: List of `(filename, filepath, will_export, memory)` (see `Job`). ZIP references use `[ZIP filepath];[HDF5 filepath in ZIP]`.
+        """
+        self.jobs = [Job(i, *t) for i, t in enumerate(tasks)]
+        self.queue = list(self.jobs)
+        self.t_start = time.time()
+        for w in self.workers:
+            if w.is_ready: self._dispatch(w)
+
+
+    def cancel(self, job: Job):
+        """
+        Cancel one job, queued or running.
+        """
+        job.is_cancelled = True
+        if job in self.queue:
+            self.queue.remove(job)
+            self._done(None, job)
+        for w in self.workers:
+            if w.job is job: w.cancel()
+
+
+    def cancel_all(self):
+        """
+        Cancel every job of the current run ("Abort" button). Workers of cancelled jobs are replaced.
+        """
+        jobs, self.jobs = self.jobs, []
+        self.queue = []
+        for job in jobs:
+            job.is_cancelled = True
+            for w in self.workers:
+                if w.job is job: w.cancel()
+
+
+    def shutdown(self):
+        """
+        Stop all workers and delete handed-off datasets.
+        """
+        for w in self.workers:
+            w.stop()
+        shutil.rmtree(self.dir_handoff, ignore_errors=True)
+
+
+    def _dispatch(self, worker: Worker):
+        """
+        Give the next queued job to an idle worker.
+
+        Admission control: A job only starts if its estimated memory fits the budget next to the running jobs, so large files
+        convert one at a time. Jobs that don't fit wait for a running job to finish. A job always starts if nothing runs.
+        """
+        if worker.is_ready and worker.job is None and self.queue:
+            running = [w.job for w in self.workers if w.job is not None]
+            used = sum(j.memory for j in running)
+            job = next( (j for j in self.queue if not running or self.memory_budget is None or used + j.memory <= self.memory_budget), None )
+            if job is None: return
+            self.queue.remove(job)
+            self.message.emit(f"<< Processing file {job.i+1}/{len(self.jobs)}: {job.fname} >>")
+            worker.submit(job)
+
+
+    def _report(self, job: Job):
+        """
+        Emit the total progress of the run, its ETA and its throughput.
+
+        The ETA divides the fraction of the run left by the rate of progress of the run so far, so it steadies as the run goes.
+        """
+        if job not in self.jobs: return
+        done = sum(j.progress for j in self.jobs)
+        self.setCurrentProgress.emit( int(100 * done) )
+        elapsed = time.time() - self.t_start
+        f = done / len(self.jobs)
+        eta = elapsed * (1 - f) / f if f > 0 else None
+        rows = sum(j.rows for j in self.jobs)
+        nbytes = sum(j.nbytes for j in self.jobs)
+        rates = func_format_rate( rows / elapsed, nbytes / elapsed / 1e6 ) if elapsed > 0 else ""
+        self.eta.emit( func_format_eta(eta), rates )
+
+
+    def _done(self, worker: Worker, job: Job):
+        """Collect a finished job. Emit `success` once every job of the run is finished."""
+        if job not in self.jobs:
+            return # Job of an aborted run.
+        job.progress = 1.0
+        self._report(job)
+        for w in self.workers: # Memory freed: Queued jobs may fit now.
+            self._dispatch(w)
+        if all(j.progress >= 1.0 and j not in self.queue and not any(w.job is j for w in self.workers) for j in self.jobs):
+            res = {}
+            for j in self.jobs:
+                if j.h5 is None or j.is_cancelled: continue
+                if j.h5.h5s:
+                    for h5_obj in j.h5.h5s:
+                        res[ h5_obj.name ] = h5_obj
+                else:
+                    res[ j.h5.name ] = j.h5
+            self.jobs = []
+            self.message.emit("<< Done >>")
+            self.success.emit(res)
@@ -0,0 +1,151 @@
+"""
+StormSim: File 11
+===
+Table model
+
+About
+---
+gui03_tablemodel.py: Shows converted datasets in the GUI's table (Data Viewer, right).
+
+The converter (`code01_h5organize.py`) never imports Qt. Its filters return the current dataset as a view
+`(DataFrame, row positions)`, which the GUI wraps in a `TableModel`.
+
+Author
+---
+Code by Jared Hidalgo.
+"""
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+from PySide6.QtCore import (Qt, QAbstractTableModel, QModelIndex)
+
+
+
+#
+# Make a custom model for the QTableView window.
+#
+class TableModel(QAbstractTableModel):
+    """
+    Convert dataset to a displayable format for Data Viewer (right).
+
+    Cells are formatted in blocks of `BLOCK_ROWS` rows per column with array operations, and kept in a cache of
+    `CACHE_BLOCKS` blocks. Scrolling only formats the rows coming into view.
+
+    Rows are handed to the view `FETCH_ROWS` at a time (`canFetchMore()`/`fetchMore()`), so the view never lays out the whole dataset at once.
+
+    Filtered datasets are shown through their row positions, so the filtered rows are never copied.
+    """
+    BLOCK_ROWS = 256
+    """Number of rows formatted at once."""
+    CACHE_BLOCKS = 512
+    """Number of formatted blocks kept. Least recently used blocks are dropped first."""
+    FETCH_ROWS = 10_000
+    """Number of rows added to the view each time it scrolls to the end of the loaded rows."""
+    DATETIME_FORMAT = "%m/%d/%Y, %I:%M %p"
+
+    def __init__(self, data, positions: np.ndarray = None, parent=None, *args):
+        QAbstractTableModel.__init__(self, parent, *args)
+        self._data: pd.DataFrame = data
+        """The original DataFrame"""
+        self._positions = positions
+        """Positions of the shown rows in the DataFrame. `None` for all rows."""
+        self._n_rows = len(data.index) if positions is None else len(positions)
+        self._n_loaded = min(self._n_rows, self.FETCH_ROWS)
+        """Number of rows shown to the view so far."""
+        self._headers = [str(col) for col in data.columns]
+        self._arrays = []
+        """Each column as a NumPy array (or pandas array for date-times with time zones and text)."""
+        self._kinds = []
+        """Formatting of each column: "M" (date-time), "m" (time span), "n" (number) or "o" (other)."""
+        for j in range(len(self._headers)):
+            arr = data.iloc[:, j].array
+            if isinstance(arr.dtype, pd.DatetimeTZDtype): kind = "M"
+            elif isinstance(arr.dtype, np.dtype):
+                arr = arr.to_numpy()
+                kind = arr.dtype.kind if arr.dtype.kind in "mM" else ("n" if arr.dtype.kind in "biuf" else "o")
+            else: kind = "o"
+            self._arrays.append(arr)
+            self._kinds.append(kind)
+        self._cache = OrderedDict()
+        """(column, block) -> formatted strings"""
+    
+    def rowCount(self, index):
+        return self._n_loaded
+    
+    def canFetchMore(self, index):
+        return self._n_loaded < self._n_rows
+    
+    def fetchMore(self, index):
+        """
+        Show the next `FETCH_ROWS` rows.
+        """
+        n = min(self._n_rows - self._n_loaded, self.FETCH_ROWS)
+        if n <= 0: return
+        self.beginInsertRows(QModelIndex(), self._n_loaded, self._n_loaded + n - 1)
+        self._n_loaded += n
+        self.endInsertRows()
+    
+    def columnCount(self, index):
+        return len(self._headers)
+    
+    def data(self, index, role):
+        """
+        Set format for data object.
+        """
+        if role == Qt.ItemDataRole.DisplayRole and index.isValid():
+            row, col = index.row(), index.column()
+            block = self._format_block( col, row // self.BLOCK_ROWS )
+            return block[ row % self.BLOCK_ROWS ]
+        return None
+    
+    def _format_block(self, col: int, b: int):
+        """
+        Get the display strings of one block of a column. Formats the whole block at once if not cached.
+        """
+        key = (col, b)
+        block = self._cache.get(key)
+        if block is not None:
+            self._cache.move_to_end(key)
+            return block
+
+        rows = slice( b*self.BLOCK_ROWS, (b+1)*self.BLOCK_ROWS )
+        values = self._arrays[col][ rows if self._positions is None else self._positions[rows] ]
+        kind = self._kinds[col]
+        if kind == "M":
+            block = pd.DatetimeIndex(values).strftime(self.DATETIME_FORMAT).to_numpy(dtype=object, na_value="NaT")
+        elif kind == "m":
+            block = pd.TimedeltaIndex(values).astype(str).to_numpy(dtype=object, na_value="NaT")
+        elif kind == "n":
+            block = values.astype(str).astype(object)
+        else:
+            block = [str(x) for x in values]
+        block = list(block)
+
+        self._cache[key] = block
+        if len(self._cache) > self.CACHE_BLOCKS:
+            self._cache.popitem(last=False)
+        return block
+    
+    def sample_column(self, col: int, n_blocks: int = 4) -> list[str]:
+        """
+        Get the display strings of a sample of rows of a column: the first block and blocks spread over the whole dataset. For sizing columns.
+        """
+        n = -(-self._n_rows // self.BLOCK_ROWS) # Number of blocks.
+        res = []
+        for b in sorted({ int(x) for x in np.linspace(0, n-1, min(n, n_blocks)) }):
+            res += self._format_block(col, b)
+        return res
+    
+    def headerData(self, section, orientation, role):
+        """
+        Get headers.
+        """
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self._headers[section]
+    
+    def flags(self, index):
+        """
+        Set flags for each element.
+        """
+        return QAbstractTableModel.flags(self, index) | Qt.ItemFlag.ItemIsSelectable